@@ -2,7 +2,9 @@ from typing import List
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
-class Settings(BaseSettings):
+from core.openai_client import OpenAISettings
+
+class Settings(OpenAISettings):
     OPENAI_API_KEY: str
     SUPABASE_KEY: str
     SUPABASE_URL: str
@@ -11,6 +13,43 @@ class Settings(BaseSettings):
     DEBUG: bool
     ALLOWED_ORIGINS: str
 
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_SECONDS: float = 30.0
+    SUPABASE_TIMEOUT_SECONDS: float = 120.0
+    SUPABASE_CLIENT_CACHE_SIZE: int = 1024
+
+    # Empty verifies HS256 access tokens with the auth server instead of locally.
+    SUPABASE_JWT_SECRET: str = ""
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    SUPABASE_JWKS_CACHE_SECONDS: float = 600.0
+    IDENTITY_CACHE_TTL_SECONDS: float = 60.0
+    IDENTITY_CACHE_SIZE: int = 4096
+
+    CHAT_MAX_SESSIONS: int = 500
+    CHAT_SESSION_TTL_SECONDS: int = 1800
+    CHAT_SESSION_DB_PATH: str = "data/chat_sessions.sqlite3"
+    CHAT_SESSION_SPILL_RETENTION_SECONDS: int = 7 * 24 * 3600
+
+    CHAT_SESSION_INBOX_SIZE: int = 2
+    CHAT_WS_WORKERS: int = 8
+    CHAT_WS_QUEUE_SIZE: int = 4
+
+    CHAT_PREFETCH_ENABLED: bool = False
+
+    # Empty disables routing; every completion then uses the main model.
+    CHAT_FAST_MODEL: str = ""
+    CHAT_FAST_MAX_WORDS: int = 8
+
+    CHAT_MAX_MODEL_CALLS: int = 6
+    CHAT_MAX_TOOL_CALLS: int = 8
+    CHAT_TURN_DEADLINE_SECONDS: float = 45.0
+
+    CHAT_SLOW_TURN_SECONDS: float = 5.0
+    CHAT_SLOW_TURN_BUFFER_SIZE: int = 50
+    ADMIN_TOKEN: str = ""
+
     @field_validator("ALLOWED_ORIGINS")
     def parse_allowed_origins(cls, v: str) -> List[str]:
         return v.split(",") if v else []
@@ -19,5 +58,6 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_senstive = True
+        extra = "forbid"
 
 settings = Settings()
\ No newline at end of file
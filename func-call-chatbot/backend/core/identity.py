@@ -0,0 +1,275 @@
+"""
+Identity of the user behind an access token.
+
+Supabase access tokens are JWTs, so the user id can be read from a verified
+token without asking the auth server. Tokens signed with the project's shared
+secret (HS256) are checked against SUPABASE_JWT_SECRET; tokens signed with an
+asymmetric key are checked against the project's JWKS, whose keys are fetched
+once and cached. Signature, expiry and audience are always verified. A token
+that cannot be checked locally (no secret configured, JWKS unreachable) falls
+back to one ``auth.get_user`` round trip.
+
+Verified identities are cached by token hash for a short time, never past the
+token's expiry. ``authenticate`` binds the identity to the current request
+once, and ``current_user_id`` serves it to the data layer from there.
+"""
+
+import contextvars
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import jwt
+from fastapi import Request
+
+from core.config import settings
+from core.metrics import registry
+from routers.middleware import KnownAppError
+from supabase_client import get_access_token, get_supabase_client
+
+
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "ES256"})
+
+# Tolerated clock difference with the auth server, in seconds.
+CLOCK_SKEW_SECONDS = 10
+
+identity_lookups = registry.counter(
+    "identity_lookups_total", "Access token identity lookups by outcome (request, hit, verified, remote, rejected)", ["outcome"]
+)
+identity_cache_size = registry.gauge(
+    "identity_cache_entries", "Cached access token identities"
+)
+
+
+class Identity:
+    """The verified user behind one access token."""
+
+    __slots__ = ("user_id", "email", "role", "expires_at", "token_hash")
+
+    def __init__(self, user_id: str, email: Optional[str], role: Optional[str], expires_at: float, token_hash: str):
+        self.user_id = user_id
+        self.email = email
+        self.role = role
+        self.expires_at = expires_at
+        self.token_hash = token_hash
+
+
+def _token_hash(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+def _unauthenticated() -> KnownAppError:
+    return KnownAppError("User not authenticated", status_code=401)
+
+
+_jwks_client = None
+_jwks_client_lock = threading.Lock()
+
+
+def _jwks() -> jwt.PyJWKClient:
+    global _jwks_client
+    if _jwks_client is None:
+        with _jwks_client_lock:
+            if _jwks_client is None:
+                _jwks_client = jwt.PyJWKClient(
+                    f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+                    cache_keys=True,
+                    lifespan=settings.SUPABASE_JWKS_CACHE_SECONDS,
+                    headers={"apikey": settings.SUPABASE_KEY},
+                    timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+                )
+    return _jwks_client
+
+
+def _signing_key(header: dict):
+    """Returns the key for a token header, or None if it cannot be checked locally."""
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        return settings.SUPABASE_JWT_SECRET or None
+    if algorithm in ASYMMETRIC_ALGORITHMS and header.get("kid"):
+        try:
+            return _jwks().get_signing_key(header["kid"]).key
+        except (jwt.PyJWKClientError, jwt.PyJWKError) as e:
+            print(f"JWKS lookup failed, verifying remotely: {e}")
+    return None
+
+
+def _verify(access_token: str, token_hash: str) -> Identity:
+    try:
+        header = jwt.get_unverified_header(access_token)
+    except jwt.PyJWTError:
+        identity_lookups.inc(outcome="rejected")
+        raise _unauthenticated()
+
+    key = _signing_key(header)
+    if key is None:
+        return _verify_remote(access_token, token_hash)
+
+    try:
+        claims = jwt.decode(
+            access_token,
+            key,
+            algorithms=[header["alg"]],
+            audience=settings.SUPABASE_JWT_AUDIENCE,
+            leeway=CLOCK_SKEW_SECONDS,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.PyJWTError:
+        identity_lookups.inc(outcome="rejected")
+        raise _unauthenticated()
+    identity_lookups.inc(outcome="verified")
+    return Identity(claims["sub"], claims.get("email"), claims.get("role"), float(claims["exp"]), token_hash)
+
+
+def _verify_remote(access_token: str, token_hash: str) -> Identity:
+    try:
+        response = get_supabase_client(access_token=access_token).auth.get_user(access_token)
+    except Exception:
+        response = None
+    if not response or not response.user:
+        identity_lookups.inc(outcome="rejected")
+        raise _unauthenticated()
+    try:
+        expires_at = float(jwt.decode(access_token, options={"verify_signature": False})["exp"])
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+        expires_at = time.time() + settings.IDENTITY_CACHE_TTL_SECONDS
+    identity_lookups.inc(outcome="remote")
+    user = response.user
+    return Identity(user.id, user.email, user.role, expires_at, token_hash)
+
+
+class _IdentityCache:
+    """Size-bounded LRU of verified identities, each kept for the TTL or until its token expires."""
+
+    def __init__(self, max_entries: int, ttl: float, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Wall clock, since token expiries are Unix times; injectable for tests.
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> Optional[Identity]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            valid_until, identity = entry
+            if valid_until <= now:
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return identity
+
+    def put(self, identity: Identity):
+        valid_until = min(self._clock() + self.ttl, identity.expires_at)
+        with self._lock:
+            self._entries[identity.token_hash] = (valid_until, identity)
+            self._entries.move_to_end(identity.token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            identity_cache_size.set(len(self._entries))
+
+    def discard(self, token_hash: str):
+        with self._lock:
+            self._entries.pop(token_hash, None)
+            identity_cache_size.set(len(self._entries))
+
+
+_cache = _IdentityCache(settings.IDENTITY_CACHE_SIZE, settings.IDENTITY_CACHE_TTL_SECONDS)
+
+_request_identity = contextvars.ContextVar("request_identity", default=None)
+
+
+def resolve_identity(access_token: Optional[str]) -> Identity:
+    """
+    Returns the verified identity behind an access token.
+
+    Args:
+        access_token (str): The user's access token.
+
+    Returns:
+        Identity: The user the token was issued to.
+
+    Raises:
+        KnownAppError: If the token is missing, malformed, expired or not
+                       valid for this project (401 status code)
+    """
+    if not access_token:
+        identity_lookups.inc(outcome="rejected")
+        raise _unauthenticated()
+    token_hash = _token_hash(access_token)
+    bound = _request_identity.get()
+    if bound is not None and bound.token_hash == token_hash and bound.expires_at > time.time():
+        identity_lookups.inc(outcome="request")
+        return bound
+    identity = _cache.get(token_hash)
+    if identity is not None:
+        identity_lookups.inc(outcome="hit")
+        return identity
+    identity = _verify(access_token, token_hash)
+    _cache.put(identity)
+    return identity
+
+
+def bind_identity(access_token: Optional[str]) -> Identity:
+    """Resolves an access token and binds its identity to the current context."""
+    identity = resolve_identity(access_token)
+    _request_identity.set(identity)
+    return identity
+
+
+@contextmanager
+def identity_bound(identity: Optional[Identity]) -> Iterator[Optional[Identity]]:
+    """
+    Binds an identity, or none, to the current context for the duration of the block.
+
+    For work that does not get a fresh context of its own, e.g. a chat turn.
+    """
+    token = _request_identity.set(identity)
+    try:
+        yield identity
+    finally:
+        _request_identity.reset(token)
+
+
+def current_user_id(access_token: Optional[str]) -> str:
+    """
+    Returns the id of the user behind an access token.
+
+    Uses the identity bound to the current request when it belongs to the same
+    token, so data layer functions called by one request share one lookup.
+
+    Raises:
+        KnownAppError: If the user is not authenticated (401 status code)
+    """
+    return resolve_identity(access_token).user_id
+
+
+def forget_identity(access_token: Optional[str]):
+    """Drops a token from the identity cache, e.g. after signing out."""
+    if access_token:
+        _cache.discard(_token_hash(access_token))
+
+
+def authenticate(request: Request) -> str:
+    """
+    Verifies the request's bearer token and binds its identity to the request.
+
+    Args:
+        request (Request): FastAPI request object containing authentication headers
+
+    Returns:
+        str: The access token, for the data layer's row-level security.
+
+    Raises:
+        KnownAppError: If the authorization header is missing or the user is
+                       not authenticated (401 status code)
+    """
+    access_token = get_access_token(request)
+    bind_identity(access_token)
+    return access_token
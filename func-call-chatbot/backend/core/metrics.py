@@ -0,0 +1,201 @@
+"""
+In-process metrics primitives for the backend.
+
+This module provides minimal, thread-safe counters, gauges and histograms that
+are collected in a process-wide registry and can be rendered in the Prometheus
+text exposition format. It intentionally avoids any external dependency so that
+every worker can record metrics without extra setup.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+"""Default histogram buckets, in seconds"""
+
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+"""Histogram buckets for payload sizes, in bytes"""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    escaped = [f'{name}="{_escape_label(value)}"' for name, value in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return "\n".join(lines)
+
+    def _render_samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """A cumulative histogram with fixed bucket boundaries."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """
+        Returns the count and sum observed for the given label set.
+
+        Returns:
+            dict: {"count": int, "sum": float}
+        """
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": state[2], "sum": state[1]}
+
+    def _render_samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, {"le": _format_value(bound)})
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics.
+
+    Metrics are created on first use and returned on subsequent lookups, so modules
+    can declare the metrics they need at import time without coordinating.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """
+        Renders every registered metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text, terminated by a newline.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,104 @@
+"""
+Factory for the OpenAI clients used by the chat engine and the RAG embeddings.
+
+When OPENAI_CASSETTE_MODE is "record" every Responses and Embeddings exchange
+is written to OPENAI_CASSETTE_PATH; when it is "replay" the exchanges are
+served from that file without network access (see ``fakes.cassette``).
+
+Nothing here needs the application settings, so scripts such as the knowledge
+base builder can use it without the Supabase and API configuration.
+"""
+
+import functools
+import os
+from typing import Optional
+
+import httpx
+from openai import OpenAI
+from pydantic_settings import BaseSettings
+
+from core.resilience import UpstreamCaller
+from fakes.cassette import cassette_transport
+
+
+class OpenAISettings(BaseSettings):
+    """Timeouts, retries and hedging of OpenAI calls; part of the application settings."""
+
+    OPENAI_REQUEST_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_ATTEMPTS: int = 3
+    OPENAI_RETRY_BASE_DELAY_SECONDS: float = 0.25
+    OPENAI_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    OPENAI_RETRY_BUDGET_RATIO: float = 0.2
+    OPENAI_HEDGE_COMPLETIONS: bool = False
+    OPENAI_HEDGE_EMBEDDINGS: bool = False
+    OPENAI_HEDGE_QUANTILE: float = 0.95
+    OPENAI_HEDGE_MIN_DELAY_SECONDS: float = 0.05
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        # The .env file also holds the application settings.
+        extra = "ignore"
+
+
+@functools.lru_cache(maxsize=None)
+def openai_settings() -> OpenAISettings:
+    """Returns the OpenAI call settings, read once from the environment."""
+    return OpenAISettings()
+
+
+def create_openai_client(api_key: Optional[str] = None, **options) -> OpenAI:
+    """
+    Creates an OpenAI client, wired to a cassette when one is configured.
+
+    Cassettes are configured through the environment so that scripts which do
+    not load the application settings (e.g. the knowledge base builder) can
+    record and replay too.
+
+    Args:
+        api_key (str, optional): API key; defaults to OPENAI_API_KEY.
+        **options: Extra keyword arguments for ``OpenAI``.
+
+    Returns:
+        OpenAI: The client.
+    """
+    transport = cassette_transport(
+        os.getenv("OPENAI_CASSETTE_MODE", ""),
+        os.getenv("OPENAI_CASSETTE_PATH", "data/openai_cassette.jsonl"),
+        latency_scale=float(os.getenv("OPENAI_CASSETTE_LATENCY_SCALE", "1.0")),
+        fixed_latency=float(os.environ["OPENAI_CASSETTE_FIXED_LATENCY"]) if os.getenv("OPENAI_CASSETTE_FIXED_LATENCY") else None,
+    )
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if transport is not None:
+        options["http_client"] = httpx.Client(transport=transport)
+        # Replays never reach OpenAI, so a key is not required.
+        api_key = api_key or "cassette"
+    return OpenAI(api_key=api_key, **options)
+
+
+def create_upstream_caller(name: str, hedge: bool = False) -> UpstreamCaller:
+    """
+    Creates the retry and hedging policy for one kind of OpenAI call from the settings.
+
+    Clients used through the caller should be created with ``max_retries=0``
+    so that the two retry layers do not multiply.
+
+    Args:
+        name (str): Metric label, e.g. "responses" or "embeddings".
+        hedge (bool): Whether slow attempts get a duplicate request.
+
+    Returns:
+        UpstreamCaller: The caller.
+    """
+    settings = openai_settings()
+    return UpstreamCaller(
+        name,
+        timeout=settings.OPENAI_REQUEST_TIMEOUT_SECONDS,
+        max_attempts=settings.OPENAI_MAX_ATTEMPTS,
+        base_delay=settings.OPENAI_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.OPENAI_RETRY_MAX_DELAY_SECONDS,
+        retry_ratio=settings.OPENAI_RETRY_BUDGET_RATIO,
+        hedge=hedge,
+        hedge_quantile=settings.OPENAI_HEDGE_QUANTILE,
+        hedge_min_delay=settings.OPENAI_HEDGE_MIN_DELAY_SECONDS,
+    )
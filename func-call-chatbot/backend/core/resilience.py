@@ -0,0 +1,267 @@
+"""
+Deadlines, retries and hedging for OpenAI calls.
+
+An UpstreamCaller wraps one kind of call (completions, embeddings) and runs
+it as a series of attempts:
+
+- every attempt gets a timeout, capped by the caller's overall deadline;
+- retryable failures (timeouts, connection errors, 408/409/429 and 5xx) are
+  retried after a jittered exponential backoff, honoring Retry-After, but
+  never past the deadline;
+- retries draw from a retry budget refilled by a fraction of all calls, so an
+  upstream outage does not multiply the load sent to it;
+- optionally, when an attempt has not answered by the observed latency
+  quantile (p95 by default), a duplicate request is sent and the first
+  successful answer wins.
+
+The OpenAI client is synchronous, so a losing hedge cannot be interrupted
+mid-request: it is cancelled if it has not started yet, otherwise its result
+is discarded and it ends at its own timeout.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+import httpx
+import openai
+
+from core.metrics import registry
+
+
+upstream_attempts = registry.counter(
+    "openai_attempts_total", "OpenAI request attempts by outcome (ok, retryable_error, error)", ["call", "outcome"]
+)
+upstream_retries = registry.counter(
+    "openai_retries_total", "Retry decisions after retryable errors (retried, deadline, cancelled, budget)", ["call", "outcome"]
+)
+upstream_hedges = registry.counter(
+    "openai_hedges_total", "Hedged duplicate requests by winner (primary, hedge, none)", ["call", "winner"]
+)
+upstream_duration = registry.histogram(
+    "openai_call_duration_seconds", "OpenAI call duration including retries and hedges", ["call"]
+)
+
+RETRYABLE_STATUS = frozenset({408, 409, 429})
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline passed before an attempt could be made."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Returns True for errors that another attempt may not hit."""
+    if isinstance(error, openai.APIConnectionError):
+        # Includes APITimeoutError.
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LatencyWindow:
+    """Durations of the most recent successful attempts."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, duration: float):
+        with self._lock:
+            self._samples.append(duration)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the q-quantile, or None until enough samples were seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of calls.
+
+    Args:
+        ratio (float): Tokens deposited per call; one retry costs one token.
+        max_tokens (float): Bucket size, which is also the initial balance.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="openai-hedge")
+    return _hedge_executor
+
+
+class UpstreamCaller:
+    """
+    Runs one kind of OpenAI call with deadlines, retries and optional hedging.
+
+    Args:
+        name (str): Metric label, e.g. "responses" or "embeddings".
+        timeout (float): Timeout of a single attempt in seconds.
+        max_attempts (int): Attempts per call, including the first.
+        base_delay (float): Backoff before the first retry, in seconds.
+        max_delay (float): Upper bound of any backoff, in seconds.
+        retry_ratio (float): Retries allowed per call on average (see RetryBudget).
+        hedge (bool): Whether to send a duplicate request for slow attempts.
+        hedge_quantile (float): Latency quantile after which the duplicate is sent.
+        hedge_min_delay (float): Never hedge earlier than this, in seconds.
+        clock (callable): Monotonic clock, injectable for tests.
+        sleep (callable): Waits out a backoff, injectable for tests.
+        rng (random.Random, optional): Source of the backoff jitter.
+    """
+
+    def __init__(self, name: str, timeout: float = 30.0, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0, retry_ratio: float = 0.2, hedge: bool = False, hedge_quantile: float = 0.95, hedge_min_delay: float = 0.05, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep, rng: Optional[random.Random] = None):
+        self.name = name
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = RetryBudget(retry_ratio)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyWindow()
+        self._clock = clock
+        self._sleep = sleep
+        self._random = rng or random.Random()
+
+    def call(self, fn: Callable[[float], Any], deadline: Optional[float] = None, cancel_event: Optional[threading.Event] = None) -> Any:
+        """
+        Calls ``fn`` until it succeeds, fails permanently or runs out of time.
+
+        Args:
+            fn (callable): Makes one request; receives the attempt timeout in seconds.
+            deadline (float, optional): Seconds left for the whole call,
+                                        including backoff; None for no limit
+                                        beyond the attempt timeouts.
+            cancel_event (threading.Event, optional): When set, no further
+                                                      attempts are made.
+
+        Returns:
+            The first successful result of ``fn``.
+
+        Raises:
+            DeadlineExceeded: If no time was left for an attempt.
+            Exception: The last error of ``fn`` when it is not retryable, or
+                       when attempts, time or the retry budget ran out.
+        """
+        start = self._clock()
+        end = start + deadline if deadline is not None else None
+        self.retry_budget.deposit()
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                timeout = self.timeout if end is None else min(self.timeout, end - self._clock())
+                if timeout <= 0:
+                    raise DeadlineExceeded(f"No time left for {self.name} attempt {attempt}")
+                try:
+                    result = self._attempt(fn, timeout)
+                except Exception as e:
+                    retryable = is_retryable(e)
+                    upstream_attempts.inc(call=self.name, outcome="retryable_error" if retryable else "error")
+                    if not retryable or attempt >= self.max_attempts:
+                        raise
+                    delay = self._backoff(attempt, e)
+                    if end is not None and self._clock() + delay >= end:
+                        upstream_retries.inc(call=self.name, outcome="deadline")
+                        raise
+                    if cancel_event is not None and cancel_event.is_set():
+                        upstream_retries.inc(call=self.name, outcome="cancelled")
+                        raise
+                    if not self.retry_budget.withdraw():
+                        upstream_retries.inc(call=self.name, outcome="budget")
+                        raise
+                    upstream_retries.inc(call=self.name, outcome="retried")
+                    print(f"Retrying {self.name} in {delay:.2f}s after {type(e).__name__}")
+                    if cancel_event is None:
+                        self._sleep(delay)
+                    elif cancel_event.wait(delay):
+                        raise
+                    continue
+                upstream_attempts.inc(call=self.name, outcome="ok")
+                return result
+        finally:
+            upstream_duration.observe(self._clock() - start, call=self.name)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter.
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _attempt(self, fn: Callable[[float], Any], timeout: float) -> Any:
+        hedge_after = self.latencies.quantile(self.hedge_quantile) if self.hedge else None
+        if hedge_after is not None:
+            hedge_after = max(hedge_after, self.hedge_min_delay)
+        started = self._clock()
+        if hedge_after is None or hedge_after >= timeout:
+            result = fn(timeout)
+            self.latencies.add(self._clock() - started)
+            return result
+
+        executor = _executor()
+        primary = executor.submit(fn, timeout)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            result = primary.result()
+            self.latencies.add(self._clock() - started)
+            return result
+
+        hedge = executor.submit(fn, timeout - (self._clock() - started))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    upstream_hedges.inc(call=self.name, winner="primary" if future is primary else "hedge")
+                    self.latencies.add(self._clock() - started)
+                    return future.result()
+                error = future.exception()
+        upstream_hedges.inc(call=self.name, winner="none")
+        raise error
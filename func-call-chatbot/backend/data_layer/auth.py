@@ -5,9 +5,10 @@ This module provides functions for user authentication, including sign-in,
 sign-out, and user ID retrieval operations using Supabase authentication.
 """
 
-from supabase_client import get_supabase_client, get_access_token
+from supabase_client import get_access_token, new_supabase_client
 from fastapi import HTTPException, Request
 from routers.middleware import KnownAppError
+from core.identity import current_user_id, forget_identity
 
 
 def sign_in(email: str, password: str):
@@ -32,9 +33,10 @@ def sign_in(email: str, password: str):
     Raises:
         HTTPException: If authentication fails (401 status code)
     """
-    # Attempt to sign in the user with provided credentials
+    # Attempt to sign in the user with provided credentials; signing in stores
+    # the session on the client, so it must not be a shared one
     response = (
-        get_supabase_client()
+        new_supabase_client()
         .auth
         .sign_in_with_password({
             "email": email,
@@ -65,21 +67,22 @@ def sign_out(request: Request):
         request (Request): FastAPI request object containing authentication headers
         
     Returns:
-        dict: Response data from the sign-out operation
+        None: Supabase returns no data for a sign-out
         
     Raises:
         KnownAppError: If user is not authenticated
     """
     # Extract access token from request headers
     access_token = get_access_token(request)
+    forget_identity(access_token)
     
-    # Perform sign-out operation
-    response = (
-        get_supabase_client(access_token=access_token)
+    # Revoke the user's refresh tokens; clients are not bound to a session
+    return (
+        new_supabase_client()
         .auth
-        .sign_out()
+        .admin
+        .sign_out(access_token)
     )
-    return response.data
 
 
 def get_user_id(access_token=None):
@@ -87,8 +90,7 @@ def get_user_id(access_token=None):
     Get the user ID of the currently authenticated user.
     
     Args:
-        access_token (str, optional): Access token for authentication. 
-                                    If not provided, uses default client.
+        access_token (str, optional): Access token for authentication.
         
     Returns:
         str: The authenticated user's ID
@@ -96,19 +98,4 @@ def get_user_id(access_token=None):
     Raises:
         KnownAppError: If user is not authenticated (401 status code)
     """
-    # Initialize Supabase client with or without access token
-    if access_token:
-        client = get_supabase_client(access_token=access_token)
-    else:
-        client = get_supabase_client()
-    
-    # Get current user information
-    user = client.auth.get_user()
-    
-    # Validate that user is authenticated
-    if not user or not hasattr(user, "user") or not user.user:
-        raise KnownAppError("User not authenticated", status_code=401)
-    
-    # Extract and return user ID
-    user_id = user.user.id
-    return user_id
+    return current_user_id(access_token)
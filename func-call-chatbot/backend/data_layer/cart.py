@@ -6,14 +6,23 @@ adding items, updating quantities, deleting items, and retrieving cart contents.
 All functions require user authentication via access tokens.
 """
 
-from supabase_client import get_supabase_client
+from supabase_client import call_rpc, get_supabase_client
+from core.identity import current_user_id
 from routers.middleware import KnownAppError
 
 
+CART_PAGE_SIZE = 50
+MAX_CART_PAGE_SIZE = 100
+
+
 def add_to_cart(*, variant_id, quantity, access_token):
     """
     Adds a product variant to the user's cart. Creates a new cart if one doesn't exist.
-    This follows the proper schema where cart items reference product variants.
+
+    Runs the ``add_to_cart`` database function, which upserts the cart item in
+    one statement: adding a variant that is already in the cart increments its
+    quantity, as long as the total stays within stock. Concurrent adds can
+    neither duplicate the item nor lose an increment.
 
     Args:
         variant_id (str): The ID of the product variant to add.
@@ -21,7 +30,7 @@ def add_to_cart(*, variant_id, quantity, access_token):
         access_token (str): User's access token for authentication.
 
     Returns:
-        dict: The created or updated cart item with product details.
+        dict: The created or updated cart item.
         
     Raises:
         KnownAppError: If user is not authenticated (401), product not found (404),
@@ -30,122 +39,10 @@ def add_to_cart(*, variant_id, quantity, access_token):
     client = get_supabase_client(access_token=access_token)
     
     try:
-        # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
-        
-        # Check product variant exists and get stock information
-        variant_response = (
-            client
-            .table("product_variant")
-            .select("variant_id, name, size, color, price, stock")
-            .eq("variant_id", variant_id)
-            .execute()
-        )
-        
-        if not variant_response.data:
-            raise KnownAppError("Product variant not found", status_code=404)
-        
-        variant = variant_response.data[0]
-        available_stock = variant["stock"]
+        # Fail fast on a bad token before calling the database
+        current_user_id(access_token)
         
-        # Validate stock availability
-        if quantity > available_stock:
-            raise KnownAppError(
-                f"Insufficient stock. Available: {available_stock}, Requested: {quantity}",
-                status_code=400
-            )
-        
-        # Get or create user's active cart
-        cart_response = (
-            client
-            .table("cart")
-            .select("cart_id, status")
-            .eq("customer_id", user_id)
-            .eq("status", "active")
-            .execute()
-        )
-        
-        if not cart_response.data:
-            # Create new active cart for user
-            cart_data = {
-                "customer_id": user_id,
-                "status": "active"
-            }
-            
-            cart_create_response = (
-                client
-                .table("cart")
-                .insert(cart_data)
-                .execute()
-            )
-            
-            if not cart_create_response.data:
-                raise KnownAppError("Failed to create cart", status_code=500)
-            
-            cart_id = cart_create_response.data[0]["cart_id"]
-        else:
-            cart_id = cart_response.data[0]["cart_id"]
-        
-        # Check if item already exists in cart
-        existing_item_response = (
-            client
-            .table("cart_item")
-            .select("cart_item_id, quantity")
-            .eq("cart_id", cart_id)
-            .eq("variant_id", variant_id)
-            .execute()
-        )
-        
-        if existing_item_response.data:
-            # Update existing cart item quantity
-            existing_item = existing_item_response.data[0]
-            new_quantity = existing_item["quantity"] + quantity
-            
-            # Validate stock for updated quantity
-            if new_quantity > available_stock:
-                raise KnownAppError(
-                    f"Insufficient stock for updated quantity. Available: {available_stock}, Requested: {new_quantity}",
-                    status_code=400
-                )
-            
-            update_response = (
-                client
-                .table("cart_item")
-                .update({"quantity": new_quantity})
-                .eq("cart_item_id", existing_item["cart_item_id"])
-                .execute()
-            )
-            
-            if not update_response.data:
-                raise KnownAppError("Failed to update cart item", status_code=500)
-            
-            return update_response.data[0]
-        else:
-            # Create new cart item
-            cart_item_data = {
-                "cart_id": cart_id,
-                "variant_id": variant_id,
-                "quantity": quantity
-            }
-            
-            cart_item_response = (
-                client
-                .table("cart_item")
-                .insert(cart_item_data)
-                .execute()
-            )
-            
-            if not cart_item_response.data:
-                raise KnownAppError("Failed to add item to cart", status_code=500)
-            
-            return cart_item_response.data[0]
+        return call_rpc(client, "add_to_cart", {"p_variant_id": variant_id, "p_quantity": quantity})
         
     except Exception as e:
         if isinstance(e, KnownAppError):
@@ -153,94 +50,88 @@ def add_to_cart(*, variant_id, quantity, access_token):
         raise KnownAppError(f"Failed to add item to cart: {e}", status_code=500)
 
 
-def get_cart_items(access_token):
+def get_cart_items(access_token, limit=CART_PAGE_SIZE, offset=0):
     """
-    Retrieve all cart items for the authenticated user.
+    Retrieve the items in the authenticated user's active carts.
+    
+    Filtering, projection and paging all happen in the database: only the
+    user's active cart ids are read, then one page of their items. One item
+    more than the page size is requested to tell whether another page follows.
     
     Args:
         access_token (str): User's access token for authentication.
+        limit (int, optional): Maximum number of items to return, at most MAX_CART_PAGE_SIZE.
+        offset (int, optional): Number of items to skip, for the following pages.
         
     Returns:
-        list: A list of dictionaries containing cart item information.
-              Each dictionary includes product details like name, size, color, price, etc.
-              Returns empty list if no cart items found.
+        dict: The page, with keys:
+              - items (list): Cart items with product details like name, size,
+                color, price, etc. Empty if no cart items found.
+              - has_more (bool): Whether more items follow this page.
+              - next_offset (int or None): The offset of the next page, or
+                None on the last page.
               
     Raises:
         KnownAppError: If user is not authenticated (401 status code)
     """
     client = get_supabase_client(access_token=access_token)
     
-    try:
-        # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
-    except Exception as e:
-        raise KnownAppError("User not authenticated", status_code=401)
+    user_id = current_user_id(access_token)
+    limit = max(1, min(limit, MAX_CART_PAGE_SIZE))
+    offset = max(0, offset)
     
-    # Get all carts for the user
+    # Get the user's active carts
     cart_response = (
         client
         .table("cart")
         .select("cart_id")
         .eq("customer_id", user_id)
+        .eq("status", "active")
         .execute()
     )
     
-    if not cart_response.data:
-        return []
-    
     cart_ids = [cart["cart_id"] for cart in cart_response.data]
-    
     if not cart_ids:
-        return []
+        return {"items": [], "has_more": False, "next_offset": None}
     
-    # Get all cart items with product details
+    # Get one page of their items with product details
     response = (
         client
         .table("cart_item")
-        .select("cart_item_id, cart_id, variant_id, quantity, product_variant(name, size, color, price, stock, image_url)")
+        .select("cart_item_id, cart_id, quantity, product_variant(name, size, color, price, stock, image_url)")
+        .in_("cart_id", cart_ids)
+        .order("cart_item_id")
+        .range(offset, offset + limit)
         .execute()
     )
+    has_more = len(response.data) > limit
     
-    # Debug logging for image URLs
-    print("Raw database response for cart items:")
-    for item in response.data:
-        if item.get("product_variant"):
-            product = item["product_variant"]
-            print(f"  Product: {product.get('name')} - image_url: {product.get('image_url')}")
-    
-    # Filter cart items for this user and format response
+    # Format response
     cart_items = []
-    for item in response.data:
-        if item.get("cart_id") in cart_ids:
-            product = item["product_variant"]
-            cart_item = {
-                "id": item["cart_item_id"], 
-                "cart_item_id": item["cart_item_id"],
-                "cart_id": item["cart_id"], 
-                "name": product["name"],
-                "size": product["size"],
-                "color": product["color"],
-                "price": product["price"],
-                "quantity": item["quantity"],
-                "stock": product["stock"],
-                "image_url": product.get("image_url")
-            }
-            print(f"Cart item for {product['name']}: image_url = {product.get('image_url')}")
-            cart_items.append(cart_item)
+    for item in response.data[:limit]:
+        product = item["product_variant"]
+        cart_items.append({
+            "id": item["cart_item_id"], 
+            "cart_item_id": item["cart_item_id"],
+            "cart_id": item["cart_id"], 
+            "name": product["name"],
+            "size": product["size"],
+            "color": product["color"],
+            "price": product["price"],
+            "quantity": item["quantity"],
+            "stock": product["stock"],
+            "image_url": product.get("image_url")
+        })
     
-    return cart_items
+    return {"items": cart_items, "has_more": has_more, "next_offset": offset + limit if has_more else None}
 
 
 def update_cart_item(*, cart_item_id, quantity, access_token):
     """
     Update the quantity of a specific cart item.
+
+    Runs the ``update_cart_item`` database function, which applies the new
+    quantity and the stock check in a single statement.
     
     Args:
         cart_item_id (str): The ID of the cart item to update.
@@ -248,7 +139,7 @@ def update_cart_item(*, cart_item_id, quantity, access_token):
         access_token (str): User's access token for authentication.
         
     Returns:
-        dict: The updated cart item data.
+        list: The updated cart item data.
         
     Raises:
         KnownAppError: If cart item not found (404), insufficient stock (400),
@@ -256,57 +147,7 @@ def update_cart_item(*, cart_item_id, quantity, access_token):
     """
     client = get_supabase_client(access_token=access_token)
     try:
-        # Get current cart item information
-        cart_item_response = (
-            client
-            .table("cart_item")
-            .select("variant_id, quantity")
-            .eq("cart_item_id", cart_item_id)
-            .execute()
-        )
-        
-        if not cart_item_response.data:
-            raise KnownAppError("Cart item not found", status_code=404)
-        
-        cart_item = cart_item_response.data[0]
-        variant_id = cart_item["variant_id"]
-        current_quantity = cart_item["quantity"]
-        
-        # Get product variant stock information
-        variant_response = (
-            client
-            .table("product_variant")
-            .select("name, size, color, stock")
-            .eq("variant_id", variant_id)
-            .execute()
-        )
-        
-        if not variant_response.data:
-            raise KnownAppError("Product variant not found", status_code=404)
-        
-        variant = variant_response.data[0]
-        available_stock = variant["stock"]
-        
-        # Calculate if we have enough stock
-        # Account for the current quantity in cart (subtract it from available stock)
-        # since the user might be reducing the quantity
-        stock_needed = quantity - current_quantity
-        
-        if stock_needed > 0 and stock_needed > available_stock:
-            raise KnownAppError(
-                f"Not enough stock available. Requested: {quantity}, Available: {available_stock + current_quantity}",
-                status_code=400
-            )
-        
-        # Update the quantity
-        response = (
-            client
-            .table("cart_item")
-            .update({"quantity": quantity})
-            .eq("cart_item_id", cart_item_id)
-            .execute()
-        )
-        return response.data
+        return [call_rpc(client, "update_cart_item", {"p_cart_item_id": cart_item_id, "p_quantity": quantity})]
     except Exception as e:
         if isinstance(e, KnownAppError):
             raise e
@@ -357,18 +198,7 @@ def get_user_cart(access_token):
         KnownAppError: If user is not authenticated (401 status code)
     """
     client = get_supabase_client(access_token=access_token)
-    try:
-        # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
-    except Exception as e:
-        raise KnownAppError("User not authenticated", status_code=401)
+    user_id = current_user_id(access_token)
 
     # First try to get active cart
     cart_response = (
@@ -402,7 +232,7 @@ def get_user_cart(access_token):
     items_response = (
         client
         .table("cart_item")
-        .select("cart_item_id, variant_id, quantity, product_variant(name, size, color, price, stock)")
+        .select("cart_item_id, quantity, product_variant(name, size, color, price, stock)")
         .eq("cart_id", cart_id)
         .execute()
     )
@@ -6,14 +6,53 @@ placing orders, updating order status, managing order items, and retrieving
 order history. All functions require user authentication via access tokens.
 """
 
-from supabase_client import get_supabase_client
+import base64
+import binascii
+import json
+
+from supabase_client import call_rpc, get_supabase_client
+from core.identity import current_user_id
 from routers.middleware import KnownAppError
 
 
+ORDER_PAGE_SIZE = 20
+MAX_ORDER_PAGE_SIZE = 100
+
+
+def _encode_order_cursor(order):
+    """Encodes the sort key of an order as an opaque page cursor."""
+    key = json.dumps([order["order_date"], order["order_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_order_cursor(cursor):
+    """
+    Decodes a page cursor into its (order_date, order_id) sort key.
+
+    Raises:
+        KnownAppError: If the cursor was not produced by ``get_user_orders`` (400 status code)
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        key = None
+    # The values are quoted into a PostgREST filter, so they may not contain quotes or backslashes.
+    if (
+        not isinstance(key, list)
+        or len(key) != 2
+        or not all(isinstance(value, str) and '"' not in value and "\\" not in value for value in key)
+    ):
+        raise KnownAppError("Invalid order cursor", status_code=400)
+    return key[0], key[1]
+
+
 def place_order(*, access_token):
     """
     Places an order by converting the user's active cart items into an order.
-    This follows the proper schema where orders are created from cart items.
+
+    Runs the ``checkout`` database function, which in one transaction checks
+    and decrements stock, inserts the order and all of its items and closes the
+    cart, so an order is either placed completely or not at all.
 
     Args:
         access_token (str): User's access token for authentication.
@@ -23,120 +62,15 @@ def place_order(*, access_token):
         
     Raises:
         KnownAppError: If user is not authenticated (401), no active cart found (404),
-                      cart is empty (400), or database operation fails (500)
+                      cart is empty or stock is insufficient (400), or database operation fails (500)
     """
     client = get_supabase_client(access_token=access_token)
     
     try:
-        # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
+        # Fail fast on a bad token before calling the database
+        current_user_id(access_token)
         
-        # Get user's active cart
-        cart_response = (
-            client
-            .table("cart")
-            .select("cart_id, status")
-            .eq("customer_id", user_id)
-            .eq("status", "active")
-            .execute()
-        )
-        
-        if not cart_response.data:
-            raise KnownAppError("No active cart found", status_code=404)
-        
-        cart = cart_response.data[0]
-        cart_id = cart["cart_id"]
-        
-        # Get cart items with product details
-        cart_items_response = (
-            client
-            .table("cart_item")
-            .select("cart_item_id, variant_id, quantity, product_variant(name, size, color, price, stock)")
-            .eq("cart_id", cart_id)
-            .execute()
-        )
-        
-        if not cart_items_response.data:
-            raise KnownAppError("Cart is empty", status_code=400)
-        
-        cart_items = cart_items_response.data
-        
-        # Calculate total amount
-        total_amount = 0
-        for item in cart_items:
-            product = item["product_variant"]
-            total_amount += float(product["price"]) * item["quantity"]
-        
-        # Create the order
-        order_data = {
-            "customer_id": user_id,
-            "cart_id": cart_id,
-            "order_date": "now()",  
-            "status": "pending",
-            "total_amount": total_amount
-        }
-        
-        order_response = (
-            client
-            .table("order")
-            .insert(order_data)
-            .execute()
-        )
-        
-        if not order_response.data:
-            raise KnownAppError("Failed to create order", status_code=500)
-        
-        order = order_response.data[0]
-        order_id = order["order_id"]
-        
-        # Create order items from cart items
-        order_items = []
-        for cart_item in cart_items:
-            product = cart_item["product_variant"]
-            order_item_data = {
-                "order_id": order_id,
-                "variant_id": cart_item["variant_id"],
-                "quantity": cart_item["quantity"],
-                "item_price": float(product["price"])
-            }
-            
-            order_item_response = (
-                client
-                .table("order_item")
-                .insert(order_item_data)
-                .execute()
-            )
-            
-            if order_item_response.data:
-                order_items.append(order_item_response.data[0])
-        
-        # Update cart status to "ordered"
-        (
-            client
-            .table("cart")
-            .update({"status": "ordered"})
-            .eq("cart_id", cart_id)
-            .execute()
-        )
-        
-        # Delete all cart items since they've been converted to order items
-        (
-            client
-            .table("cart_item")
-            .delete()
-            .eq("cart_id", cart_id)
-            .execute()
-        )
-        
-        order["items"] = order_items
-        return order
+        return call_rpc(client, "checkout")
         
     except Exception as e:
         if isinstance(e, KnownAppError):
@@ -207,6 +141,9 @@ def delete_order(*, order_id, access_token):
 def update_order_item(*, order_item_id, quantity, item_price, access_token):
     """
     Update the quantity and price of an order item.
+
+    Runs the ``update_order_item`` database function, which applies the change
+    of the item's line amount to the order total in the same transaction.
     
     Args:
         order_item_id (str): The ID of the order item to update.
@@ -215,187 +152,122 @@ def update_order_item(*, order_item_id, quantity, item_price, access_token):
         access_token (str): User's access token for authentication.
         
     Returns:
-        dict: The updated order item data.
+        list: The updated order item data, including the new ``order_total``.
         
     Raises:
-        KnownAppError: If order item not found (404) or database operation fails (500)
+        KnownAppError: If user is not authenticated (401), the quantity or price
+                      is invalid (400), the user has no such order item (404) or
+                      database operation fails (500)
     """
     client = get_supabase_client(access_token=access_token)
     try:
-        # Update the order item
-        response = (
-            client
-            .table("order_item")
-            .update({"quantity": quantity, "item_price": item_price})
-            .eq("order_item_id", order_item_id)
-            .execute()
-        )
-        
-        if not response.data:
-            raise KnownAppError("Order item not found", status_code=404)
-        
-        # Get the order_id for this item
-        order_item_response = (
-            client
-            .table("order_item")
-            .select("order_id")
-            .eq("order_item_id", order_item_id)
-            .execute()
-        )
-        
-        if not order_item_response.data:
-            raise KnownAppError("Order item not found", status_code=404)
-        
-        order_id = order_item_response.data[0]["order_id"]
+        # Fail fast on a bad token before calling the database
+        current_user_id(access_token)
         
-        # Recalculate total amount for the order
-        order_items_response = (
-            client
-            .table("order_item")
-            .select("quantity, item_price")
-            .eq("order_id", order_id)
-            .execute()
-        )
-        
-        total_amount = 0
-        for item in order_items_response.data:
-            total_amount += float(item["item_price"]) * item["quantity"]
-        
-        # Update the order with new total
-        (
-            client
-            .table("order")
-            .update({"total_amount": total_amount})
-            .eq("order_id", order_id)
-            .execute()
-        )
-        
-        return response.data
+        item = call_rpc(client, "update_order_item", {"p_order_item_id": order_item_id, "p_quantity": quantity, "p_item_price": item_price})
+        return [item]
     except Exception as e:
+        if isinstance(e, KnownAppError):
+            raise e
         raise KnownAppError(f"Failed to update order item: {e}", status_code=500)
 
 
 def delete_order_item(*, order_item_id, access_token):
     """
     Delete an order item by its ID.
+
+    Runs the ``delete_order_item`` database function, which subtracts the
+    item's line amount from the order total in the same transaction.
     
     Args:
         order_item_id (str): The ID of the order item to delete.
         access_token (str): User's access token for authentication.
         
     Returns:
-        dict: The deleted order item data.
+        list: The deleted order item data, including the new ``order_total``.
         
     Raises:
-        KnownAppError: If order item not found (404) or database operation fails (500)
+        KnownAppError: If user is not authenticated (401), the user has no such
+                      order item (404) or database operation fails (500)
     """
     client = get_supabase_client(access_token=access_token)
     try:
-        # Get the order_id before deleting the item
-        order_item_response = (
-            client
-            .table("order_item")
-            .select("order_id")
-            .eq("order_item_id", order_item_id)
-            .execute()
-        )
-        
-        if not order_item_response.data:
-            raise KnownAppError("Order item not found", status_code=404)
-        
-        order_id = order_item_response.data[0]["order_id"]
-        
-        # Delete the order item
-        response = (
-            client
-            .table("order_item")
-            .delete()
-            .eq("order_item_id", order_item_id)
-            .execute()
-        )
+        # Fail fast on a bad token before calling the database
+        current_user_id(access_token)
         
-        # Recalculate total amount for the order
-        order_items_response = (
-            client
-            .table("order_item")
-            .select("quantity, item_price")
-            .eq("order_id", order_id)
-            .execute()
-        )
-        
-        total_amount = 0
-        for item in order_items_response.data:
-            total_amount += float(item["item_price"]) * item["quantity"]
-        
-        # Update the order with new total
-        (
-            client
-            .table("order")
-            .update({"total_amount": total_amount})
-            .eq("order_id", order_id)
-            .execute()
-        )
-        
-        return response.data
+        item = call_rpc(client, "delete_order_item", {"p_order_item_id": order_item_id})
+        return [item]
     except Exception as e:
+        if isinstance(e, KnownAppError):
+            raise e
         raise KnownAppError(f"Failed to delete order item: {e}", status_code=500)
 
 
-def get_user_orders(access_token):
+def get_user_orders(access_token, before=None, limit=ORDER_PAGE_SIZE):
     """
-    Get all orders for the authenticated user, including their items.
+    Get one page of the authenticated user's orders, newest first, including their items.
+    
+    Orders and their items are loaded with a single embedded select, so the
+    number of round trips does not depend on how many orders the user has.
+    Pages are keyed on (order_date, order_id), which the ``next_before``
+    cursor of each page carries, so the next page is one more query. One order
+    more than the page size is requested to tell whether another page follows.
     
     Args:
         access_token (str): User's access token for authentication.
+        before (str, optional): The ``next_before`` cursor of the previous page;
+                                only older orders are returned.
+        limit (int, optional): Maximum number of orders to return, at most MAX_ORDER_PAGE_SIZE.
         
     Returns:
-        list: A list of dictionaries containing order information with items.
-              Each order includes order details and a list of order items.
-              Returns empty list if no orders found.
+        dict: The page, with keys:
+              - orders (list): Orders with their details and a list of order
+                items. Empty if no orders found.
+              - has_more (bool): Whether older orders follow this page.
+              - next_before (str or None): Opaque cursor for the next page, or
+                None on the last page.
               
     Raises:
-        KnownAppError: If user is not authenticated (401 status code)
+        KnownAppError: If user is not authenticated (401) or the ``before``
+                      cursor is invalid (400)
     """
     client = get_supabase_client(access_token=access_token)
-    try:
-        # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
-    except Exception as e:
-        raise KnownAppError("User not authenticated", status_code=401)
+    user_id = current_user_id(access_token)
+    limit = max(1, min(limit, MAX_ORDER_PAGE_SIZE))
 
-    # Get all orders for the user, ordered by date (newest first)
-    orders_response = (
+    query = (
         client
         .table("order")
-        .select("order_id, cart_id, order_date, status, total_amount")
+        .select(
+            "order_id, cart_id, order_date, status, total_amount, "
+            "order_item(order_item_id, quantity, item_price, product_variant(name, size, color, stock))"
+        )
         .eq("customer_id", user_id)
+    )
+    if before:
+        order_date, order_id = _decode_order_cursor(before)
+        query = query.or_(
+            f'order_date.lt."{order_date}",'
+            f'and(order_date.eq."{order_date}",order_id.lt."{order_id}")'
+        )
+
+    # Newest first, with order_id breaking ties between orders placed at the same time
+    orders_response = (
+        query
         .order("order_date", desc=True)
+        .order("order_id", desc=True)
+        .limit(limit + 1)
         .execute()
     )
     
     orders = orders_response.data or []
+    has_more = len(orders) > limit
+    orders = orders[:limit]
     
-    # Get order items for each order
+    # Flatten the items for frontend compatibility
     for order in orders:
-        order_id = order["order_id"]
-        items_response = (
-            client
-            .table("order_item")
-            .select("order_item_id, variant_id, quantity, item_price, product_variant(name, size, color, price, stock)")
-            .eq("order_id", order_id)
-            .execute()
-        )
-        
-        # Flatten the items for frontend compatibility
         items = []
-        for item in items_response.data:
+        for item in order.pop("order_item") or []:
             product = item["product_variant"]
             items.append({
                 "id": item["order_item_id"],
@@ -407,6 +279,9 @@ def get_user_orders(access_token):
                 "quantity": item["quantity"],
                 "stock": product["stock"]
             })
-        
         order["items"] = items
-    return orders
\ No newline at end of file
+    return {
+        "orders": orders,
+        "has_more": has_more,
+        "next_before": _encode_order_cursor(orders[-1]) if has_more else None,
+    }
@@ -7,6 +7,7 @@ All functions require user authentication via access tokens.
 """
 
 from supabase_client import get_supabase_client
+from core.identity import current_user_id
 from routers.middleware import KnownAppError
 
 
@@ -29,15 +30,7 @@ def add_to_wishlist(*, variant_id, access_token):
     
     try:
         # Get authenticated user ID
-        user = client.auth.get_user()
-        
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
+        user_id = current_user_id(access_token)
         
         # Check if item already exists in wishlist
         existing_response = (
@@ -95,14 +88,7 @@ def remove_from_wishlist(*, variant_id, access_token):
     
     try:
         # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
+        user_id = current_user_id(access_token)
         
         # Remove item from wishlist
         response = (
@@ -144,14 +130,7 @@ def get_wishlist_items(access_token):
     
     try:
         # Get authenticated user ID
-        user = client.auth.get_user()
-        if not user or not hasattr(user, "user") or not user.user:
-            session = client.auth.get_session()
-            if not session or not session.user:
-                raise KnownAppError("User not authenticated", status_code=401)
-            user_id = session.user.id
-        else:
-            user_id = user.user.id
+        user_id = current_user_id(access_token)
         
         # Get wishlist items with product details
         response = (
@@ -0,0 +1,3 @@
+"""
+Local stand-ins for external services, used for offline benchmarking.
+"""
@@ -0,0 +1,299 @@
+"""
+Record/replay cassettes for OpenAI HTTP exchanges.
+
+A cassette is a JSON Lines file with one recorded exchange per line: the
+request endpoint and body, the response status and body, and how long the real
+call took. RecordingTransport captures exchanges made through an OpenAI client
+and ReplayTransport serves them back without touching the network, optionally
+sleeping to reproduce (or scale) the recorded latency. The same Cassette also
+backs the stand-in HTTP server in ``fakes.openai_server``.
+
+Clients share one Cassette per file through ``open_cassette``. Appends to a
+file are serialized across every Cassette of the process, and a lookup that
+misses first reads whatever other writers have appended since.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed request has no recorded exchange."""
+
+
+_registry_lock = threading.Lock()
+_cassettes: Dict[str, "Cassette"] = {}
+_file_locks: Dict[str, threading.Lock] = {}
+
+
+def _file_lock(path: str) -> threading.Lock:
+    with _registry_lock:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def open_cassette(path: str) -> "Cassette":
+    """
+    Returns the process-wide Cassette for a file, loading it on first use.
+
+    Args:
+        path (str): The JSON Lines file to load from and record to.
+    """
+    key = os.path.abspath(path)
+    with _registry_lock:
+        cassette = _cassettes.get(key)
+    if cassette is None:
+        cassette = Cassette(path)
+        with _registry_lock:
+            cassette = _cassettes.setdefault(key, cassette)
+    return cassette
+
+
+def endpoint_of(path: str) -> str:
+    """
+    Normalizes a request path so that recordings do not depend on the base URL.
+
+    "/v1/responses" and "/openai/v1/responses" both map to "/responses".
+    """
+    marker = path.find("/v1/")
+    return path[marker + 3:] if marker >= 0 else path
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """
+    Returns the lookup key of a request: method, endpoint and canonical JSON body.
+
+    Args:
+        method (str): HTTP method.
+        path (str): Request path.
+        body (bytes): Raw request body.
+
+    Returns:
+        str: A stable hex digest.
+    """
+    try:
+        canonical = json.dumps(json.loads(body or b"null"), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = (body or b"").decode("utf-8", "replace")
+    digest = hashlib.sha256(f"{method.upper()} {endpoint_of(path)} {canonical}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Cassette:
+    """
+    Recorded exchanges, indexed by request key.
+
+    Repeated requests with the same key are answered with the recorded
+    responses in order, cycling once they run out, so a cassette recorded once
+    can drive any number of benchmark iterations.
+
+    Args:
+        path (str): The JSON Lines file to load from and record to.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._exchanges = defaultdict(list)
+        self._cursor = defaultdict(int)
+        self._lock = threading.Lock()
+        # Guards appends to the file and ``_offset``; taken before ``_lock``.
+        self._file_lock = _file_lock(path)
+        # Bytes of the file already read into the index.
+        self._offset = 0
+        with self._file_lock:
+            self._catch_up()
+
+    def load(self, path: str):
+        """Adds the exchanges recorded in another cassette file."""
+        with open(path, encoding="utf-8") as f:
+            exchanges = [json.loads(line) for line in f if line.strip()]
+        self._add(exchanges)
+
+    def _add(self, exchanges):
+        with self._lock:
+            for exchange in exchanges:
+                self._exchanges[exchange["key"]].append(exchange)
+
+    def _catch_up(self):
+        # Reads the complete lines appended to the file since the last call.
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return
+        self._offset += end
+        self._add(json.loads(line) for line in data[:end].decode("utf-8").splitlines() if line.strip())
+
+    def __len__(self) -> int:
+        return sum(len(exchanges) for exchanges in self._exchanges.values())
+
+    def record(self, method: str, path: str, body: bytes, status: int, response_body: bytes, latency: float):
+        """Appends an exchange to the cassette file."""
+        exchange = {
+            "key": request_key(method, path, body),
+            "method": method.upper(),
+            "endpoint": endpoint_of(path),
+            "request": json.loads(body) if body else None,
+            "status": status,
+            "response": json.loads(response_body) if response_body else None,
+            "latency": round(latency, 4),
+        }
+        line = (json.dumps(exchange, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._file_lock:
+            # Index what other writers appended first, so the offset stays in
+            # step with the file.
+            self._catch_up()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._offset += len(line)
+            self._add([exchange])
+
+    def find(self, method: str, path: str, body: bytes) -> Dict[str, Any]:
+        """
+        Returns the next recorded exchange for a request.
+
+        Raises:
+            CassetteMiss: If the request was never recorded.
+        """
+        key = request_key(method, path, body)
+        exchange = self._next(key)
+        if exchange is None:
+            # Another writer may have recorded it since this cassette was read.
+            with self._file_lock:
+                self._catch_up()
+            exchange = self._next(key)
+        if exchange is None:
+            raise CassetteMiss(f"No recorded exchange for {method.upper()} {endpoint_of(path)}")
+        return exchange
+
+    def _next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                return None
+            exchange = exchanges[self._cursor[key] % len(exchanges)]
+            self._cursor[key] += 1
+        return exchange
+
+    def rewind(self):
+        with self._lock:
+            self._cursor.clear()
+
+
+class LatencyModel:
+    """
+    Decides how long a replayed exchange takes.
+
+    Args:
+        scale (float): Multiplier applied to the recorded latency; 0 disables it.
+        fixed (float, optional): Constant latency in seconds, replacing the recorded one.
+        jitter (float): Upper bound of a uniformly distributed extra delay in seconds.
+    """
+
+    def __init__(self, scale: float = 1.0, fixed: Optional[float] = None, jitter: float = 0.0):
+        self.scale = scale
+        self.fixed = fixed
+        self.jitter = jitter
+
+    def delay(self, exchange: Optional[Dict[str, Any]] = None) -> float:
+        if self.fixed is not None:
+            base = self.fixed
+        else:
+            base = (exchange or {}).get("latency", 0.0) * self.scale
+        return base + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+def replay_response(cassette: Cassette, latency: LatencyModel, method: str, path: str, body: bytes):
+    """
+    Looks up a request and waits out its latency.
+
+    Returns:
+        tuple: (status code, JSON response body as bytes).
+    """
+    try:
+        exchange = cassette.find(method, path, body)
+    except CassetteMiss as e:
+        return 404, json.dumps({"error": {"message": str(e), "type": "cassette_miss"}}).encode("utf-8")
+    delay = latency.delay(exchange)
+    if delay > 0:
+        time.sleep(delay)
+    return exchange["status"], json.dumps(exchange["response"]).encode("utf-8")
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """httpx transport that forwards requests and records every JSON exchange."""
+
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        content = response.read()
+        latency = time.perf_counter() - start
+        if "json" in response.headers.get("content-type", ""):
+            self.cassette.record(request.method, request.url.path, body, response.status_code, content, latency)
+        # The body has already been decoded, so drop the encoding headers.
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """httpx transport that answers requests from a cassette without network access."""
+
+    def __init__(self, cassette: Cassette, latency: Optional[LatencyModel] = None):
+        self.cassette = cassette
+        self.latency = latency or LatencyModel()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status, content = replay_response(self.cassette, self.latency, request.method, request.url.path, request.read())
+        return httpx.Response(status, headers={"content-type": "application/json"}, content=content, request=request)
+
+
+def cassette_transport(mode: str, path: str, latency_scale: float = 1.0, fixed_latency: Optional[float] = None) -> Optional[httpx.BaseTransport]:
+    """
+    Builds the transport for a cassette mode.
+
+    Args:
+        mode (str): "record", "replay", or empty for none.
+        path (str): Cassette file.
+        latency_scale (float): Replay latency multiplier.
+        fixed_latency (float, optional): Constant replay latency in seconds.
+
+    Returns:
+        httpx.BaseTransport or None: The transport, or None when cassettes are off.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if not mode:
+        return None
+    cassette = open_cassette(path)
+    if mode == "record":
+        return RecordingTransport(cassette)
+    if mode == "replay":
+        return ReplayTransport(cassette, LatencyModel(latency_scale, fixed_latency))
+    raise ValueError(f"Unknown cassette mode: {mode}")
+
@@ -0,0 +1,196 @@
+"""
+SQLite stand-ins for the database functions in ``sql/functions.sql``.
+
+Each function is called by the Supabase stand-in as ``fn(conn, user_id,
+params)`` inside one IMMEDIATE transaction, so raising rolls back everything
+it wrote, as a failed Postgres function would. Client errors are raised with
+the same PTxxx codes and messages as the SQL versions.
+"""
+
+from typing import Any, Dict, Optional
+
+from fakes.supabase_server import PostgrestError
+
+
+def _require_user(user_id: Optional[str]) -> str:
+    if user_id is None:
+        raise PostgrestError("User not authenticated", 401, "PT401")
+    return user_id
+
+
+def _require_quantity(quantity: Any) -> int:
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        raise PostgrestError("Quantity must be at least 1", 400, "PT400")
+    return quantity
+
+
+def checkout(conn, user_id: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = _require_user(user_id)
+    cart = conn.execute(
+        "SELECT cart_id FROM cart WHERE customer_id = ? AND status = 'active' ORDER BY created_at DESC LIMIT 1",
+        (user_id,),
+    ).fetchone()
+    if cart is None:
+        raise PostgrestError("No active cart found", 404, "PT404")
+    cart_id = cart["cart_id"]
+
+    # The transaction holds SQLite's write lock, which stands in for the row locks.
+    item_ids = [
+        row["cart_item_id"]
+        for row in conn.execute(
+            "SELECT ci.cart_item_id FROM cart_item ci JOIN cart c USING (cart_id)"
+            " WHERE ci.cart_id = ? AND c.customer_id = ? ORDER BY ci.cart_item_id",
+            (cart_id, user_id),
+        ).fetchall()
+    ]
+    if not item_ids:
+        raise PostgrestError("Cart is empty", 400, "PT400")
+    ordered = f"cart_item_id IN ({', '.join('?' * len(item_ids))})"
+
+    lines = conn.execute(
+        "SELECT ci.variant_id, ci.quantity, pv.price FROM cart_item ci"
+        f" JOIN product_variant pv USING (variant_id) WHERE ci.{ordered}",
+        item_ids,
+    ).fetchall()
+    wanted = {}
+    for line in lines:
+        wanted[line["variant_id"]] = wanted.get(line["variant_id"], 0) + line["quantity"]
+
+    short = conn.execute(
+        f"SELECT variant_id, name, size, color, stock FROM product_variant WHERE variant_id IN ({', '.join('?' * len(wanted))})"
+        " ORDER BY variant_id",
+        list(wanted),
+    ).fetchall()
+    short = [row for row in short if row["stock"] < wanted[row["variant_id"]]]
+    if short:
+        names = ", ".join(f"{row['name']} ({row['size']}, {row['color']})" for row in short)
+        raise PostgrestError(f"Insufficient stock for {names}", 400, "PT400")
+
+    total = round(sum(float(line["price"]) * line["quantity"] for line in lines), 2)
+    order = dict(conn.execute(
+        "INSERT INTO \"order\" (customer_id, cart_id, status, total_amount) VALUES (?, ?, 'pending', ?) RETURNING *",
+        (user_id, cart_id, total),
+    ).fetchone())
+    items = [
+        dict(conn.execute(
+            "INSERT INTO order_item (order_id, variant_id, quantity, item_price) VALUES (?, ?, ?, ?) RETURNING *",
+            (order["order_id"], line["variant_id"], line["quantity"], line["price"]),
+        ).fetchone())
+        for line in lines
+    ]
+    conn.executemany(
+        "UPDATE product_variant SET stock = stock - ? WHERE variant_id = ?",
+        [(quantity, variant_id) for variant_id, quantity in wanted.items()],
+    )
+    conn.execute("UPDATE cart SET status = 'ordered' WHERE cart_id = ? AND customer_id = ?", (cart_id, user_id))
+    conn.execute(f"DELETE FROM cart_item WHERE {ordered}", item_ids)
+    order["items"] = items
+    return order
+
+
+def add_to_cart(conn, user_id: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = _require_user(user_id)
+    variant_id = params.get("p_variant_id")
+    quantity = _require_quantity(params.get("p_quantity"))
+    variant = conn.execute("SELECT stock FROM product_variant WHERE variant_id = ?", (variant_id,)).fetchone()
+    if variant is None:
+        raise PostgrestError("Product variant not found", 404, "PT404")
+    stock = variant["stock"]
+    if quantity > stock:
+        raise PostgrestError(f"Insufficient stock. Available: {stock}, Requested: {quantity}", 400, "PT400")
+
+    conn.execute(
+        "INSERT INTO cart (customer_id, status) VALUES (?, 'active')"
+        " ON CONFLICT (customer_id) WHERE status = 'active' DO NOTHING",
+        (user_id,),
+    )
+    cart_id = conn.execute("SELECT cart_id FROM cart WHERE customer_id = ? AND status = 'active'", (user_id,)).fetchone()["cart_id"]
+
+    item = conn.execute(
+        "INSERT INTO cart_item (cart_id, variant_id, quantity) VALUES (?, ?, ?)"
+        " ON CONFLICT (cart_id, variant_id) DO UPDATE SET quantity = cart_item.quantity + excluded.quantity"
+        " WHERE cart_item.quantity + excluded.quantity <= ? RETURNING *",
+        (cart_id, variant_id, quantity, stock),
+    ).fetchone()
+    if item is None:
+        current = conn.execute("SELECT quantity FROM cart_item WHERE cart_id = ? AND variant_id = ?", (cart_id, variant_id)).fetchone()
+        raise PostgrestError(
+            f"Insufficient stock for updated quantity. Available: {stock}, Requested: {current['quantity'] + quantity}", 400, "PT400"
+        )
+    return dict(item)
+
+
+def update_cart_item(conn, user_id: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = _require_user(user_id)
+    cart_item_id = params.get("p_cart_item_id")
+    quantity = _require_quantity(params.get("p_quantity"))
+    item = conn.execute(
+        "UPDATE cart_item SET quantity = ? WHERE cart_item_id = ?"
+        " AND cart_id IN (SELECT cart_id FROM cart WHERE customer_id = ?)"
+        " AND ? <= (SELECT stock FROM product_variant WHERE product_variant.variant_id = cart_item.variant_id)"
+        " RETURNING *",
+        (quantity, cart_item_id, user_id, quantity),
+    ).fetchone()
+    if item is not None:
+        return dict(item)
+
+    variant = conn.execute(
+        "SELECT pv.stock FROM cart_item ci JOIN cart c USING (cart_id) JOIN product_variant pv USING (variant_id)"
+        " WHERE ci.cart_item_id = ? AND c.customer_id = ?",
+        (cart_item_id, user_id),
+    ).fetchone()
+    if variant is None:
+        raise PostgrestError("Cart item not found", 404, "PT404")
+    raise PostgrestError(f"Not enough stock available. Requested: {quantity}, Available: {variant['stock']}", 400, "PT400")
+
+
+def _apply_order_delta(conn, order_id: str, delta: float) -> Optional[float]:
+    row = conn.execute(
+        "UPDATE \"order\" SET total_amount = ROUND(total_amount + ?, 2) WHERE order_id = ? RETURNING total_amount",
+        (delta, order_id),
+    ).fetchone()
+    return row["total_amount"] if row is not None else None
+
+
+def update_order_item(conn, user_id: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = _require_user(user_id)
+    quantity = _require_quantity(params.get("p_quantity"))
+    price = params.get("p_item_price")
+    if not isinstance(price, (int, float)) or isinstance(price, bool) or price < 0:
+        raise PostgrestError("Item price must not be negative", 400, "PT400")
+    old = conn.execute(
+        "SELECT oi.* FROM order_item oi JOIN \"order\" o USING (order_id) WHERE oi.order_item_id = ? AND o.customer_id = ?",
+        (params.get("p_order_item_id"), user_id),
+    ).fetchone()
+    if old is None:
+        raise PostgrestError("Order item not found", 404, "PT404")
+    item = dict(conn.execute(
+        "UPDATE order_item SET quantity = ?, item_price = ? WHERE order_item_id = ? RETURNING *",
+        (quantity, price, old["order_item_id"]),
+    ).fetchone())
+    delta = item["quantity"] * float(item["item_price"]) - old["quantity"] * float(old["item_price"])
+    item["order_total"] = _apply_order_delta(conn, item["order_id"], delta)
+    return item
+
+
+def delete_order_item(conn, user_id: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = _require_user(user_id)
+    row = conn.execute(
+        "DELETE FROM order_item WHERE order_item_id = ?"
+        " AND order_id IN (SELECT order_id FROM \"order\" WHERE customer_id = ?) RETURNING *",
+        (params.get("p_order_item_id"), user_id),
+    ).fetchone()
+    if row is None:
+        raise PostgrestError("Order item not found", 404, "PT404")
+    item = dict(row)
+    item["order_total"] = _apply_order_delta(conn, item["order_id"], -item["quantity"] * float(item["item_price"]))
+    return item
+
+
+FUNCTIONS = {
+    "checkout": checkout,
+    "add_to_cart": add_to_cart,
+    "update_cart_item": update_cart_item,
+    "update_order_item": update_order_item,
+    "delete_order_item": delete_order_item,
+}
@@ -0,0 +1,261 @@
+"""
+Stand-in OpenAI HTTP server.
+
+Serves the Responses and Embeddings endpoints either from recorded cassettes
+or from a script, so a full application process can run without network
+access:
+
+    python -m fakes.openai_server --cassette data/cassettes/chat.jsonl --port 8089
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn main:app
+
+In cassette mode requests are matched against the recorded exchanges exactly
+as the in-process ReplayTransport does, and the recorded latency is reproduced
+(scaled or fixed via the command line options). Unknown requests get a 404
+error body.
+
+In scripted mode (used by the load tests) each user message is matched
+against a list of rules; a rule lists the tool calls to make, in order, and
+the final reply. Embeddings are deterministic pseudo-random vectors.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fakes.cassette import Cassette, LatencyModel, endpoint_of, replay_response
+
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class ScriptedResponder:
+    """
+    Answers Responses and Embeddings requests from a script.
+
+    A script is a list of rules such as::
+
+        {"match": "black", "steps": [{"call": "get_t_shirt", "arguments": {...}}], "reply": "{{table_1}}"}
+
+    The first rule whose ``match`` is a substring of the latest user message
+    (case-insensitive) is used; an empty ``match`` matches everything. The
+    rule's steps are issued one per request, counting the tool outputs already
+    present after that user message, and the reply is sent once they are done.
+
+    Args:
+        script (list): The rules.
+        latency (LatencyModel, optional): Delay applied to every request.
+    """
+
+    def __init__(self, script: List[Dict[str, Any]], latency: Optional[LatencyModel] = None):
+        self.script = script
+        self.latency = latency or LatencyModel(fixed=0.0)
+
+    def __call__(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        delay = self.latency.delay()
+        if delay > 0:
+            time.sleep(delay)
+        request = json.loads(body or b"{}")
+        endpoint = endpoint_of(path)
+        if endpoint == "/embeddings":
+            return 200, json.dumps(self._embeddings(request)).encode("utf-8")
+        if endpoint == "/responses":
+            return 200, json.dumps(self._response(request)).encode("utf-8")
+        return 404, json.dumps({"error": {"message": f"Unsupported endpoint {endpoint}"}}).encode("utf-8")
+
+    def _rule(self, user_message: str) -> Dict[str, Any]:
+        text = user_message.lower()
+        for rule in self.script:
+            if rule.get("match", "").lower() in text:
+                return rule
+        return {"steps": [], "reply": "How can I help you today?"}
+
+    def _response(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        items = request.get("input") or []
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        last_user = max((i for i, item in enumerate(items) if item.get("role") == "user"), default=-1)
+        user_message = items[last_user].get("content", "") if last_user >= 0 else ""
+        if isinstance(user_message, list):
+            user_message = " ".join(part.get("text", "") for part in user_message)
+        done = sum(1 for item in items[last_user + 1:] if item.get("type") == "function_call_output")
+
+        rule = self._rule(user_message)
+        steps = rule.get("steps", [])
+        offered = {tool.get("name") for tool in request.get("tools") or []}
+        if done < len(steps):
+            step = steps[done]
+            name = step["call"] if step["call"] in offered or not offered else "request_all_tools"
+            arguments = step.get("arguments", {}) if name == step["call"] else {}
+            call_id = uuid.uuid4().hex[:24]
+            output = {
+                "type": "function_call",
+                "id": f"fc_{call_id}",
+                "call_id": f"call_{call_id}",
+                "name": name,
+                "arguments": json.dumps(arguments),
+                "status": "completed",
+            }
+        else:
+            output = {
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": rule.get("reply", ""), "annotations": []}],
+            }
+        input_tokens = len(json.dumps(items)) // 4
+        output_tokens = len(json.dumps(output)) // 4
+        return {
+            "id": f"resp_{uuid.uuid4().hex[:24]}",
+            "object": "response",
+            "created_at": 0,
+            "status": "completed",
+            "model": request.get("model", ""),
+            "output": [output],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    def _embeddings(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        texts = request.get("input")
+        if isinstance(texts, str):
+            texts = [texts]
+        data = []
+        for index, text in enumerate(texts or []):
+            seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "big")
+            rng = random.Random(seed)
+            vector = [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+            if request.get("encoding_format") == "base64":
+                embedding = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        return {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", ""),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+
+def cassette_responder(cassette: Cassette, latency: LatencyModel) -> Callable[[str, str, bytes], Tuple[int, bytes]]:
+    return lambda method, path, body: replay_response(cassette, latency, method, path, body)
+
+
+def make_handler(respond: Callable[[str, str, bytes], Tuple[int, bytes]]):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            status, content = respond("POST", self.path, body)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+class OpenAIStandIn:
+    """
+    OpenAI stand-in server running on a background thread.
+
+    Args:
+        cassettes (list, optional): Cassette files to replay; later files add to earlier ones.
+        script (list, optional): Scripted rules, used instead of cassettes.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free port.
+        latency (LatencyModel, optional): Response latency; defaults to the
+                                          recorded latency for cassettes and none for scripts.
+    """
+
+    def __init__(self, cassettes: Optional[List[str]] = None, script: Optional[List[Dict[str, Any]]] = None, host: str = "127.0.0.1", port: int = 0, latency: Optional[LatencyModel] = None):
+        if script is not None:
+            self.cassette = None
+            respond = ScriptedResponder(script, latency)
+        elif cassettes:
+            self.cassette = Cassette(cassettes[0])
+            for path in cassettes[1:]:
+                self.cassette.load(path)
+            respond = cassette_responder(self.cassette, latency or LatencyModel())
+        else:
+            raise ValueError("Either cassettes or a script is required")
+        self.server = ThreadingHTTPServer((host, port), make_handler(respond))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "OpenAIStandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="openai-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded or scripted OpenAI exchanges over HTTP.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--cassette", action="append", help="Cassette file; may be repeated")
+    source.add_argument("--script", help="JSON file with scripted rules, or a scenario file with a chat_script")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latencies")
+    parser.add_argument("--fixed-latency", type=float, default=None, help="Constant latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniformly distributed latency in seconds")
+    args = parser.parse_args()
+
+    latency = LatencyModel(args.latency_scale, args.fixed_latency, args.jitter)
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+        if isinstance(script, dict):
+            script = script["chat_script"]
+        stand_in = OpenAIStandIn(script=script, host=args.host, port=args.port, latency=latency)
+        print(f"Serving {len(script)} scripted rules on {stand_in.base_url}")
+    else:
+        stand_in = OpenAIStandIn(args.cassette, host=args.host, port=args.port, latency=latency)
+        print(f"Replaying {len(stand_in.cassette)} exchanges on {stand_in.base_url}")
+    try:
+        stand_in.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
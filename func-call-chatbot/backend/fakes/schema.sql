@@ -0,0 +1,63 @@
+-- SQLite schema of the store tables, used by the Supabase stand-in.
+-- Mirrors the Supabase (Postgres) tables queried by the data layer.
+
+CREATE TABLE IF NOT EXISTS auth_user (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS product_variant (
+    variant_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    name TEXT NOT NULL,
+    size TEXT NOT NULL,
+    color TEXT NOT NULL,
+    price NUMERIC NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0,
+    image_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cart (
+    cart_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    customer_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS cart_customer_status_idx ON cart (customer_id, status);
+CREATE UNIQUE INDEX IF NOT EXISTS cart_one_active_per_customer ON cart (customer_id) WHERE status = 'active';
+
+CREATE TABLE IF NOT EXISTS cart_item (
+    cart_item_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    cart_id TEXT NOT NULL REFERENCES cart (cart_id) ON DELETE CASCADE,
+    variant_id TEXT NOT NULL REFERENCES product_variant (variant_id),
+    quantity INTEGER NOT NULL CHECK (quantity > 0)
+);
+CREATE INDEX IF NOT EXISTS cart_item_cart_idx ON cart_item (cart_id);
+CREATE UNIQUE INDEX IF NOT EXISTS cart_item_cart_variant_key ON cart_item (cart_id, variant_id);
+
+CREATE TABLE IF NOT EXISTS "order" (
+    order_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    customer_id TEXT NOT NULL,
+    cart_id TEXT REFERENCES cart (cart_id),
+    order_date TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    status TEXT NOT NULL DEFAULT 'pending',
+    total_amount NUMERIC NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS order_customer_date_idx ON "order" (customer_id, order_date DESC, order_id DESC);
+
+CREATE TABLE IF NOT EXISTS order_item (
+    order_item_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    order_id TEXT NOT NULL REFERENCES "order" (order_id) ON DELETE CASCADE,
+    variant_id TEXT NOT NULL REFERENCES product_variant (variant_id),
+    quantity INTEGER NOT NULL,
+    item_price NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS order_item_order_idx ON order_item (order_id);
+
+CREATE TABLE IF NOT EXISTS wishlist (
+    id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    customer_id TEXT NOT NULL,
+    variant_id TEXT NOT NULL REFERENCES product_variant (variant_id),
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
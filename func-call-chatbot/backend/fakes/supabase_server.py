@@ -0,0 +1,607 @@
+"""
+In-process Supabase stand-in backed by SQLite.
+
+Implements the slice of PostgREST and GoTrue that the data layer uses, so the
+application can be load-tested without a Supabase project:
+
+- ``/rest/v1/<table>``: select with column lists and embedded resources,
+  ``eq``/``neq``/``gt``/``gte``/``lt``/``lte``/``like``/``ilike``/``in``/``is``
+  filters, ``or``/``and`` groups, ``order``, ``limit``/``offset``, inserts,
+  upserts, updates and deletes returning the affected rows.
+- ``/rest/v1/rpc/<function>``: Python stand-ins for database functions; the
+  ones in ``fakes/functions.py`` are always available and more can be
+  registered with ``SupabaseStandIn.rpc``.
+- ``/auth/v1/token``, ``/auth/v1/user``, ``/auth/v1/logout``: password sign-in,
+  refresh and user lookup with HS256 JWTs.
+
+The schema lives in ``fakes/schema.sql`` and the demo catalog in
+``fakes/catalog.json``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import jwt
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+FAKES_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(FAKES_DIR, "schema.sql")
+CATALOG_PATH = os.path.join(FAKES_DIR, "catalog.json")
+
+DEFAULT_JWT_SECRET = "stand-in-jwt-secret-with-at-least-32-bytes"
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+class PostgrestError(Exception):
+    """An error returned to the client in PostgREST's JSON error format."""
+
+    def __init__(self, message: str, status_code: int = 400, code: str = "PGRST100"):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.code = code
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Splits on a separator, ignoring separators inside parentheses or quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == separator and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parse_list(value: str) -> List[str]:
+    if not (value.startswith("(") and value.endswith(")")):
+        raise PostgrestError(f"Invalid list: {value}")
+    return [item.strip('"') for item in _split_top_level(value[1:-1])]
+
+
+class Database:
+    """A SQLite database with the store schema and table metadata for query building."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.lock = threading.RLock()
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            self.conn.executescript(f.read())
+        self.columns = {}
+        self.primary_keys = {}
+        self.foreign_keys = {}
+        for (table,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+            info = self.conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+            self.columns[table] = [row["name"] for row in info]
+            self.primary_keys[table] = next((row["name"] for row in info if row["pk"]), None)
+            self.foreign_keys[table] = {
+                row["table"]: row["from"]
+                for row in self.conn.execute(f"PRAGMA foreign_key_list({_quote(table)})").fetchall()
+            }
+
+    def check_table(self, table: str):
+        if table not in self.columns or table == "auth_user":
+            raise PostgrestError(f'relation "public.{table}" does not exist', 404, "42P01")
+
+    def check_column(self, table: str, column: str):
+        if column not in self.columns[table]:
+            raise PostgrestError(f'column {table}.{column} does not exist', 400, "42703")
+
+    def query(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def transaction(self):
+        """Returns a context manager that runs a block in one IMMEDIATE transaction."""
+        return _Transaction(self)
+
+
+class _Transaction:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def __enter__(self):
+        self.db.lock.acquire()
+        self.db.conn.execute("BEGIN IMMEDIATE")
+        return self.db.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.lock.release()
+
+
+class Query:
+    """Translates one PostgREST request on a table into SQL."""
+
+    def __init__(self, db: Database, table: str, params):
+        db.check_table(table)
+        self.db = db
+        self.table = table
+        self.params = params
+
+    # Filters
+
+    def _condition(self, column: str, expression: str, args: list) -> str:
+        negate = expression.startswith("not.")
+        if negate:
+            expression = expression[4:]
+        operator, _, value = expression.partition(".")
+        self.db.check_column(self.table, column)
+        column_sql = _quote(column)
+        if operator == "in":
+            items = _parse_list(value)
+            args.extend(items)
+            sql = f"{column_sql} IN ({', '.join('?' for _ in items)})" if items else "0"
+        elif operator == "is":
+            keyword = {"null": "NULL", "true": "1", "false": "0"}.get(value.lower())
+            if keyword is None:
+                raise PostgrestError(f"Invalid is value: {value}")
+            sql = f"{column_sql} IS {keyword}"
+        elif operator in OPERATORS:
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                # Quoted values may contain reserved characters like "," and ":".
+                value = value[1:-1]
+            if operator in ("like", "ilike"):
+                value = value.replace("*", "%")
+            args.append(None if value == "null" else value)
+            sql = f"{column_sql} {OPERATORS[operator]} ?"
+        else:
+            raise PostgrestError(f"Unsupported operator: {operator}")
+        return f"NOT ({sql})" if negate else sql
+
+    def _logic(self, operator: str, value: str, args: list) -> str:
+        conditions = []
+        for part in _split_top_level(_parse_group(value)):
+            if part.startswith(("or(", "and(", "not.or(", "not.and(")):
+                negate = part.startswith("not.")
+                inner = part[4:] if negate else part
+                name, _, rest = inner.partition("(")
+                sql = self._logic(name, "(" + rest, args)
+                conditions.append(f"NOT {sql}" if negate else sql)
+            else:
+                column, _, expression = part.partition(".")
+                conditions.append(self._condition(column, expression, args))
+        joiner = " OR " if operator == "or" else " AND "
+        return "(" + joiner.join(conditions) + ")"
+
+    def where(self, args: list) -> str:
+        conditions = []
+        for key, value in self.params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                conditions.append(self._logic(key, value, args))
+            elif "." in key:
+                raise PostgrestError(f"Filters on embedded resources are not supported: {key}")
+            else:
+                conditions.append(self._condition(key, value, args))
+        return (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    def order_limit(self) -> str:
+        sql = ""
+        if self.params.get("order"):
+            terms = []
+            for term in self.params["order"].split(","):
+                column, *modifiers = term.strip().split(".")
+                self.db.check_column(self.table, column)
+                direction = "DESC" if "desc" in modifiers else "ASC"
+                terms.append(f"{_quote(column)} {direction}")
+            sql += " ORDER BY " + ", ".join(terms)
+        if self.params.get("limit"):
+            sql += f" LIMIT {int(self.params['limit'])}"
+            if self.params.get("offset"):
+                sql += f" OFFSET {int(self.params['offset'])}"
+        return sql
+
+    # Select and embedding
+
+    def select(self, select: Optional[str] = None) -> List[Dict[str, Any]]:
+        columns, embeds = self._parse_select(self.table, select or self.params.get("select") or "*")
+        args = []
+        sql = f"SELECT * FROM {_quote(self.table)}{self.where(args)}{self.order_limit()}"
+        rows = self.db.query(sql, args)
+        return self.shape(self.table, rows, columns, embeds)
+
+    def _parse_select(self, table: str, select: str):
+        columns, embeds = [], []
+        for item in _split_top_level(select):
+            if "(" in item:
+                name, _, inner = item.partition("(")
+                alias, _, relation = name.rpartition(":")
+                relation = relation.strip().split("!")[0]
+                self.db.check_table(relation)
+                embeds.append((alias.strip() or relation, relation, inner[:-1]))
+            elif item == "*":
+                columns.extend(self.db.columns[table])
+            else:
+                alias, _, column = item.rpartition(":")
+                column = column.strip().split("::")[0]
+                self.db.check_column(table, column)
+                columns.append((alias.strip(), column) if alias else column)
+        return columns, embeds
+
+    def shape(self, table: str, rows: List[Dict[str, Any]], columns, embeds) -> List[Dict[str, Any]]:
+        shaped = []
+        for row in rows:
+            out = {}
+            for column in columns:
+                if isinstance(column, tuple):
+                    out[column[0]] = row[column[1]]
+                else:
+                    out[column] = row[column]
+            shaped.append(out)
+        for name, relation, inner in embeds:
+            self._embed(table, rows, shaped, name, relation, inner)
+        return shaped
+
+    def _embed(self, table, rows, shaped, name, relation, inner):
+        inner_columns, inner_embeds = self._parse_select(relation, inner or "*")
+        if relation in self.db.foreign_keys[table]:
+            # Many-to-one: the row references the embedded table.
+            local = self.db.foreign_keys[table][relation]
+            remote = self.db.primary_keys[relation]
+            keys = list({row[local] for row in rows if row[local] is not None})
+            related = self._fetch(relation, remote, keys)
+            by_key = {row[remote]: row for row in related}
+            shaped_related = dict(zip(
+                (row[remote] for row in related),
+                self.shape(relation, related, inner_columns, inner_embeds),
+            ))
+            for row, out in zip(rows, shaped):
+                out[name] = shaped_related.get(row[local]) if row[local] in by_key else None
+        elif table in self.db.foreign_keys[relation]:
+            # One-to-many: the embedded table references the row.
+            remote = self.db.foreign_keys[relation][table]
+            local = self.db.primary_keys[table]
+            related = self._fetch(relation, remote, [row[local] for row in rows])
+            shaped_related = self.shape(relation, related, inner_columns, inner_embeds)
+            children = {}
+            for row, out in zip(related, shaped_related):
+                children.setdefault(row[remote], []).append(out)
+            for row, out in zip(rows, shaped):
+                out[name] = children.get(row[local], [])
+        else:
+            raise PostgrestError(f"Could not find a relationship between '{table}' and '{relation}'", 400, "PGRST200")
+
+    def _fetch(self, table, column, keys):
+        if not keys:
+            return []
+        placeholders = ", ".join("?" for _ in keys)
+        return self.db.query(f"SELECT * FROM {_quote(table)} WHERE {_quote(column)} IN ({placeholders})", keys)
+
+    # Writes
+
+    def _values(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        values = {}
+        for column, value in row.items():
+            self.db.check_column(self.table, column)
+            values[column] = now_iso() if value == "now()" else value
+        return values
+
+    def insert(self, rows: List[Dict[str, Any]], upsert: bool = False, on_conflict: Optional[str] = None) -> List[Dict[str, Any]]:
+        inserted = []
+        with self.db.transaction() as conn:
+            for row in rows:
+                values = self._values(row)
+                columns = ", ".join(_quote(column) for column in values)
+                placeholders = ", ".join("?" for _ in values)
+                sql = f"INSERT INTO {_quote(self.table)} ({columns}) VALUES ({placeholders})"
+                if upsert:
+                    target = on_conflict or self.db.primary_keys[self.table]
+                    updates = ", ".join(f"{_quote(column)} = excluded.{_quote(column)}" for column in values)
+                    sql += f" ON CONFLICT ({target}) DO UPDATE SET {updates}"
+                inserted.extend(dict(r) for r in conn.execute(sql + " RETURNING *", list(values.values())).fetchall())
+        return inserted
+
+    def update(self, patch: Dict[str, Any]) -> List[Dict[str, Any]]:
+        values = self._values(patch)
+        args = list(values.values())
+        assignments = ", ".join(f"{_quote(column)} = ?" for column in values)
+        sql = f"UPDATE {_quote(self.table)} SET {assignments}{self.where(args)} RETURNING *"
+        with self.db.transaction() as conn:
+            return [dict(row) for row in conn.execute(sql, args).fetchall()]
+
+    def delete(self) -> List[Dict[str, Any]]:
+        args = []
+        sql = f"DELETE FROM {_quote(self.table)}{self.where(args)} RETURNING *"
+        with self.db.transaction() as conn:
+            return [dict(row) for row in conn.execute(sql, args).fetchall()]
+
+
+def _parse_group(value: str) -> str:
+    if not (value.startswith("(") and value.endswith(")")):
+        raise PostgrestError(f"Invalid logic tree: {value}")
+    return value[1:-1]
+
+
+class SupabaseStandIn:
+    """
+    Supabase stand-in serving PostgREST and GoTrue endpoints from SQLite.
+
+    Args:
+        db_path (str): SQLite database path; ":memory:" by default.
+        jwt_secret (str): Secret used to sign and verify access tokens.
+        latency (float): Seconds added to every request, to mimic a network hop.
+        seed_catalog (bool): Load the demo catalog from ``fakes/catalog.json``.
+    """
+
+    def __init__(self, db_path: str = ":memory:", jwt_secret: str = DEFAULT_JWT_SECRET, latency: float = 0.0, seed_catalog: bool = True):
+        self.db = Database(db_path)
+        self.jwt_secret = jwt_secret
+        self.latency = latency
+        # Imported here because the functions raise this module's PostgrestError.
+        from fakes.functions import FUNCTIONS
+        self.rpcs = dict(FUNCTIONS)
+        self.request_counts = {}
+        # The most recent requests, for tests that check what was sent.
+        self.request_log = deque(maxlen=1000)
+        self._counts_lock = threading.Lock()
+        self.server = None
+        self._thread = None
+        if seed_catalog:
+            with open(CATALOG_PATH, encoding="utf-8") as f:
+                self.seed("product_variant", json.load(f))
+        self.app = Starlette(routes=[
+            Route("/rest/v1/rpc/{name}", self._rpc, methods=["POST"]),
+            Route("/rest/v1/{table}", self._table, methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]),
+            Route("/auth/v1/token", self._token, methods=["POST"]),
+            Route("/auth/v1/user", self._user, methods=["GET"]),
+            Route("/auth/v1/logout", self._logout, methods=["POST"]),
+        ])
+
+    # Setup
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]):
+        """Inserts rows directly, bypassing the HTTP layer."""
+        Query(self.db, table, _Params({})).insert(rows)
+
+    def create_user(self, email: str, password: str) -> str:
+        """Creates a user that can sign in with a password and returns its id."""
+        user_id = str(uuid.uuid4())
+        with self.db.transaction() as conn:
+            conn.execute("INSERT INTO auth_user (id, email, password) VALUES (?, ?, ?)", (user_id, email, password))
+        return user_id
+
+    def rpc(self, name: str):
+        """
+        Registers a Python stand-in for a database function.
+
+        The function is called as ``fn(conn, user_id, params)`` inside a single
+        transaction and its return value is sent back as JSON.
+        """
+        def register(fn: Callable):
+            self.rpcs[name] = fn
+            return fn
+        return register
+
+    def issue_token(self, user: Dict[str, Any], ttl_seconds: int = 3600) -> str:
+        now = int(time.time())
+        payload = {
+            "sub": user["id"],
+            "email": user["email"],
+            "role": "authenticated",
+            "aud": "authenticated",
+            "iat": now,
+            "exp": now + ttl_seconds,
+        }
+        return jwt.encode(payload, self.jwt_secret, algorithm="HS256")
+
+    def anon_key(self) -> str:
+        return jwt.encode({"role": "anon", "iss": "supabase-stand-in", "iat": int(time.time())}, self.jwt_secret, algorithm="HS256")
+
+    # Request handling
+
+    def _count(self, key: str, params=None):
+        with self._counts_lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+            self.request_log.append((key, params))
+
+    def _user_id(self, request: Request) -> Optional[str]:
+        header = request.headers.get("authorization", "")
+        if not header.startswith("Bearer "):
+            return None
+        try:
+            payload = jwt.decode(header[7:], self.jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except jwt.PyJWTError:
+            return None
+        return payload.get("sub")
+
+    def _pause(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _respond(self, request: Request, rows: List[Dict[str, Any]], status_code: int = 200):
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return Response(status_code=204 if status_code == 200 else status_code)
+        if SINGLE_OBJECT in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return _error(PostgrestError("JSON object requested, multiple (or no) rows returned", 406, "PGRST116"))
+            return JSONResponse(rows[0], status_code=status_code)
+        headers = {"Content-Range": f"0-{max(len(rows) - 1, 0)}/{len(rows) if 'count=' in request.headers.get('prefer', '') else '*'}"}
+        return JSONResponse(rows, status_code=status_code, headers=headers)
+
+    async def _table(self, request: Request):
+        return await self._run(request, self._handle_table)
+
+    async def _rpc(self, request: Request):
+        return await self._run(request, self._handle_rpc)
+
+    async def _run(self, request: Request, handler):
+        body = await request.body()
+        try:
+            return await run_in_threadpool(handler, request, body)
+        except PostgrestError as e:
+            return _error(e)
+        except sqlite3.IntegrityError as e:
+            return _error(PostgrestError(str(e), 409, "23505"))
+        except sqlite3.Error as e:
+            return _error(PostgrestError(str(e), 400, "XX000"))
+
+    def _handle_table(self, request: Request, body: bytes):
+        self._pause()
+        table = request.path_params["table"]
+        self._count(f"{request.method} {table}", list(request.query_params.multi_items()))
+        query = Query(self.db, table, request.query_params)
+        if request.method in ("GET", "HEAD"):
+            return self._respond(request, query.select())
+        payload = json.loads(body or b"null")
+        if request.method == "POST":
+            rows = payload if isinstance(payload, list) else [payload]
+            upsert = "resolution=merge-duplicates" in request.headers.get("prefer", "")
+            inserted = query.insert(rows, upsert=upsert, on_conflict=request.query_params.get("on_conflict"))
+            return self._respond(request, self._reselect(query, inserted), 201)
+        if request.method == "PATCH":
+            return self._respond(request, self._reselect(query, query.update(payload)))
+        return self._respond(request, self._reselect(query, query.delete()))
+
+    def _reselect(self, query: Query, rows: List[Dict[str, Any]]):
+        if not query.params.get("select"):
+            return rows
+        columns, embeds = query._parse_select(query.table, query.params["select"])
+        return query.shape(query.table, rows, columns, embeds)
+
+    def _handle_rpc(self, request: Request, body: bytes):
+        self._pause()
+        name = request.path_params["name"]
+        params = json.loads(body or b"{}")
+        self._count(f"RPC {name}", params)
+        fn = self.rpcs.get(name)
+        if fn is None:
+            raise PostgrestError(f"Could not find the function public.{name}", 404, "PGRST202")
+        with self.db.transaction() as conn:
+            result = fn(conn, self._user_id(request), params)
+        return JSONResponse(result)
+
+    async def _token(self, request: Request):
+        self._count("AUTH token")
+        body = json.loads(await request.body() or b"{}")
+        grant_type = request.query_params.get("grant_type")
+        if grant_type == "password":
+            rows = self.db.query("SELECT * FROM auth_user WHERE email = ? AND password = ?", (body.get("email"), body.get("password")))
+        elif grant_type == "refresh_token":
+            user_id = self._decode_refresh(body.get("refresh_token", ""))
+            rows = self.db.query("SELECT * FROM auth_user WHERE id = ?", (user_id,)) if user_id else []
+        else:
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+        if not rows:
+            return JSONResponse({"error": "invalid_grant", "error_description": "Invalid login credentials"}, status_code=400)
+        return JSONResponse(self._session(rows[0]))
+
+    def _decode_refresh(self, token: str) -> Optional[str]:
+        try:
+            return jwt.decode(token, self.jwt_secret, algorithms=["HS256"], options={"verify_aud": False}).get("sub")
+        except jwt.PyJWTError:
+            return None
+
+    def _session(self, user_row: Dict[str, Any]) -> Dict[str, Any]:
+        expires_in = 3600
+        return {
+            "access_token": self.issue_token(user_row, expires_in),
+            "refresh_token": jwt.encode({"sub": user_row["id"], "typ": "refresh", "jti": uuid.uuid4().hex}, self.jwt_secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": expires_in,
+            "expires_at": int(time.time()) + expires_in,
+            "user": _user_json(user_row),
+        }
+
+    async def _user(self, request: Request):
+        self._count("AUTH user")
+        self._pause()
+        user_id = self._user_id(request)
+        rows = self.db.query("SELECT * FROM auth_user WHERE id = ?", (user_id,)) if user_id else []
+        if not rows:
+            return JSONResponse({"code": 401, "msg": "invalid JWT"}, status_code=401)
+        return JSONResponse(_user_json(rows[0]))
+
+    async def _logout(self, request: Request):
+        return Response(status_code=204)
+
+    # Serving
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "SupabaseStandIn":
+        """Serves the stand-in on a background thread and waits until it accepts connections."""
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, name="supabase-stand-in", daemon=True)
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Supabase stand-in failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Params(dict):
+    """Minimal stand-in for Starlette's query params when seeding directly."""
+
+    def multi_items(self):
+        return list(self.items())
+
+
+def _error(e: PostgrestError):
+    return JSONResponse({"message": e.message, "code": e.code, "details": None, "hint": None}, status_code=e.status_code)
+
+
+def _user_json(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": row["email"],
+        "app_metadata": {"provider": "email", "providers": ["email"]},
+        "user_metadata": {},
+        "created_at": row["created_at"],
+        "updated_at": row["created_at"],
+    }
@@ -0,0 +1,3 @@
+"""
+Load tests for the store API; see ``loadtest.run``.
+"""
@@ -0,0 +1,305 @@
+"""
+Load test for the store API.
+
+Boots ``main:app`` in a single uvicorn worker against a scripted OpenAI
+stand-in and an in-process Supabase stand-in, then drives a weighted mix of
+requests from concurrent virtual shoppers and reports throughput, latency
+percentiles and error rates per endpoint.
+
+Scenarios are versioned JSON files in ``loadtest/scenarios``. Run from the
+backend directory:
+
+    python -m loadtest.run loadtest/scenarios/shopper_mix.json
+    python -m loadtest.run loadtest/scenarios/shopper_mix.json --concurrency 50 --duration 120 --json report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from fakes.cassette import LatencyModel
+from fakes.openai_server import OpenAIStandIn
+from fakes.supabase_server import SupabaseStandIn
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Results:
+    """Latency samples and outcomes collected per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = defaultdict(list)
+        self.started = None
+        self.finished = None
+
+    def record(self, name: str, latency: float, ok: bool, detail: str = ""):
+        self.latencies[name].append(latency)
+        if not ok:
+            self.errors[name] += 1
+            if len(self.error_samples[name]) < 3:
+                self.error_samples[name].append(detail[:200])
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max((self.finished or time.perf_counter()) - (self.started or 0), 1e-9)
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                "requests": len(values),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "error_rate": round(self.errors[name] / len(values), 4),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "error_samples": self.error_samples[name],
+            }
+        all_values = sorted(v for values in self.latencies.values() for v in values)
+        total_errors = sum(self.errors.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "total": {
+                "requests": len(all_values),
+                "throughput_rps": round(len(all_values) / elapsed, 2),
+                "error_rate": round(total_errors / len(all_values), 4) if all_values else 0.0,
+                "p50_ms": round(percentile(all_values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(all_values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(all_values, 0.99) * 1000, 1),
+            },
+            "endpoints": endpoints,
+        }
+
+
+class Shopper:
+    """A virtual user with its own credentials and chat session."""
+
+    def __init__(self, email: str, password: str, scenario: Dict[str, Any], catalog: List[Dict[str, Any]], rng: random.Random):
+        self.email = email
+        self.password = password
+        self.scenario = scenario
+        self.catalog = catalog
+        self.rng = rng
+        self.token = None
+        self.session_id = None
+
+    async def sign_in(self, client: httpx.AsyncClient):
+        response = await client.post("/api/auth/sign_in", json={"email": self.email, "password": self.password})
+        response.raise_for_status()
+        self.token = response.json()["data"]["access_token"]
+
+    def _value(self, name: str) -> Any:
+        variant = self.rng.choice(self.catalog)
+        values = {
+            "variant_id": variant["variant_id"],
+            "product": variant["name"].split()[0],
+            "size": variant["size"],
+            "color": variant["color"],
+            "chat_message": self.rng.choice(self.scenario.get("chat_messages") or ["hello"]),
+            "button_message": self.rng.choice(self.scenario.get("button_messages") or ["view cart"]),
+        }
+        return values[name]
+
+    def _fill(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self._fill(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._fill(item) for item in value]
+        if isinstance(value, str):
+            whole = PLACEHOLDER.fullmatch(value)
+            if whole:
+                return self._value(whole.group(1))
+            return PLACEHOLDER.sub(lambda match: str(self._value(match.group(1))), value)
+        return value
+
+    async def request(self, client: httpx.AsyncClient, action: Dict[str, Any], results: Optional[Results]):
+        headers = {"Authorization": f"Bearer {self.token}"} if action.get("auth") else {}
+        body = self._fill(action.get("json")) if "json" in action else None
+        if action["path"] == "/api/chat" and body is not None and self.session_id:
+            body["session_id"] = self.session_id
+        start = time.perf_counter()
+        try:
+            response = await client.request(action["method"], action["path"], json=body, headers=headers)
+            latency = time.perf_counter() - start
+            ok = response.status_code < 400
+            detail = "" if ok else f"{response.status_code} {response.text}"
+            if ok and action["path"] == "/api/chat":
+                self.session_id = response.json().get("session_id") or self.session_id
+        except httpx.HTTPError as e:
+            latency, ok, detail = time.perf_counter() - start, False, f"{type(e).__name__}: {e}"
+        if results is not None:
+            results.record(action["name"], latency, ok, detail)
+
+
+async def run_shoppers(base_url: str, scenario: Dict[str, Any], shoppers: List[Shopper], concurrency: int, duration: float, warmup: float) -> Results:
+    results = Results()
+    mix = scenario["mix"]
+    weights = [action["weight"] for action in mix]
+    think_low, think_high = scenario.get("think_time_seconds", [0.0, 0.0])
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await asyncio.gather(*(shopper.sign_in(client) for shopper in shoppers))
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        stop_at = measure_from + duration
+
+        async def worker(index: int):
+            rng = random.Random(index)
+            shopper = shoppers[index % len(shoppers)]
+            while loop.time() < stop_at:
+                action = rng.choices(mix, weights)[0]
+                measuring = loop.time() >= measure_from
+                await shopper.request(client, action, results if measuring else None)
+                if think_high > 0:
+                    await asyncio.sleep(rng.uniform(think_low, think_high))
+
+        results.started = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        results.finished = time.perf_counter()
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_app(port: int, supabase: SupabaseStandIn, openai: OpenAIStandIn, workdir: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    """Starts ``main:app`` in one uvicorn worker pointed at the stand-ins."""
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": supabase.url,
+        "SUPABASE_KEY": supabase.anon_key(),
+        "SUPABASE_JWT_SECRET": supabase.jwt_secret,
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": openai.base_url,
+        "OPENAI_CASSETTE_MODE": "",
+        "API_PREFIX": "/api",
+        "DEBUG": "false",
+        "ALLOWED_ORIGINS": "http://localhost",
+        "CHAT_SESSION_DB_PATH": os.path.join(workdir, "chat_sessions.sqlite3"),
+    })
+    env.update(extra_env)
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", "1", "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "app.log"), "w"))
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Application exited with code {process.returncode}")
+        try:
+            if httpx.get(base_url + "/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Application did not become ready in time")
+
+
+def print_report(summary: Dict[str, Any], concurrency: int):
+    print(f"\nConcurrency {concurrency}, measured for {summary['elapsed_seconds']}s")
+    header = f"{'endpoint':<16}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    rows = list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]
+    for name, stats in rows:
+        print(
+            f"{name:<16}{stats['requests']:>10}{stats['throughput_rps']:>9}"
+            f"{stats['error_rate'] * 100:>8.1f}%{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    for name, stats in summary["endpoints"].items():
+        for sample in stats["error_samples"]:
+            print(f"  {name} error: {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the store API against local stand-ins.")
+    parser.add_argument("scenario", help="Scenario JSON file")
+    parser.add_argument("--concurrency", type=int, help="Concurrent virtual shoppers (overrides the scenario)")
+    parser.add_argument("--duration", type=float, help="Measured seconds (overrides the scenario)")
+    parser.add_argument("--users", type=int, help="Distinct user accounts (overrides the scenario)")
+    parser.add_argument("--llm-latency", type=float, help="Seconds per OpenAI call (overrides the scenario)")
+    parser.add_argument("--db-latency", type=float, help="Seconds per Supabase request (overrides the scenario)")
+    parser.add_argument("--env", action="append", default=[], help="Extra KEY=VALUE for the application; may be repeated")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    latency = scenario.get("latency", {})
+    concurrency = args.concurrency or scenario.get("concurrency", 10)
+    duration = args.duration or scenario.get("duration_seconds", 30)
+    users = args.users or scenario.get("users", concurrency)
+    llm_latency = args.llm_latency if args.llm_latency is not None else latency.get("llm_seconds", 0.0)
+    db_latency = args.db_latency if args.db_latency is not None else latency.get("db_seconds", 0.0)
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    supabase = SupabaseStandIn(latency=db_latency).start()
+    openai = OpenAIStandIn(script=scenario["chat_script"], latency=LatencyModel(fixed=llm_latency, jitter=latency.get("llm_jitter_seconds", 0.0))).start()
+    catalog = supabase.db.query("SELECT * FROM product_variant")
+    rng = random.Random(0)
+    shoppers = []
+    for index in range(users):
+        email = f"shopper{index}@loadtest.local"
+        supabase.create_user(email, "load-test-password")
+        shoppers.append(Shopper(email, "load-test-password", scenario, catalog, random.Random(rng.random())))
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        process = boot_app(port, supabase, openai, workdir, extra_env)
+        try:
+            wait_until_ready(base_url, process)
+            print(f"Running {os.path.basename(args.scenario)}: {concurrency} shoppers, {users} accounts, {duration}s")
+            results = asyncio.run(run_shoppers(base_url, scenario, shoppers, concurrency, duration, scenario.get("warmup_seconds", 0)))
+        except RuntimeError:
+            with open(os.path.join(workdir, "app.log"), encoding="utf-8") as log:
+                print(log.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            openai.stop()
+            supabase.stop()
+
+    summary = results.summary()
+    summary["scenario"] = os.path.basename(args.scenario)
+    summary["concurrency"] = concurrency
+    summary["stand_in_requests"] = supabase.request_counts
+    print_report(summary, concurrency)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,11 @@ from core.config import settings
 from routers.tshirt import router as tshirt_router
 from routers.cart import router as cart_router
 from routers.order import router as order_router
-from routers.chat import router as chat_router
+from routers.chat import router as chat_router, session_store
 from routers.auth import router as auth_router
 from routers.wishlist import router as wishlist_router
+from routers.metrics import router as metrics_router
+from routers.admin import router as admin_router
 from routers.middleware import (
     known_error_logger, 
     validation_error_logger, 
@@ -42,12 +44,16 @@ app.include_router(order_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
 app.include_router(wishlist_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+app.include_router(metrics_router)
 
 app.add_exception_handler(KnownAppError, known_error_logger)
 app.add_exception_handler(RequestValidationError, validation_error_logger)
 app.add_exception_handler(HTTPException, http_exception_logger)
 app.add_exception_handler(Exception, uncaught_exception_logger)
 
+app.add_event_handler("shutdown", session_store.flush)
+
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,17 +1,145 @@
 import os
+import re
+import functools
 import json
-from openai import OpenAI
+import threading
+import time
+import contextvars
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from openai import APITimeoutError
 from dotenv import load_dotenv
+from core.config import settings
+from core.openai_client import create_openai_client, create_upstream_caller
+from core.resilience import DeadlineExceeded
 from models.database import Database
-from rag.rag_function import RAGSystem
+from rag.rag_function import RAGSystem, TRANSIENT_FAILURE_MESSAGES
+from models.fast_path import SHOW_PRODUCTS, SIGN_IN_REQUIRED, VIEW_CART, match_intent
+from models.formatting import (
+    product_key,
+    render_cart,
+    render_orders,
+    render_product_details,
+    render_product_list,
+    substitute_tables,
+)
+from routers.middleware import KnownAppError
+from models.tool_output import DEFAULT_MAX_CHARS, encode_tool_output
+from models.tool_registry import ToolRegistry
+from models.prefetch import Prefetcher, PrefetchSet
+from models.model_router import ModelRouter
+from models.telemetry import TurnTrace, current_trace, record_llm_call, record_tool_call, slow_turns, trace_turn
+from models.turn_budget import DEADLINE, BudgetExhausted, TurnBudget, budget_exhausted
+from models.tool_selection import REQUEST_ALL_TOOLS, ToolSelector
+from models.tool_cache import (
+    CACHE_POLICIES,
+    INVALIDATES,
+    MISSING,
+    SCOPE_PROCESS,
+    ToolCache,
+    cache_key,
+    tool_cache_lookups,
+)
+
+slow_turns.configure(settings.CHAT_SLOW_TURN_SECONDS, settings.CHAT_SLOW_TURN_BUFFER_SIZE)
+
+
+class ChatSession:
+    """
+    Per-conversation chat state.
+
+    Holds only what differs between conversations: the message history (without
+    the shared system prompt), the user it belongs to, the running turn's access
+    token and a few counters. Everything else lives in the process-wide ChatEngine.
+    """
+
+    __slots__ = ("session_id", "history", "owner_id", "claimed", "access_token", "turns", "tool_calls", "tool_cache", "prefetched")
+
+    def __init__(self, session_id=None, history=None):
+        self.session_id = session_id
+        self.history = history if history is not None else []
+        # The user of the first turn (None if anonymous); set by claim().
+        self.owner_id = None
+        self.claimed = False
+        self.access_token = None
+        self.turns = 0
+        self.tool_calls = 0
+        # Created on the first cacheable tool call; never persisted.
+        self.tool_cache = None
+        # Speculative reads of the running turn.
+        self.prefetched = None
+
+    def claim(self, user_id):
+        """
+        Ties the session to the user of its first turn.
+
+        Args:
+            user_id (str): The caller's user id, or None if anonymous.
+
+        Returns:
+            bool: Whether the caller may use the session.
+        """
+        if not self.claimed:
+            self.owner_id = user_id
+            self.claimed = True
+        return self.owner_id == user_id
+
+    def export_state(self):
+        """
+        Serializes the session for spilling to disk.
+
+        The access token is re-supplied by the next request, so it is not persisted.
+
+        Returns:
+            dict: JSON-compatible state with the owner, history and counters.
+        """
+        return {
+            "owner_id": self.owner_id,
+            "history": [
+                msg.model_dump() if hasattr(msg, "model_dump") else msg
+                for msg in self.history
+            ],
+            "turns": self.turns,
+            "tool_calls": self.tool_calls,
+        }
+
+    @classmethod
+    def from_state(cls, session_id, state):
+        """
+        Rebuilds a session from a state produced by ``export_state``.
+
+        Args:
+            session_id (str): The session identifier.
+            state (dict): Previously exported session state.
+
+        Returns:
+            ChatSession: The restored session.
+        """
+        session = cls(session_id, list(state.get("history", [])))
+        # Only sessions that ran a turn are spilled, so they are always claimed.
+        session.owner_id = state.get("owner_id")
+        session.claimed = True
+        session.turns = state.get("turns", 0)
+        session.tool_calls = state.get("tool_calls", 0)
+        return session
+
+
+class ChatEngine:
+    """
+    Process-wide, immutable chatbot engine.
+
+    Owns the OpenAI client, the database facade, the RAG system, the tool
+    schemas and the system prompt. It is built once per process and shared by
+    every ChatSession; all conversation state is passed in explicitly.
+    """
 
-class TShirtChatbot:
-    
     def __init__(self, api_key=None, model="gpt-4.1"):
         load_dotenv(override=True)
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries happen in the completion caller, which keeps them within
+        # the turn deadline; retrying inside the client would overrun it.
+        self.client = create_openai_client(self.api_key, max_retries=0)
+        self.completion_caller = create_upstream_caller("responses", hedge=settings.OPENAI_HEDGE_COMPLETIONS)
         self.database = Database()
         
         # RAG system with error handling
@@ -24,376 +152,149 @@ class TShirtChatbot:
             self.rag_system = None
             self.rag_available = False
         
-        self.conversation_history = []
-        self.function_map = self._define_function_map()
-        self.tools = self._define_tools()
-        self._initialize_system_message()
-        self.access_token = None
-
-    def _define_function_map(self):
-        function_map = {
-            "get_t_shirt": self.database.get_t_shirt,
-            "add_to_cart": self.database.add_to_cart,
-            "place_order": self.database.place_order,
-            "update_cart_item": self.database.update_cart_item,
-            "delete_cart_item": self.database.delete_cart_item,
-            "update_order": self.database.update_order,
-            "delete_order": self.database.delete_order,
-            "update_order_item": self.database.update_order_item,
-            "delete_order_item": self.database.delete_order_item,
-            "get_user_cart": self.database.get_user_cart,
-            "get_user_orders": self.database.get_user_orders,
+        # Tool schemas and handlers come from the @tool declarations.
+        self.tool_registry = ToolRegistry([self.database, self.rag_system], hooks=[_record_tool_run])
+        self.tools = self.tool_registry.schemas
+        self.system_message = self._build_system_message()
+        self.product_info = self._build_product_info()
+        self.tool_selector = ToolSelector(self.tools, self.product_info.keys())
+        self.table_renderers = {
+            "get_user_cart": render_cart,
+            "get_user_orders": render_orders,
+            "get_t_shirt": lambda result: render_product_details(result, self.product_info),
         }
-        
-        # RAG function only if available
-        if self.rag_available and self.rag_system:
-            function_map["search_knowledge_base"] = self.rag_system.search
-        
-        return function_map
-    
-    def _define_tools(self):
-        tools = [
-            {
-                "type": "function",
-                "name": "get_t_shirt",
-                "description": "Use this tool to get the list of available t-shirts. If the user's input does not cover all required paremeters, inform the user.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "name": {
-                            "type": "string",
-                            "description": "The name of the t-shirt to retrieve from the database"
-                        },
-                        "size": {
-                            "type": "string",
-                            "description": "The size of the t-shirt to retrieve from the database"
-                        },
-                        "color": {
-                            "type": "string",
-                            "description": "The color of the t-shirt to retrieve from the database"
-                        }
-                    },
-                    "required": ["name", "size", "color"],
-                    "additionalProperties": False
-                },
-                "strict": True
-            },
-            {
-                "type": "function",
-                "name": "add_to_cart",
-                "description": "Use this tool to add the customer's user to the cart. If the customer wants more than one, provide the aggregated price into the parameters.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "variant_id": {
-                            "type": "string",
-                            "description": "The id of the t-shirt to add to the cart"
-                        },
-                        "quantity": {
-                            "type": "integer",
-                            "description": "The quantity of the t-shirt to add to the cart"
-                        }
-                    },
-                    "required": ["variant_id", "quantity"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "place_order",
-                "description": "Use this tool to place an order for all items currently in the customer's active cart. This will convert the cart items into an order and clear the cart.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "update_cart_item",
-                "description": "Update the quantity of a cart item.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "cart_item_id": {"type": "string", "description": "The cart item ID to update"},
-                        "quantity": {"type": "integer", "description": "The new quantity"}
-                    },
-                    "required": ["cart_item_id", "quantity"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "delete_cart_item",
-                "description": "Delete a cart item by its ID.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "cart_item_id": {"type": "string", "description": "The cart item ID to delete"}
-                    },
-                    "required": ["cart_item_id"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "update_order",
-                "description": "Update the status or total amount of an order.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "order_id": {"type": "string", "description": "The order ID to update"},
-                        "status": {"type": "string", "description": "The new status"},
-                        "total_amount": {"type": "number", "description": "The new total amount"}
-                    },
-                    "required": ["order_id", "status", "total_amount"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "delete_order",
-                "description": "Delete an order by its ID.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "order_id": {"type": "string", "description": "The order ID to delete"}
-                    },
-                    "required": ["order_id"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "update_order_item",
-                "description": "Update the quantity or price of an order item.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "order_item_id": {"type": "string", "description": "The order item ID to update"},
-                        "quantity": {"type": "integer", "description": "The new quantity"},
-                        "item_price": {"type": "number", "description": "The new item price"}
-                    },
-                    "required": ["order_item_id", "quantity", "item_price"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "delete_order_item",
-                "description": "Delete an order item by its ID.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "order_item_id": {"type": "string", "description": "The order item ID to delete"}
-                    },
-                    "required": ["order_item_id"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "get_user_cart",
-                "description": "Get the authenticated user's active cart and its items.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-            {
-                "type": "function",
-                "name": "get_user_orders",
-                "description": "Get all orders for the authenticated user, including their items.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            },
-        ]
-        
-        if self.rag_available and self.rag_system:
-            tools.append({
-                "type": "function",
-                "name": "search_knowledge_base",
-                "description": "Search the knowledge base for product information, FAQ answers, and policy details. Use this when users ask about product details, shipping, returns, sizing, or general questions about the store.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "The search query to find relevant information"
-                        }
-                    },
-                    "required": ["query"],
-                    "additionalProperties": False
-                },
-                "strict": True,
-            })
-        
-        return tools
-    
-    def _initialize_system_message(self):
+        # Catalog and knowledge base results shared by every session.
+        self.tool_cache = ToolCache(max_entries=1024)
+        # Read-only tools and prefetches run here so a turn can stop waiting for them at its deadline.
+        self.tool_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="chat-tool")
+        self.prefetcher = Prefetcher(self.product_info) if settings.CHAT_PREFETCH_ENABLED else None
+        self.router = None
+        if settings.CHAT_FAST_MODEL:
+            self.router = ModelRouter(
+                settings.CHAT_FAST_MODEL,
+                self.model,
+                self.tools,
+                self.product_info.keys(),
+                max_fast_words=settings.CHAT_FAST_MAX_WORDS,
+            )
+
+    def new_session(self, session_id=None):
+        """
+        Creates the state for a new conversation.
+
+        Args:
+            session_id (str, optional): The session identifier.
+
+        Returns:
+            ChatSession: An empty session bound to no access token.
+        """
+        return ChatSession(session_id)
+
+    def _build_product_info(self):
+        """Indexes knowledge base descriptions and categories by product name."""
+        if not self.rag_available:
+            return {}
+        product_info = {}
+        for product in self.rag_system.knowledge_base.product_descriptions:
+            description = product["content"].split(" - ", 1)[-1]
+            sentences = re.split(r"(?<=\.)\s+", description)
+            product_info[product_key(product["name"])] = {
+                "name": product["name"],
+                "description": " ".join(sentences[:2]),
+                "category": product["metadata"].get("category"),
+                "colors": product["metadata"].get("colors", []),
+            }
+        return product_info
+
+    def _build_system_message(self):
         base_content = "You are an action-oriented assistant that helps users with t-shirt orders. Your tasks include checking inventory, adding items to the cart, placing orders, and providing detailed information about products, policies, and frequently asked questions."
         
         formatting_instructions = """
 
-**CRITICAL FORMATTING RULES:**
-When displaying tabular data (like cart items, orders, product listings), you MUST format it as a proper markdown table. Follow these EXACT formatting rules:
-
-1. **Table Structure**: Each table must have proper spacing and alignment
-2. **Headers**: Always include descriptive column headers
-3. **Separators**: Use proper markdown table separators with dashes
-4. **Spacing**: Ensure proper spacing around pipes (|)
-
-EXAMPLES:
-
-For orders (separate table for each order, show product details not IDs):
-```
-**Order 1** (2025-08-04)
-| product name | size | color | quantity | price | status |
-|--------------|------|-------|----------|-------|--------|
-| Ctrl + Alt + Elite | S | White | 4 | $22.99 | Pending |
-| **Total** | | | | **$91.96** | |
-```
-
-```
-**Order 2** (2025-08-03)
-| product name | size | color | quantity | price | status |
-|--------------|------|-------|----------|-------|--------|
-| My AI is Smarter Than Your Honor Student | M | White | 1 | $24.99 | Pending |
-| I Dream in Binary | S | Jet Black | 4 | $27.61 | Pending |
-| **Total** | | | | **$135.43** | |
-```
-
-For product details (when showing individual product information):
-```
-**I'm Just Here for the Deep Learning**
-| field | value |
-|-------|-------|
-| Design | A clever t-shirt for deep learning enthusiasts and researchers. It blends humor with technical expertise—perfect for anyone working with neural networks and machine learning. |
-| Category | Humor |
-| Available Sizes | S, M |
-| Available Colors | White |
-```
-
-For cart details (when showing user's cart):
-```
-**Your Cart**
-| product name | size | color | quantity | price | total |
-|--------------|------|-------|----------|-------|-------|
-| Ctrl + Alt + Elite | S | White | 2 | $22.99 | $45.98 |
-| I Dream in Binary | M | Jet Black | 1 | $27.61 | $27.61 |
-| **Total** | | | | | **$73.59** |
-```
-
-- NEVER display order IDs to the user. Use 'Order 1', 'Order 2', etc. as table titles.
-- For product lists, use proper table rows with all product details clearly displayed.
-- Always interpret the data and present it in clean, readable tables.
+**FORMATTING RULES:**
+- Cart, order and product lookups return a table that the server has already rendered, labelled with a placeholder such as {{table_1}}. To show it, write the placeholder on its own line. Never rebuild, reformat or recalculate these tables.
+- NEVER display order, cart item or variant IDs to the user.
 - Format dates as YYYY-MM-DD.
-- Always include proper markdown table syntax with pipes and dashes.
-- For orders: ALWAYS show product details (name, size, color) instead of just variant IDs.
-- For orders: Create a SEPARATE TABLE for each order for better readability when there are multiple orders.
-- Extract product information from the order items and display it clearly.
-- Include order date in the table title and status/total as table columns.
-- Use lowercase for table headers (e.g., "product name", "size", "color") to make them smaller and less prominent.
-- Add a "status" column to show the order status for each item.
-- Add a "Total" row at the bottom of each table with the order total amount.
-- For product details: Always present product information in a table format with "field" and "value" columns.
-- For product details: Include design description, category, available sizes, and available colors in the table.
-- For cart details: Always present cart information in a table format with product details and totals.
-- For cart details: Include product name, size, color, quantity, price, and total for each item, plus a cart total row.
-
-When presenting order data:
-1. Get the order data with items
-2. Extract product details from each item (name, size, color, quantity, price)
-3. Create a separate table for each order with the format: "**Order X** (date)"
-4. Include a brief introduction and any relevant follow-up information
-
-When presenting product details:
-1. Get the product information (design, category, sizes, colors)
-2. Create a table with "field" and "value" columns
-3. Include design description, category, available sizes, and available colors
-4. Include a brief introduction and any relevant follow-up information
-
-When presenting cart details:
-1. Get the cart data with items
-2. Extract product details from each item (name, size, color, quantity, price)
-3. Create a table with product details and calculate totals for each item
-4. Add a "Total" row at the bottom with the cart total amount
-5. Include a brief introduction and any relevant follow-up information
-
-When presenting data, provide a brief introduction, then the tables, then any additional relevant information."""
+- When presenting data, provide a brief introduction, then the tables, then any additional relevant information."""
 
         if self.rag_available:
             content = base_content + " You have access to a comprehensive knowledge base that includes product descriptions, FAQ answers, and policy information. When users ask about product details, shipping, returns, sizing, or general questions, use the search_knowledge_base function to provide accurate and helpful information." + formatting_instructions + " When a user wants to order a shirt, confirm its availability and provide relevant product information. If it's in stock, offer to add it to their cart. After that, ask if they'd like to place the order."
         else:
             content = base_content + formatting_instructions + " When a user wants to order a shirt, confirm its availability. If it's in stock, offer to add it to their cart. After that, ask if they'd like to place the order."
         
-        system_message = {
+        return {
             "role": "system",
             "content": content
         }
-        self.conversation_history.append(system_message)
     
-    def get_completion(self, messages):
-        llm_response = self.client.responses.create(
-            model=self.model,
-            input=messages,
-            tools=self.tools,
+    def new_budget(self, cancel_event=None):
+        """
+        Creates a turn budget from the configured per-turn limits.
+
+        Args:
+            cancel_event (threading.Event, optional): Event that abandons the turn when set.
+
+        Returns:
+            TurnBudget: A fresh budget for one turn.
+        """
+        return TurnBudget(
+            max_model_calls=settings.CHAT_MAX_MODEL_CALLS,
+            max_tool_calls=settings.CHAT_MAX_TOOL_CALLS,
+            deadline_seconds=settings.CHAT_TURN_DEADLINE_SECONDS,
+            cancel_event=cancel_event,
         )
+
+    def get_completion(self, session, tools=None, budget=None, model=None):
+        model = model or self.model
+        deadline = cancel_event = None
+        if budget is not None:
+            budget.spend_model_call()
+            deadline, cancel_event = budget.remaining(), budget.cancel_event
+        request = {
+            "model": model,
+            "input": [self.system_message, *session.history],
+            "tools": tools or self.tools,
+        }
+        start = time.perf_counter()
+        try:
+            llm_response = self.completion_caller.call(
+                lambda timeout: self.client.responses.create(**request, timeout=timeout),
+                deadline=deadline,
+                cancel_event=cancel_event,
+            )
+        except (APITimeoutError, DeadlineExceeded):
+            if budget is not None and budget.remaining() == 0:
+                raise BudgetExhausted(DEADLINE)
+            raise
+        duration = time.perf_counter() - start
+        record_llm_call(model, duration, getattr(llm_response, "usage", None))
+        if budget is not None:
+            budget.record_if_abandoned("model_call", duration)
         return llm_response.output[0]
+
+    def _complete(self, session, tools, budget, route):
+        """Runs a completion on the routed model, repeating it on the main model if the fast answer is unusable."""
+        if route is None:
+            return self.get_completion(session, tools, budget)
+        while True:
+            start = time.perf_counter()
+            response = self.get_completion(session, tools, budget, model=route.model())
+            route.record(time.perf_counter() - start)
+            reason = route.check(response)
+            if reason is None:
+                return response
+            print(f"Escalating to {self.model} ({reason}) for session {session.session_id}")
     
-    def handle_function_call(self, response):
+    def handle_function_call(self, session, response, budget=None):
         func_name = response.name
-        print(f"Function call: {func_name}")
-        print(f"Access token available: {self.access_token is not None}")
 
-        if func_name in self.function_map:
+        spec = self.tool_registry.get(func_name)
+        if spec is not None and spec.offered:
             args = json.loads(response.arguments)
-            print(f"Original args: {args}")
-            
-            #  functions that require access_token
-            requires_token = {
-                "add_to_cart",
-                "update_cart_item",
-                "delete_cart_item",
-                "get_user_cart",
-                "get_user_orders",
-                "update_order",
-                "delete_order",
-                "update_order_item",
-                "delete_order_item",
-                "place_order"
-            }
-
-            if self.access_token and func_name in requires_token:
-                args["access_token"] = self.access_token
-                print(f"Added access token to args")
-            
-            print(f"Final args: {args}")
             try:
-                if func_name == "search_knowledge_base":
-                    query = args.get("query", "")
-                    result = self.rag_system.search(query, 3, None)  # default top_k=3 
-                else:
-                    result = self.function_map[func_name](**args)
-                print(f"Function result: {result}")
-                return result
+                return self.call_tool(session, func_name, args, budget=budget)
+            except BudgetExhausted:
+                raise
             except Exception as e:
                 print(f"Function execution error: {e}")
                 return f"Error executing function {func_name}: {str(e)}"
@@ -401,35 +302,216 @@ When presenting data, provide a brief introduction, then the tables, then any ad
             result = f"No such function {func_name}"
             print(f"Function not found: {func_name}")
             return result
+
+    def call_tool(self, session, func_name, args, budget=None):
+        """
+        Runs a tool on behalf of a session.
+
+        Injects the session's access token where required, serves cacheable
+        reads from the tool cache or from a matching speculative prefetch, and
+        invalidates stale reads after mutations.
+
+        Args:
+            session (ChatSession): The calling session.
+            func_name (str): The tool name.
+            args (dict): The tool arguments as produced by the model.
+            budget (TurnBudget, optional): Budget of the calling turn; read-only
+                                           tools are abandoned at its deadline.
+
+        Returns:
+            The tool result.
+
+        Raises:
+            BudgetExhausted: If the turn's deadline passed while waiting.
+            Exception: Whatever the underlying tool raises.
+        """
+        self._add_token(session, func_name, args)
+
+        start = time.perf_counter()
+        prefetched = None
+        policy = CACHE_POLICIES.get(func_name)
+        if policy is not None:
+            cache = self._cache_for(session, policy)
+            key = cache_key(func_name, args)
+            cached = cache.get(key)
+            tool_cache_lookups.inc(tool=func_name, outcome="hit" if cached is not MISSING else "miss")
+            if cached is not MISSING:
+                record_tool_call(func_name, time.perf_counter() - start, "cached", _result_size(cached))
+                return cached
+        prefetch_set = session.prefetched
+        if prefetch_set:
+            prefetched = prefetch_set.take(cache_key(func_name, args))
+        try:
+            result = MISSING
+            if prefetched is not None:
+                try:
+                    result = self._prefetched_result(prefetched, budget)
+                finally:
+                    prefetch_set.settle(func_name, prefetched, result is not MISSING)
+                if result is not MISSING:
+                    record_tool_call(func_name, time.perf_counter() - start, "prefetched", _result_size(result))
+            if result is MISSING:
+                # Runs are timed and recorded by the registry's hook.
+                result = self._run_tool(func_name, lambda: self.tool_registry.call(func_name, args), budget)
+        finally:
+            self._invalidate_after(session, func_name)
+        if policy is not None and not (isinstance(result, str) and result in TRANSIENT_FAILURE_MESSAGES):
+            cache.set(key, result, policy.ttl_seconds)
+        return result
     
-    def process_user_input(self, user_input):
-        self.conversation_history.append({
+    def _add_token(self, session, func_name, args):
+        if session.access_token and func_name in self.tool_registry.requires_token:
+            args["access_token"] = session.access_token
+        return args
+
+    def _start_prefetch(self, session, user_input):
+        """Starts the reads the model is likely to request while its first completion runs."""
+        if self.prefetcher is None:
+            return
+        prefetched = PrefetchSet()
+        for func_name, args in self.prefetcher.predict(user_input, session.access_token is not None):
+            if func_name not in self.tool_registry:
+                continue
+            args = self._add_token(session, func_name, args)
+            key = cache_key(func_name, args)
+            policy = CACHE_POLICIES.get(func_name)
+            if policy is not None and self._cache_for(session, policy).get(key) is not MISSING:
+                continue
+            # Not reported to the registry hooks; call_tool records the read if it is used.
+            future = self.tool_executor.submit(
+                contextvars.copy_context().run, functools.partial(self.tool_registry.call, func_name, args, notify=False)
+            )
+            prefetched.add(key, func_name, future)
+        session.prefetched = prefetched or None
+
+    def _prefetched_result(self, future, budget):
+        # A failed or cancelled prefetch falls back to a normal call.
+        try:
+            return future.result() if budget is None else budget.wait(future)
+        except BudgetExhausted:
+            raise
+        except (CancelledError, Exception):
+            return MISSING
+
+    def _run_tool(self, func_name, call, budget):
+        # Mutations always run to completion so the store is never left half-updated.
+        if budget is None or func_name in self.tool_registry.writes:
+            return call()
+        start = time.perf_counter()
+        future = self.tool_executor.submit(contextvars.copy_context().run, call)
+        try:
+            return budget.wait(future)
+        except BudgetExhausted:
+            if not future.cancel():
+                future.add_done_callback(lambda _: budget.record_if_abandoned("tool_call", time.perf_counter() - start))
+            raise
+
+    def _cache_for(self, session, policy):
+        if policy.scope == SCOPE_PROCESS:
+            return self.tool_cache
+        if session.tool_cache is None:
+            session.tool_cache = ToolCache(max_entries=64)
+        return session.tool_cache
+
+    def _invalidate_after(self, session, func_name):
+        # Mutations invalidate even when they fail, as they may have partially applied.
+        stale = INVALIDATES.get(func_name)
+        if not stale:
+            return
+        if session.tool_cache is not None:
+            session.tool_cache.invalidate(stale)
+        if session.prefetched:
+            session.prefetched.invalidate(stale)
+        self.tool_cache.invalidate(
+            name for name in stale if name in CACHE_POLICIES and CACHE_POLICIES[name].scope == SCOPE_PROCESS
+        )
+    
+    def process_user_input(self, session, user_input, budget=None):
+        """
+        Answers one user message.
+
+        Args:
+            session (ChatSession): The conversation to continue.
+            user_input (str): The user's message.
+            budget (TurnBudget, optional): Limits for this turn; defaults to the
+                                           configured per-turn limits.
+
+        Returns:
+            dict: The response text and the action buttons to show.
+        """
+        intent = match_intent(user_input)
+        trace = TurnTrace(session.session_id, user_input, path="llm" if intent is None else "fast_path")
+        with trace_turn(trace):
+            if intent is not None:
+                return self._answer_fast_path(session, intent, user_input)
+            self._start_prefetch(session, user_input)
+            try:
+                return self._run_llm_turn(session, user_input, budget or self.new_budget())
+            finally:
+                if session.prefetched:
+                    session.prefetched.discard()
+                session.prefetched = None
+
+    def _run_llm_turn(self, session, user_input, budget):
+        session.turns += 1
+        session.history.append({
             "role": "user",
             "content": user_input
         })
         
-        response = self.get_completion(self.conversation_history)
+        tools = self.tool_selector.select(user_input)
+        route = self.router.start(user_input) if self.router is not None else None
         cart_updated = False
-        
-        while response.type == "function_call":
-            self.conversation_history.append(response)
-            
-            result = self.handle_function_call(response)
-            
-            # if cart was modified
-            if response.name in ["add_to_cart", "update_cart_item", "delete_cart_item", "place_order"]:
-                cart_updated = True
-            
-            self.conversation_history.append({
-                "type": "function_call_output",
-                "call_id": response.call_id,
-                "output": str(result),
-            })
-            
-            response = self.get_completion(self.conversation_history)
+        tables = {}
+
+        try:
+            response = self._complete(session, tools, budget, route)
+            while response.type == "function_call":
+                session.history.append(response)
+
+                if response.name == REQUEST_ALL_TOOLS:
+                    # The selected subset was not enough; retry with every tool.
+                    self.tool_selector.record_fallback()
+                    tools = None
+                    session.history.append({
+                        "type": "function_call_output",
+                        "call_id": response.call_id,
+                        "output": "All tools are now available.",
+                    })
+                    response = self._complete(session, None, budget, route)
+                    continue
+
+                if route is not None:
+                    route.tool_called()
+                try:
+                    budget.spend_tool_call()
+                    session.tool_calls += 1
+                    result = self.handle_function_call(session, response, budget)
+                except BudgetExhausted:
+                    # Every function_call in the history needs a matching output.
+                    session.history.append({
+                        "type": "function_call_output",
+                        "call_id": response.call_id,
+                        "output": "Cancelled: the turn ran out of budget.",
+                    })
+                    raise
+
+                # if cart was modified
+                if response.name in ["add_to_cart", "update_cart_item", "delete_cart_item", "place_order"]:
+                    cart_updated = True
+
+                session.history.append({
+                    "type": "function_call_output",
+                    "call_id": response.call_id,
+                    "output": self._format_tool_output(response.name, result, tables),
+                })
+
+                response = self._complete(session, tools, budget, route)
+        except BudgetExhausted as e:
+            return self._partial_answer(session, user_input, e.limit, tables, cart_updated)
         
         if response.type == "message":
-            bot_response = response.content[0].text
+            bot_response = substitute_tables(response.content[0].text, tables)
             bot_response = bot_response.replace('<br>', '\n').replace('<br/>', '\n')
             bot_response = re.sub(r'\n\s*•', '  \n•', bot_response)
             
@@ -439,7 +521,7 @@ When presenting data, provide a brief introduction, then the tables, then any ad
             # action buttons based on context
             action_buttons = self._generate_action_buttons(user_input, bot_response)
             
-            self.conversation_history.append({
+            session.history.append({
                 "role": "assistant",
                 "content": bot_response
             })
@@ -454,6 +536,89 @@ When presenting data, provide a brief introduction, then the tables, then any ad
             "action_buttons": None
         }
     
+    def _partial_answer(self, session, user_input, limit, tables, cart_updated):
+        """
+        Ends a turn that ran out of budget with whatever it produced so far.
+
+        Tables rendered before the cut-off are still shown, and the cart is
+        refreshed if a mutation already went through.
+        """
+        print(f"Chat turn budget exhausted ({limit}) for session {session.session_id}")
+        budget_exhausted.inc(limit=limit)
+        trace = current_trace()
+        if trace is not None:
+            trace.finish(f"budget_{limit}")
+
+        bot_response = "I'm sorry, this request took longer than expected, so I had to stop here."
+        if tables:
+            bot_response = "This is what I found before I had to stop:\n\n" + "\n\n".join(tables.values())
+        bot_response += "\n\nPlease try again, or ask about one thing at a time."
+        if cart_updated:
+            bot_response += "\n\n[REFRESH_CART]"
+
+        session.history.append({"role": "assistant", "content": bot_response})
+        return {
+            "response": bot_response,
+            "action_buttons": self._generate_action_buttons(user_input, bot_response)
+        }
+
+    def _format_tool_output(self, func_name, result, tables):
+        """
+        Builds the function_call_output text for a tool result.
+
+        Results are projected and compacted by ``encode_tool_output``. Cart,
+        order and product results are also rendered into a Markdown table that
+        is registered under a ``{{table_N}}`` placeholder, so the model can pass
+        the table through instead of regenerating it token by token.
+        """
+        spec = self.tool_registry.get(func_name)
+        if spec is None:
+            data = encode_tool_output(None, result, DEFAULT_MAX_CHARS)
+        else:
+            data = encode_tool_output(spec.output, result, spec.max_output_chars)
+        renderer = self.table_renderers.get(func_name)
+        if renderer is None or isinstance(result, str):
+            return data
+        placeholder = f"table_{len(tables) + 1}"
+        tables[placeholder] = renderer(result)
+        return (
+            f"Rendered table {{{{{placeholder}}}}}:\n{tables[placeholder]}\n\n"
+            f"Show it by writing {{{{{placeholder}}}}} on its own line; do not copy or recompute it.\n"
+            f"Data for follow-up tool calls (never show ids to the user):\n{data}"
+        )
+
+    def _answer_fast_path(self, session, intent, user_input):
+        """
+        Answers an action-button intent straight from the database.
+
+        The exchange is recorded in the history as a normal user/assistant turn
+        so the model keeps the context on the next free-form message.
+        """
+        session.turns += 1
+
+        if intent != SHOW_PRODUCTS and not session.access_token:
+            bot_response = SIGN_IN_REQUIRED[intent]
+        else:
+            try:
+                if intent == SHOW_PRODUCTS:
+                    bot_response = "Here are the t-shirts we currently have:\n\n" + render_product_list(
+                        self.call_tool(session, "get_all_shirts", {})
+                    )
+                elif intent == VIEW_CART:
+                    bot_response = render_cart(self.call_tool(session, "get_user_cart", {}))
+                else:
+                    bot_response = render_orders(self.call_tool(session, "get_user_orders", {}))
+            except KnownAppError as e:
+                bot_response = f"Sorry, I couldn't complete that request: {e.message}"
+
+        session.history.append({"role": "user", "content": user_input})
+        session.history.append({"role": "assistant", "content": bot_response})
+
+        return {
+            "response": bot_response,
+            "action_buttons": self._generate_action_buttons(user_input, bot_response)
+        }
+
     def _generate_action_buttons(self, user_input: str, bot_response: str) -> list:
         """Generate appropriate action buttons based on the conversation context."""
         action_buttons = []
@@ -509,11 +674,73 @@ When presenting data, provide a brief introduction, then the tables, then any ad
         
         return action_buttons
     
-    def get_conversation_history(self):
+    def get_conversation_history(self, session):
         return [
             msg.model_dump() if hasattr(msg, "model_dump") else msg
-            for msg in self.conversation_history
+            for msg in [self.system_message, *session.history]
         ]
+
+
+def _record_tool_run(name, duration, result, error):
+    record_tool_call(name, duration, "error" if error is not None else "ok", _result_size(result))
+
+
+def _result_size(result):
+    if isinstance(result, str):
+        return len(result)
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the process-wide ChatEngine, creating it on first use.
+
+    Returns:
+        ChatEngine: The shared engine instance.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ChatEngine()
+    return _engine
+
+
+class TShirtChatbot:
+    """
+    Single-conversation wrapper around the shared ChatEngine.
+
+    Binds one ChatSession to the engine so the chatbot can be driven directly,
+    e.g. from the command line.
+    """
+
+    def __init__(self, api_key=None, model="gpt-4.1", session=None):
+        if api_key is None and model == "gpt-4.1":
+            self.engine = get_engine()
+        else:
+            self.engine = ChatEngine(api_key=api_key, model=model)
+        self.session = session or self.engine.new_session()
+
+    @property
+    def access_token(self):
+        return self.session.access_token
+
+    @access_token.setter
+    def access_token(self, value):
+        self.session.access_token = value
+
+    def process_user_input(self, user_input):
+        return self.engine.process_user_input(self.session, user_input)
+
+    def get_conversation_history(self):
+        return self.engine.get_conversation_history(self.session)
     
     def start_conversation(self):
         print("🤖 T-Shirt Assistant: Hello! I can help you find and order t-shirts. What are you looking for today?")
@@ -539,4 +766,3 @@ When presenting data, provide a brief introduction, then the tables, then any ad
 if __name__ == "__main__":
     chatbot = TShirtChatbot()
     chatbot.start_conversation()
-    chatbot.start_conversation()
\ No newline at end of file
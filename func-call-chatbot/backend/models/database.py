@@ -3,13 +3,14 @@ Database model for centralized database operations.
 
 This module provides a Database class that acts as a facade for all database operations,
 including product management, cart operations, order processing, and wishlist management.
-It wraps functions from the data layer to provide a clean, unified interface.
+It calls the data layer functions directly to provide a clean, unified interface.
+Methods the chatbot may call are declared as tools with ``models.tool_registry.tool``,
+which is the only registry of them.
 """
 
-from data_layer.tshirt import get_t_shirt, get_all_shirts
-from data_layer.order import place_order, update_order, delete_order, update_order_item, delete_order_item, get_user_orders
-from data_layer.cart import add_to_cart, get_cart_items, update_cart_item, delete_cart_item, get_user_cart
-from data_layer.wishlist import add_to_wishlist, remove_from_wishlist, get_wishlist_items
+from data_layer import cart, order, tshirt, wishlist
+from models import tool_output
+from models.tool_registry import WRITE, tool
 
 
 class Database:
@@ -21,32 +22,7 @@ class Database:
     It acts as a facade that wraps functions from the data layer.
     """
     
-    def __init__(self):
-        """
-        Initialize the Database model with function mappings.
-        
-        Sets up a function map that maps method names to their corresponding
-        data layer functions for all database operations.
-        """
-        self.function_map = {
-            "get_t_shirts": get_t_shirt,
-            "add_to_cart": add_to_cart,
-            "place_order": place_order,
-            "get_all_shirts": get_all_shirts,
-            "get_cart_items": get_cart_items,
-            "add_to_wishlist": add_to_wishlist,
-            "remove_from_wishlist": remove_from_wishlist,
-            "get_wishlist_items": get_wishlist_items,
-            "update_cart_item": update_cart_item,
-            "delete_cart_item": delete_cart_item,
-            "update_order": update_order,
-            "delete_order": delete_order,
-            "update_order_item": update_order_item,
-            "delete_order_item": delete_order_item,
-            "get_user_cart": get_user_cart,
-            "get_user_orders": get_user_orders
-        }
-
+    @tool("Lists every t-shirt variant in the catalog.", offered=False)
     def get_all_shirts(self):
         """
         Retrieves all available t-shirt variants from the database.
@@ -58,8 +34,17 @@ class Database:
         Raises:
             KnownAppError: If database query fails (500 status code)
         """
-        return self.function_map["get_all_shirts"]()
-
+        return tshirt.get_all_shirts()
+
+    @tool(
+        "Use this tool to get the list of available t-shirts. If the user's input does not cover all required paremeters, inform the user.",
+        {
+            "name": {"type": "string", "description": "The name of the t-shirt to retrieve from the database"},
+            "size": {"type": "string", "description": "The size of the t-shirt to retrieve from the database"},
+            "color": {"type": "string", "description": "The color of the t-shirt to retrieve from the database"},
+        },
+        output=tool_output.VARIANTS,
+    )
     def get_t_shirt(self, name, size, color):
         """
         Retrieves t-shirts matching the given name, size, and color.
@@ -77,26 +62,38 @@ class Database:
         Raises:
             KnownAppError: If database query fails (500 status code)
         """
-        return self.function_map["get_t_shirts"](name=name, size=size, color=color)
+        return tshirt.get_t_shirt(name=name, size=size, color=color)
     
-    def get_cart_items(self, access_token=None):
+    def get_cart_items(self, access_token=None, limit=cart.CART_PAGE_SIZE, offset=0):
         """
         Retrieves cart items for the authenticated user.
 
         Args:
             access_token (str, optional): User's access token for authentication.
                                         Required for authenticated operations.
+            limit (int, optional): Maximum number of items to return.
+            offset (int, optional): Number of items to skip.
 
         Returns:
-            list: List of cart items with product details.
-                  Each item includes name, size, color, price, quantity, etc.
-                  Returns empty list if no cart items found.
+            dict: One page of cart items under "items", each with name, size,
+                  color, price, quantity, etc., plus "has_more" and the
+                  "next_offset" of the following page (None on the last page).
                   
         Raises:
             KnownAppError: If user is not authenticated (401 status code)
         """
-        return self.function_map["get_cart_items"](access_token=access_token)
+        return cart.get_cart_items(access_token=access_token, limit=limit, offset=offset)
     
+    @tool(
+        "Use this tool to add the customer's user to the cart. If the customer wants more than one, provide the aggregated price into the parameters.",
+        {
+            "variant_id": {"type": "string", "description": "The id of the t-shirt to add to the cart"},
+            "quantity": {"type": "integer", "description": "The quantity of the t-shirt to add to the cart"},
+        },
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.CART_ITEM,
+    )
     def add_to_cart(self, variant_id, quantity, access_token):
         """
         Adds a t-shirt variant to the user's cart with stock validation.
@@ -113,12 +110,18 @@ class Database:
             KnownAppError: If user is not authenticated (401), product not found (404),
                           insufficient stock (400), or database operation fails (500)
         """
-        return self.function_map["add_to_cart"](
+        return cart.add_to_cart(
             variant_id=variant_id,
             quantity=quantity,
             access_token=access_token
         )
     
+    @tool(
+        "Use this tool to place an order for all items currently in the customer's active cart. This will convert the cart items into an order and clear the cart.",
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.PLACED_ORDER,
+    )
     def place_order(self, access_token):
         """
         Places an order by converting the user's active cart items into an order.
@@ -133,8 +136,18 @@ class Database:
             KnownAppError: If user is not authenticated (401), no active cart found (404),
                           cart is empty (400), or database operation fails (500)
         """
-        return self.function_map["place_order"](access_token=access_token)
-
+        return order.place_order(access_token=access_token)
+
+    @tool(
+        "Update the quantity of a cart item.",
+        {
+            "cart_item_id": {"type": "string", "description": "The cart item ID to update"},
+            "quantity": {"type": "integer", "description": "The new quantity"},
+        },
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.CART_ITEM,
+    )
     def update_cart_item(self, cart_item_id, quantity, access_token):
         """
         Updates the quantity of a specific cart item with stock validation.
@@ -151,12 +164,19 @@ class Database:
             KnownAppError: If cart item not found (404), insufficient stock (400),
                           or database operation fails (500)
         """
-        return self.function_map["update_cart_item"](
+        return cart.update_cart_item(
             cart_item_id=cart_item_id, 
             quantity=quantity, 
             access_token=access_token
         )
 
+    @tool(
+        "Delete a cart item by its ID.",
+        {"cart_item_id": {"type": "string", "description": "The cart item ID to delete"}},
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.DELETED_CART_ITEM,
+    )
     def delete_cart_item(self, cart_item_id, access_token):
         """
         Deletes a specific cart item from the user's cart.
@@ -171,11 +191,22 @@ class Database:
         Raises:
             KnownAppError: If database operation fails (500 status code)
         """
-        return self.function_map["delete_cart_item"](
+        return cart.delete_cart_item(
             cart_item_id=cart_item_id, 
             access_token=access_token
         )
 
+    @tool(
+        "Update the status or total amount of an order.",
+        {
+            "order_id": {"type": "string", "description": "The order ID to update"},
+            "status": {"type": "string", "description": "The new status"},
+            "total_amount": {"type": "number", "description": "The new total amount"},
+        },
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.ORDER,
+    )
     def update_order(self, order_id, status, total_amount, access_token):
         """
         Updates an order's status and total amount.
@@ -192,13 +223,20 @@ class Database:
         Raises:
             KnownAppError: If database operation fails (500 status code)
         """
-        return self.function_map["update_order"](
+        return order.update_order(
             order_id=order_id, 
             status=status, 
             total_amount=total_amount, 
             access_token=access_token
         )
 
+    @tool(
+        "Delete an order by its ID.",
+        {"order_id": {"type": "string", "description": "The order ID to delete"}},
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.DELETED_ORDER,
+    )
     def delete_order(self, order_id, access_token):
         """
         Deletes an order by its ID.
@@ -213,14 +251,25 @@ class Database:
         Raises:
             KnownAppError: If database operation fails (500 status code)
         """
-        return self.function_map["delete_order"](
+        return order.delete_order(
             order_id=order_id, 
             access_token=access_token
         )
 
+    @tool(
+        "Update the quantity or price of an order item.",
+        {
+            "order_item_id": {"type": "string", "description": "The order item ID to update"},
+            "quantity": {"type": "integer", "description": "The new quantity"},
+            "item_price": {"type": "number", "description": "The new item price"},
+        },
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.ORDER_ITEM,
+    )
     def update_order_item(self, order_item_id, quantity, item_price, access_token):
         """
-        Updates an order item's quantity and price, recalculating order total.
+        Updates an order item's quantity and price, adjusting the order total.
 
         Args:
             order_item_id (str): The order item ID to update
@@ -229,37 +278,50 @@ class Database:
             access_token (str): User's access token for authentication
 
         Returns:
-            dict: The updated order item data
+            list: The updated order item data, with the new order_total
             
         Raises:
-            KnownAppError: If order item not found (404) or database operation fails (500)
+            KnownAppError: If the quantity or price is invalid (400), order item
+                           not found (404) or database operation fails (500)
         """
-        return self.function_map["update_order_item"](
+        return order.update_order_item(
             order_item_id=order_item_id, 
             quantity=quantity, 
             item_price=item_price, 
             access_token=access_token
         )
 
+    @tool(
+        "Delete an order item by its ID.",
+        {"order_item_id": {"type": "string", "description": "The order item ID to delete"}},
+        requires_token=True,
+        mode=WRITE,
+        output=tool_output.DELETED_ORDER_ITEM,
+    )
     def delete_order_item(self, order_item_id, access_token):
         """
-        Deletes an order item and recalculates the order total.
+        Deletes an order item and adjusts the order total.
 
         Args:
             order_item_id (str): The order item ID to delete
             access_token (str): User's access token for authentication
 
         Returns:
-            dict: The deleted order item data
+            list: The deleted order item data, with the new order_total
             
         Raises:
             KnownAppError: If order item not found (404) or database operation fails (500)
         """
-        return self.function_map["delete_order_item"](
+        return order.delete_order_item(
             order_item_id=order_item_id, 
             access_token=access_token
         )
 
+    @tool(
+        "Get the authenticated user's active cart and its items.",
+        requires_token=True,
+        output=tool_output.CART,
+    )
     def get_user_cart(self, access_token):
         """
         Gets the complete cart information for the authenticated user.
@@ -274,24 +336,37 @@ class Database:
         Raises:
             KnownAppError: If user is not authenticated (401 status code)
         """
-        return self.function_map["get_user_cart"](access_token=access_token)
+        return cart.get_user_cart(access_token=access_token)
 
-    def get_user_orders(self, access_token):
+    @tool(
+        "Get the authenticated user's orders, newest first, including their items. Returns one page; when has_more is true, call again with its next_before value as 'before' to see older orders.",
+        {
+            "before": {"type": ["string", "null"], "description": "next_before value of the previous page, or null for the most recent orders"},
+            "limit": {"type": ["integer", "null"], "description": "Number of orders to return, or null for the default"},
+        },
+        requires_token=True,
+        output=tool_output.ORDER_PAGE,
+    )
+    def get_user_orders(self, access_token, before=None, limit=None):
         """
-        Gets all orders for the authenticated user, including their items.
+        Gets one page of orders for the authenticated user, including their items.
 
         Args:
             access_token (str): User's access token for authentication
+            before (str, optional): The next_before cursor of the previous page
+            limit (int, optional): Page size; defaults to the number of orders
+                                   the chat tool output shows
 
         Returns:
-            list: A list of dictionaries containing order information with items.
-                  Each order includes order details and a list of order items.
-                  Returns empty list if no orders found.
+            dict: The orders of the page under "orders", each with its items,
+                  plus "has_more" and the "next_before" cursor of the
+                  following page (None on the last page).
                   
         Raises:
-            KnownAppError: If user is not authenticated (401 status code)
+            KnownAppError: If user is not authenticated (401) or the ``before``
+                          cursor is invalid (400)
         """
-        return self.function_map["get_user_orders"](access_token=access_token)
+        return order.get_user_orders(access_token=access_token, before=before, limit=limit or tool_output.ORDERS.max_rows)
 
     def add_to_wishlist(self, variant_id, access_token):
         """
@@ -308,7 +383,7 @@ class Database:
             KnownAppError: If user is not authenticated (401), item already in wishlist (400),
                           or database operation fails (500)
         """
-        return self.function_map["add_to_wishlist"](
+        return wishlist.add_to_wishlist(
             variant_id=variant_id, 
             access_token=access_token
         )
@@ -328,7 +403,7 @@ class Database:
             KnownAppError: If user is not authenticated (401), item not found in wishlist (404),
                           or database operation fails (500)
         """
-        return self.function_map["remove_from_wishlist"](
+        return wishlist.remove_from_wishlist(
             variant_id=variant_id, 
             access_token=access_token
         )
@@ -348,4 +423,4 @@ class Database:
         Raises:
             KnownAppError: If user is not authenticated (401) or database operation fails (500)
         """
-        return self.function_map["get_wishlist_items"](access_token=access_token)
\ No newline at end of file
+        return wishlist.get_wishlist_items(access_token=access_token)
\ No newline at end of file
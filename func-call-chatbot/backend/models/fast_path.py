@@ -0,0 +1,56 @@
+"""
+Deterministic intents that are answered without calling the LLM.
+
+The chat widget's action buttons send a small, fixed set of messages such as
+"view cart" or "my orders". This module recognizes those exact intents so the
+chat engine can serve them straight from the database and render the answer
+server-side. Only read-only intents are listed: anything that changes the
+user's data, such as "place order", goes through the model, which confirms
+it with the user first.
+"""
+
+import re
+from typing import Optional
+
+
+VIEW_CART = "view_cart"
+VIEW_ORDERS = "view_orders"
+SHOW_PRODUCTS = "show_products"
+
+FAST_PATH_INTENTS = {
+    "view cart": VIEW_CART,
+    "show cart": VIEW_CART,
+    "my cart": VIEW_CART,
+    "my orders": VIEW_ORDERS,
+    "view orders": VIEW_ORDERS,
+    "order history": VIEW_ORDERS,
+    "show products": SHOW_PRODUCTS,
+    "continue shopping": SHOW_PRODUCTS,
+}
+"""Normalized read-only action-button messages mapped to intents"""
+
+SIGN_IN_REQUIRED = {
+    VIEW_CART: "Please sign in to view your cart.",
+    VIEW_ORDERS: "Please sign in to view your orders.",
+}
+
+_NON_WORD = re.compile(r"[^a-z]+")
+
+
+def match_intent(user_input: str) -> Optional[str]:
+    """
+    Returns the fast-path intent for a message, if it is one of the fixed intents.
+
+    Matching is exact after lower-casing and collapsing punctuation and
+    whitespace, so free-form messages always go to the model.
+
+    Args:
+        user_input (str): The raw user message.
+
+    Returns:
+        str or None: The intent name, or None when the message needs the LLM.
+    """
+    if len(user_input) > 40:
+        return None
+    normalized = " ".join(_NON_WORD.sub(" ", user_input.lower()).split())
+    return FAST_PATH_INTENTS.get(normalized)
@@ -0,0 +1,227 @@
+"""
+Server-side Markdown rendering of store data for chat responses.
+
+This module turns cart, order and product rows returned by the data layer into
+the Markdown tables shown in the chat widget. Money values are handled as
+Decimal so that line totals and grand totals are exact.
+"""
+
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional
+
+
+CENT = Decimal("0.01")
+
+TABLE_PLACEHOLDER = re.compile(r"\{\{(table_\d+)\}\}")
+
+
+def to_decimal(value: Any) -> Decimal:
+    """
+    Converts a price coming from the database or JSON into a Decimal.
+
+    Floats are converted through their string representation so that values
+    such as 22.99 do not pick up binary rounding noise.
+    """
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def format_money(value: Any) -> str:
+    return f"${to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP):,}"
+
+
+def _cell(value: Any) -> str:
+    text = "" if value is None else str(value)
+    return text.replace("|", "\\|").replace("\n", " ")
+
+
+def _table(headers: List[str], rows: Iterable[Iterable[Any]]) -> str:
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "|" + "|".join("-" * (len(header) + 2) for header in headers) + "|",
+    ]
+    for row in rows:
+        cells = (_cell(value) for value in row)
+        lines.append("|" + "|".join(f" {cell} " if cell else " " for cell in cells) + "|")
+    return "\n".join(lines)
+
+
+def _format_date(value: Optional[str]) -> str:
+    return (value or "")[:10]
+
+
+def render_cart(cart: Optional[Dict[str, Any]]) -> str:
+    """
+    Renders the user's cart as a Markdown table with line and grand totals.
+
+    Args:
+        cart (dict or None): Cart as returned by ``get_user_cart``.
+
+    Returns:
+        str: The rendered cart, or a short message when the cart is empty.
+    """
+    items = (cart or {}).get("items") or []
+    if not items:
+        return "Your cart is empty."
+
+    rows = []
+    cart_total = Decimal("0")
+    for item in items:
+        price = to_decimal(item.get("price"))
+        line_total = price * int(item.get("quantity") or 0)
+        cart_total += line_total
+        rows.append([
+            item.get("name"),
+            item.get("size"),
+            item.get("color"),
+            item.get("quantity"),
+            format_money(price),
+            format_money(line_total),
+        ])
+    rows.append(["**Total**", "", "", "", "", f"**{format_money(cart_total)}**"])
+
+    return "**Your Cart**\n" + _table(
+        ["product name", "size", "color", "quantity", "price", "total"], rows
+    )
+
+
+def render_orders(page: Optional[Dict[str, Any]]) -> str:
+    """
+    Renders each order as its own Markdown table titled "Order N (date)".
+
+    Order ids are never shown. The total row uses the stored order total and
+    falls back to the sum of the line items when it is missing. When older
+    orders follow the page, a closing line says so.
+
+    Args:
+        page (dict or None): A page of orders as returned by ``get_user_orders``.
+
+    Returns:
+        str: The rendered orders, or a short message when there are none.
+    """
+    orders = (page or {}).get("orders") or []
+    if not orders:
+        return "You don't have any orders yet."
+
+    tables = []
+    for index, order in enumerate(orders, start=1):
+        status = str(order.get("status") or "").capitalize()
+        rows = []
+        items_total = Decimal("0")
+        for item in order.get("items") or []:
+            price = to_decimal(item.get("price"))
+            items_total += price * int(item.get("quantity") or 0)
+            rows.append([
+                item.get("name"),
+                item.get("size"),
+                item.get("color"),
+                item.get("quantity"),
+                format_money(price),
+                status,
+            ])
+        total = order.get("total_amount")
+        total = to_decimal(total) if total is not None else items_total
+        rows.append(["**Total**", "", "", "", f"**{format_money(total)}**", ""])
+
+        title = f"**Order {index}** ({_format_date(order.get('order_date'))})"
+        tables.append(title + "\n" + _table(
+            ["product name", "size", "color", "quantity", "price", "status"], rows
+        ))
+    if page.get("has_more"):
+        tables.append(f"These are your {len(orders)} most recent orders; ask to see older ones.")
+    return "\n\n".join(tables)
+
+
+def render_product_list(variants: Optional[List[Dict[str, Any]]]) -> str:
+    """
+    Renders the catalog as one row per product with its sizes, colors and price.
+
+    Args:
+        variants (list or None): Product variants as returned by ``get_all_shirts``.
+
+    Returns:
+        str: The rendered catalog, or a short message when nothing is available.
+    """
+    if not variants:
+        return "There are no t-shirts available right now."
+
+    products = {}
+    for variant in variants:
+        product = products.setdefault(variant.get("name"), {"sizes": [], "colors": [], "prices": set()})
+        if variant.get("size") not in product["sizes"]:
+            product["sizes"].append(variant.get("size"))
+        if variant.get("color") not in product["colors"]:
+            product["colors"].append(variant.get("color"))
+        product["prices"].add(to_decimal(variant.get("price")))
+
+    rows = []
+    for name, product in products.items():
+        low, high = min(product["prices"]), max(product["prices"])
+        price = format_money(low) if low == high else f"{format_money(low)} - {format_money(high)}"
+        rows.append([name, ", ".join(map(str, product["sizes"])), ", ".join(map(str, product["colors"])), price])
+
+    return "**Available T-Shirts**\n" + _table(["product name", "sizes", "colors", "price"], rows)
+
+
+def product_key(name: Optional[str]) -> str:
+    """Normalizes a product name for lookups (case and apostrophe style)."""
+    return (name or "").replace("\u2019", "'").strip().lower()
+
+
+def render_product_details(variants: Optional[List[Dict[str, Any]]], product_info: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """
+    Renders matching variants as one "field | value" table per product.
+
+    Args:
+        variants (list or None): Product variants as returned by ``get_t_shirt``.
+        product_info (dict, optional): Descriptions and categories keyed by
+                                       ``product_key(name)``.
+
+    Returns:
+        str: The rendered product details, or a short message when nothing matched.
+    """
+    if not variants:
+        return "No matching t-shirts were found."
+
+    products = {}
+    for variant in variants:
+        product = products.setdefault(variant.get("name"), {"sizes": [], "colors": []})
+        if variant.get("size") not in product["sizes"]:
+            product["sizes"].append(variant.get("size"))
+        if variant.get("color") not in product["colors"]:
+            product["colors"].append(variant.get("color"))
+
+    tables = []
+    for name, product in products.items():
+        info = (product_info or {}).get(product_key(name), {})
+        rows = []
+        if info.get("description"):
+            rows.append(["Design", info["description"]])
+        if info.get("category"):
+            rows.append(["Category", str(info["category"]).title()])
+        rows.append(["Available Sizes", ", ".join(map(str, product["sizes"]))])
+        rows.append(["Available Colors", ", ".join(map(str, product["colors"]))])
+        tables.append(f"**{_cell(name)}**\n" + _table(["field", "value"], rows))
+    return "\n\n".join(tables)
+
+
+def substitute_tables(text: str, tables: Dict[str, str]) -> str:
+    """
+    Replaces ``{{table_N}}`` placeholders written by the model with rendered tables.
+
+    Unknown placeholders are left untouched.
+
+    Args:
+        text (str): The model's reply.
+        tables (dict): Rendered tables keyed by placeholder name.
+
+    Returns:
+        str: The reply with every known placeholder expanded.
+    """
+    if not tables:
+        return text
+    return TABLE_PLACEHOLDER.sub(lambda match: tables.get(match.group(1), match.group(0)), text)
@@ -0,0 +1,191 @@
+"""
+Per-completion model routing.
+
+Most turns do not need the largest model: a short confirmation ("yes, add
+it"), a paraphrase of a knowledge base answer, or turning a single tool result
+into a reply. The router sends those completions to a faster model and keeps
+multi-step or ambiguous turns on the main model.
+
+A fast response is checked before it is used. If it calls a tool with
+arguments that do not satisfy the tool's schema, or asks for the full tool
+list, the completion is repeated on the main model and the rest of the turn
+stays there. The escalation rate is
+``chat_model_escalations_total / chat_model_route_total{route="fast"}``.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.metrics import registry
+from models.tool_selection import KNOWLEDGE, REQUEST_ALL_TOOLS, classify
+
+
+FAST = "fast"
+MAIN = "main"
+
+INVALID_ARGUMENTS = "invalid_arguments"
+UNKNOWN_TOOL = "unknown_tool"
+AMBIGUOUS = "ambiguous"
+
+model_routes = registry.counter(
+    "chat_model_route_total", "Completions by model route", ["route"]
+)
+model_route_duration = registry.histogram(
+    "chat_model_route_duration_seconds", "Completion latency by model route", ["route"]
+)
+model_escalations = registry.counter(
+    "chat_model_escalations_total", "Fast completions repeated on the main model", ["reason"]
+)
+
+_WORD = re.compile(r"[a-z']+")
+
+CONFIRMATION_WORDS = {
+    "yes", "yeah", "yep", "sure", "ok", "okay", "please", "thanks", "thank", "you", "no", "nope",
+    "add", "it", "that", "one", "them", "do", "go", "ahead", "sounds", "good", "great", "perfect",
+    "fine", "correct", "right", "exactly", "cool", "nice", "and", "the", "too", "just",
+}
+"""Words a short confirmation or acknowledgement is made of"""
+
+FAQ_MAX_WORDS = 25
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+def validate_arguments(parameters: Dict[str, Any], arguments: str) -> bool:
+    """
+    Checks tool call arguments against the tool's JSON schema.
+
+    Only the subset of JSON Schema used by the tool definitions is checked:
+    required and unexpected properties, property types and enums.
+
+    Args:
+        parameters (dict): The tool's ``parameters`` schema.
+        arguments (str): The JSON arguments produced by the model.
+
+    Returns:
+        bool: True if the arguments are usable.
+    """
+    try:
+        args = json.loads(arguments or "{}")
+    except ValueError:
+        return False
+    if not isinstance(args, dict):
+        return False
+    properties = parameters.get("properties", {})
+    if any(name not in args for name in parameters.get("required", [])):
+        return False
+    if parameters.get("additionalProperties") is False and any(name not in properties for name in args):
+        return False
+    for name, value in args.items():
+        schema = properties.get(name, {})
+        types = schema.get("type")
+        types = types if isinstance(types, list) else [types] if types else []
+        if value is None and "null" in types:
+            continue
+        expected = tuple(_JSON_TYPES[t] for t in types if t in _JSON_TYPES)
+        if expected and (not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected)):
+            return False
+        if "enum" in schema and value not in schema["enum"]:
+            return False
+    return True
+
+
+class ModelRouter:
+    """
+    Chooses the model for each completion of a turn.
+
+    Args:
+        fast_model (str): Model for simple completions.
+        main_model (str): Model for everything else and for escalations.
+        tools (list): The engine's full tool list, used to validate fast tool calls.
+        product_names (iterable): Lower-cased catalog product names, passed to the tool classifier.
+        max_fast_words (int): Longest message treated as a confirmation.
+    """
+
+    def __init__(self, fast_model: str, main_model: str, tools: List[Dict[str, Any]], product_names: Iterable[str] = (), max_fast_words: int = 8):
+        self.fast_model = fast_model
+        self.main_model = main_model
+        self.parameters = {tool["name"]: tool.get("parameters", {}) for tool in tools}
+        self.product_names = tuple(name for name in product_names if name)
+        self.max_fast_words = max_fast_words
+
+    def start(self, user_input: str) -> "TurnRoute":
+        """
+        Classifies a user message and returns the routing state for its turn.
+
+        Confirmations and knowledge base questions start on the fast model.
+        Any turn touching a single tool group may format its first tool result
+        on the fast model; turns spanning several groups, or with no clear
+        signal, stay on the main model throughout.
+        """
+        words = _WORD.findall(user_input.lower())
+        groups = classify(user_input, self.product_names)
+        confirmation = 0 < len(words) <= self.max_fast_words and set(words) <= CONFIRMATION_WORDS
+        faq = groups == {KNOWLEDGE} and len(words) <= FAQ_MAX_WORDS
+        single_step = confirmation or len(groups) == 1
+        return TurnRoute(self, fast_first=confirmation or faq, single_step=single_step)
+
+
+class TurnRoute:
+    """Routing state of one turn."""
+
+    __slots__ = ("router", "fast_first", "single_step", "tool_calls", "escalated", "route")
+
+    def __init__(self, router: ModelRouter, fast_first: bool, single_step: bool):
+        self.router = router
+        self.fast_first = fast_first
+        self.single_step = single_step
+        self.tool_calls = 0
+        self.escalated = False
+        self.route = None
+
+    def model(self) -> str:
+        """Picks the route for the next completion and returns its model."""
+        if self.escalated:
+            fast = False
+        elif self.tool_calls == 0:
+            fast = self.fast_first
+        else:
+            # Formatting the result of a single tool call.
+            fast = self.single_step and self.tool_calls == 1
+        self.route = FAST if fast else MAIN
+        model_routes.inc(route=self.route)
+        return self.router.fast_model if fast else self.router.main_model
+
+    def record(self, duration: float):
+        model_route_duration.observe(duration, route=self.route)
+
+    def check(self, response: Any) -> Optional[str]:
+        """
+        Checks a completion before it is used.
+
+        Returns:
+            str or None: The escalation reason if a fast response must be
+                         repeated on the main model; None otherwise. After an
+                         escalation every later completion of the turn uses
+                         the main model.
+        """
+        if self.route != FAST or getattr(response, "type", None) != "function_call":
+            return None
+        reason = None
+        if response.name == REQUEST_ALL_TOOLS:
+            reason = AMBIGUOUS
+        elif response.name not in self.router.parameters:
+            reason = UNKNOWN_TOOL
+        elif not validate_arguments(self.router.parameters[response.name], response.arguments):
+            reason = INVALID_ARGUMENTS
+        if reason is not None:
+            self.escalated = True
+            model_escalations.inc(reason=reason)
+        return reason
+
+    def tool_called(self):
+        self.tool_calls += 1
@@ -0,0 +1,127 @@
+"""
+Speculative prefetching of tool reads.
+
+While the first completion of a turn is in flight, cheap local signals in the
+user's message often reveal which read the model is about to request: "my
+cart" leads to get_user_cart, "orders" to get_user_orders, a product name with
+a size and color to get_t_shirt. The Prefetcher predicts those calls, the
+engine starts them on its tool executor, and a PrefetchSet holds the pending
+results for the rest of the turn. A result is used only if the model asks for
+exactly the same call and nothing in the turn has invalidated it; everything
+else is discarded when the turn ends. Prefetches are not reported as tool
+calls; the engine records one only when it uses the result.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+from core.metrics import registry
+
+
+prefetches = registry.counter(
+    "chat_prefetch_total", "Speculative tool reads by outcome (hit, failed, wasted, invalidated)", ["tool", "outcome"]
+)
+
+_WORD = re.compile(r"[a-z]+")
+
+SIZE_WORDS = {"s": "S", "small": "S", "m": "M", "medium": "M", "l": "L", "large": "L"}
+CART_WORDS = {"cart", "basket"}
+ORDER_WORDS = {"order", "orders", "ordered", "purchases", "bought"}
+MUTATION_WORDS = {"add", "remove", "delete", "update", "change", "place", "cancel", "checkout"}
+
+
+class Prefetcher:
+    """
+    Predicts the reads a message is likely to trigger.
+
+    Args:
+        product_info (dict): Product details keyed by ``product_key(name)``,
+                             each with the display ``name`` and its ``colors``.
+    """
+
+    def __init__(self, product_info: Dict[str, Dict[str, Any]]):
+        self.products = [(key, info.get("name") or key) for key, info in product_info.items() if key]
+        colors = {color for info in product_info.values() for color in info.get("colors") or []}
+        # Longest first so that "light blue" wins over "blue".
+        self.colors = sorted(colors, key=len, reverse=True)
+
+    def predict(self, user_input: str, signed_in: bool) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Returns the (tool, arguments) reads worth starting for a message.
+
+        Args:
+            user_input (str): The user's message.
+            signed_in (bool): Whether the session has an access token; user
+                              reads are only predicted for signed-in users.
+        """
+        text = user_input.lower().replace("’", "'")
+        words = set(_WORD.findall(text))
+        predictions = []
+        if signed_in and not words & MUTATION_WORDS:
+            if words & CART_WORDS:
+                predictions.append(("get_user_cart", {}))
+            elif words & ORDER_WORDS:
+                predictions.append(("get_user_orders", {}))
+
+        product = next((name for key, name in self.products if key in text), None)
+        size = next((SIZE_WORDS[word] for word in _WORD.findall(text) if word in SIZE_WORDS), None)
+        color = next((color for color in self.colors if color.lower() in text), None)
+        if product and size and color:
+            predictions.append(("get_t_shirt", {"name": product, "size": size, "color": color}))
+        return predictions
+
+
+class PrefetchSet:
+    """Pending speculative reads of one turn, keyed by tool cache key."""
+
+    def __init__(self):
+        self._pending = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._pending)
+
+    def add(self, key: str, tool: str, future):
+        self._pending[key] = (tool, future)
+
+    def take(self, key: str):
+        """
+        Removes and returns the future for a call, or None if it was not prefetched.
+
+        The caller reports how the taken read turned out with ``settle``.
+        """
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def settle(self, tool: str, future, used: bool):
+        """
+        Counts a taken read as a hit if its result was used.
+
+        A read that failed or was not waited for is cancelled if it is still
+        running and counted as failed or wasted.
+        """
+        if used:
+            outcome = "hit"
+        elif future.done():
+            outcome = "failed"
+        else:
+            future.cancel()
+            outcome = "wasted"
+        prefetches.inc(tool=tool, outcome=outcome)
+
+    def invalidate(self, tools: Iterable[str]):
+        """Drops prefetched reads of tools whose data a mutation may have changed."""
+        tools = set(tools)
+        for key, (tool, future) in list(self._pending.items()):
+            if tool in tools:
+                del self._pending[key]
+                future.cancel()
+                prefetches.inc(tool=tool, outcome="invalidated")
+
+    def discard(self):
+        """Drops every unused read at the end of the turn."""
+        for tool, future in self._pending.values():
+            future.cancel()
+            prefetches.inc(tool=tool, outcome="wasted")
+        self._pending.clear()
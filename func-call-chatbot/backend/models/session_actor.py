@@ -0,0 +1,179 @@
+"""
+Per-session serialization of chat turns.
+
+Each active chat session gets a lightweight actor: an asyncio task that drains
+a small inbox and runs one turn at a time on a worker thread. Turns of the same
+session therefore never interleave their history updates, while different
+sessions run fully in parallel. A message identical to one already queued or in
+flight (a double click, or two tabs sending the same thing) is coalesced onto
+the existing turn; once the inbox is full further messages are rejected. When
+every caller waiting for a turn has gone away, the turn's cancel event is set
+so the engine can stop working on it.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from core.metrics import registry
+
+
+session_messages = registry.counter(
+    "chat_session_messages_total", "Chat messages submitted to session actors (accepted, coalesced, rejected, abandoned)", ["outcome"]
+)
+session_queue_depth = registry.histogram(
+    "chat_session_queue_depth", "Messages ahead of a newly accepted message in its session",
+    buckets=(0, 1, 2, 3, 4, 8, 16),
+)
+session_queued = registry.gauge(
+    "chat_session_queued_messages", "Messages waiting in session inboxes"
+)
+session_actors_active = registry.gauge(
+    "chat_session_actors", "Sessions with queued or running turns"
+)
+
+
+class SessionBusy(Exception):
+    """Raised when a session's inbox is full."""
+
+
+class _Message:
+    __slots__ = ("key", "fn", "future", "run_turn", "cancel_event", "waiters")
+
+    def __init__(self, key: str, fn: Callable[[], Any], future: asyncio.Future, run_turn: Callable, cancel_event: Optional[threading.Event]):
+        self.key = key
+        self.fn = fn
+        self.future = future
+        self.run_turn = run_turn
+        self.cancel_event = cancel_event
+        self.waiters = 0
+
+
+class _Actor:
+    """Runs the turns of one session strictly one after another."""
+
+    def __init__(self, owner: "SessionActors", session_id: str):
+        self.owner = owner
+        self.session_id = session_id
+        self.inbox = deque()
+        self.in_flight = None
+        self.task = None
+
+    def duplicate_of(self, key: str) -> Optional[_Message]:
+        if self.in_flight is not None and self.in_flight.key == key:
+            return self.in_flight
+        return next((message for message in self.inbox if message.key == key), None)
+
+    def depth(self) -> int:
+        return len(self.inbox) + (self.in_flight is not None)
+
+    async def drain(self):
+        try:
+            while self.inbox:
+                message = self.inbox.popleft()
+                session_queued.dec()
+                self.in_flight = message
+                try:
+                    result = await message.run_turn(message.fn)
+                except Exception as e:
+                    message.future.set_exception(e)
+                else:
+                    message.future.set_result(result)
+                finally:
+                    self.in_flight = None
+        finally:
+            self.owner._retire(self)
+
+
+class SessionActors:
+    """
+    Registry of per-session actors.
+
+    Args:
+        inbox_size (int): Messages a session may have waiting behind the
+                          running turn before new ones are rejected.
+        run_turn (callable, optional): Coroutine function that runs a blocking
+                                       callable off the event loop; defaults to
+                                       Starlette's thread pool.
+    """
+
+    def __init__(self, inbox_size: int = 2, run_turn: Optional[Callable] = None):
+        self.inbox_size = inbox_size
+        self.run_turn = run_turn or run_in_threadpool
+        self._actors: Dict[str, _Actor] = {}
+
+    async def submit(self, session_id: str, key: str, fn: Callable[[], Any], run_turn: Optional[Callable] = None, cancel_event: Optional[threading.Event] = None) -> Any:
+        """
+        Queues a turn for a session and waits for its result.
+
+        Must be called from the event loop; ``fn`` runs on a worker thread.
+
+        Args:
+            session_id (str): The session the turn belongs to.
+            key (str): Identity used to coalesce duplicate messages, e.g. the message text.
+            fn (callable): Blocking function that runs the turn.
+            run_turn (callable, optional): Overrides the registry's ``run_turn``
+                                           for this message, e.g. to use a
+                                           dedicated executor.
+            cancel_event (threading.Event, optional): Set once every caller
+                                                      waiting for the turn was
+                                                      cancelled; ``fn`` should
+                                                      watch it. Ignored when the
+                                                      message is coalesced.
+
+        Returns:
+            The value returned by ``fn`` (or by the turn it was coalesced with).
+
+        Raises:
+            SessionBusy: If the session's inbox is full.
+        """
+        actor = self._actors.get(session_id)
+        if actor is None:
+            actor = self._actors[session_id] = _Actor(self, session_id)
+            session_actors_active.inc()
+
+        duplicate = actor.duplicate_of(key)
+        if duplicate is not None:
+            session_messages.inc(outcome="coalesced")
+            return await self._wait(duplicate)
+
+        if actor.depth() > self.inbox_size:
+            session_messages.inc(outcome="rejected")
+            raise SessionBusy(session_id)
+
+        session_messages.inc(outcome="accepted")
+        session_queue_depth.observe(actor.depth())
+        message = _Message(key, fn, asyncio.get_running_loop().create_future(), run_turn or self.run_turn, cancel_event)
+        actor.inbox.append(message)
+        session_queued.inc()
+        if actor.depth() == 1:
+            actor.task = asyncio.create_task(actor.drain())
+        return await self._wait(message)
+
+    async def _wait(self, message: _Message) -> Any:
+        # The turn keeps running as long as anyone is still waiting for it.
+        message.waiters += 1
+        try:
+            return await asyncio.shield(message.future)
+        except asyncio.CancelledError:
+            if message.waiters == 1 and not message.future.done() and message.cancel_event is not None:
+                message.cancel_event.set()
+                session_messages.inc(outcome="abandoned")
+            raise
+        finally:
+            message.waiters -= 1
+
+    def _retire(self, actor: _Actor):
+        if self._actors.get(actor.session_id) is actor and not actor.inbox:
+            del self._actors[actor.session_id]
+            session_actors_active.dec()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_sessions": len(self._actors),
+            "queued_messages": sum(len(actor.inbox) for actor in self._actors.values()),
+            "running_turns": sum(actor.in_flight is not None for actor in self._actors.values()),
+        }
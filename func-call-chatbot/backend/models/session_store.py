@@ -0,0 +1,280 @@
+"""
+Bounded chat session store with LRU/TTL eviction and disk spill.
+
+This module provides a SessionStore that keeps at most a fixed number of chat
+sessions resident in memory. Sessions that fall out of the LRU window or stay
+idle longer than the TTL are serialized as compact JSON (zstd-compressed when
+available) into a local SQLite database and rehydrated on their next message.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from core.metrics import BYTES_BUCKETS, registry
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+# Compression contexts are reused; they are only touched while holding the store lock.
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+resident_sessions = registry.gauge(
+    "chat_sessions_resident", "Number of chat sessions currently held in memory"
+)
+session_evictions = registry.counter(
+    "chat_session_evictions_total", "Chat sessions evicted from memory", ["reason"]
+)
+session_rehydrations = registry.counter(
+    "chat_session_rehydrations_total", "Chat sessions restored from disk"
+)
+session_discards = registry.counter(
+    "chat_session_discards_total", "Spilled chat sessions dropped because they could not be read"
+)
+session_bytes = registry.histogram(
+    "chat_session_spill_bytes", "Compressed size of spilled chat sessions", buckets=BYTES_BUCKETS
+)
+
+
+class _Entry:
+    """A resident session together with its bookkeeping."""
+
+    __slots__ = ("session", "last_access", "pins")
+
+    def __init__(self, session, now):
+        self.session = session
+        self.last_access = now
+        self.pins = 0
+
+
+class SessionStore:
+    """
+    Thread-safe, bounded store for chat sessions.
+
+    Sessions are created with ``factory`` on first use, serialized with
+    ``dump`` when evicted and rebuilt with ``load`` when they are requested again.
+    Sessions that are checked out via ``session()`` are pinned and never evicted
+    while a turn is running on them.
+    """
+
+    def __init__(
+        self,
+        *,
+        factory: Callable[[str], Any],
+        dump: Callable[[Any], Dict[str, Any]],
+        load: Callable[[str, Dict[str, Any]], Any],
+        max_sessions: int,
+        ttl_seconds: float,
+        db_path: str,
+        spill_retention_seconds: float = 7 * 24 * 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the store and its SQLite spill table.
+
+        Args:
+            factory (callable): Creates a new session for a session id.
+            dump (callable): Serializes a session into a JSON-compatible dict.
+            load (callable): Rebuilds a session from its id and serialized dict.
+            max_sessions (int): Maximum number of sessions kept in memory.
+            ttl_seconds (float): Idle time after which a session is spilled to disk.
+            db_path (str): Path of the SQLite database used for spilled sessions.
+            spill_retention_seconds (float): Age after which spilled sessions are purged.
+            clock (callable): Monotonic clock, injectable for tests.
+        """
+        self._factory = factory
+        self._dump = dump
+        self._load = load
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl_seconds = ttl_seconds
+        self.spill_retention_seconds = spill_retention_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._resident = OrderedDict()
+        self._evictions = {"lru": 0, "ttl": 0, "shutdown": 0}
+        self._rehydrations = 0
+        self._discards = 0
+        self._spilled_bytes = 0
+        self._spill_count = 0
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chat_session ("
+            " session_id TEXT PRIMARY KEY,"
+            " codec TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " spilled_at REAL NOT NULL)"
+        )
+        self._purge_expired_spills()
+
+    @contextmanager
+    def session(self, session_id: str):
+        """
+        Checks out a session for the duration of a turn.
+
+        The session is created or rehydrated as needed and pinned so that it
+        cannot be evicted until the context exits.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Yields:
+            The resident session object.
+        """
+        entry = self._acquire(session_id)
+        try:
+            yield entry.session
+        finally:
+            with self._lock:
+                entry.pins -= 1
+                entry.last_access = self._clock()
+                if self._resident.get(session_id) is entry:
+                    self._resident.move_to_end(session_id)
+
+    def get(self, session_id: str):
+        """
+        Returns the session for ``session_id`` without pinning it.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            The resident session object.
+        """
+        with self.session(session_id) as session:
+            return session
+
+    def _acquire(self, session_id: str) -> _Entry:
+        with self._lock:
+            now = self._clock()
+            self._evict_idle(now)
+            entry = self._resident.get(session_id)
+            if entry is not None:
+                self._resident.move_to_end(session_id)
+                entry.pins += 1
+                entry.last_access = now
+                return entry
+            entry = _Entry(self._restore_or_create(session_id), now)
+            entry.pins = 1
+            self._resident[session_id] = entry
+            self._evict_overflow()
+            resident_sessions.set(len(self._resident))
+            return entry
+
+    def _restore_or_create(self, session_id: str):
+        row = self._db.execute(
+            "SELECT codec, payload FROM chat_session WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return self._factory(session_id)
+        self._db.execute("DELETE FROM chat_session WHERE session_id = ?", (session_id,))
+        try:
+            state = json.loads(_decompress(row[0], row[1]))
+        except Exception as e:
+            logging.warning(f"Discarding unreadable spilled session {session_id}: {e}")
+            self._discards += 1
+            session_discards.inc()
+            return self._factory(session_id)
+        self._rehydrations += 1
+        session_rehydrations.inc()
+        return self._load(session_id, state)
+
+    def _evict_idle(self, now: float):
+        # Entries are kept in LRU order, so idle sessions sit at the front.
+        expired = []
+        for session_id, entry in self._resident.items():
+            if now - entry.last_access < self.ttl_seconds:
+                break
+            if not entry.pins:
+                expired.append(session_id)
+        for session_id in expired:
+            self._spill(session_id, self._resident[session_id], "ttl")
+
+    def _evict_overflow(self):
+        if len(self._resident) <= self.max_sessions:
+            return
+        for session_id in list(self._resident):
+            if len(self._resident) <= self.max_sessions:
+                break
+            entry = self._resident[session_id]
+            if not entry.pins:
+                self._spill(session_id, entry, "lru")
+
+    def _spill(self, session_id: str, entry: _Entry, reason: str):
+        del self._resident[session_id]
+        payload = json.dumps(self._dump(entry.session), separators=(",", ":"), default=str).encode("utf-8")
+        codec, blob = _compress(payload)
+        self._db.execute(
+            "INSERT OR REPLACE INTO chat_session (session_id, codec, payload, spilled_at) VALUES (?, ?, ?, ?)",
+            (session_id, codec, blob, time.time()),
+        )
+        self._evictions[reason] += 1
+        self._spilled_bytes += len(blob)
+        self._spill_count += 1
+        session_evictions.inc(reason=reason)
+        session_bytes.observe(len(blob))
+        resident_sessions.set(len(self._resident))
+
+    def _purge_expired_spills(self):
+        cutoff = time.time() - self.spill_retention_seconds
+        self._db.execute("DELETE FROM chat_session WHERE spilled_at < ?", (cutoff,))
+
+    def flush(self):
+        """Spills every unpinned resident session to disk, e.g. on shutdown."""
+        with self._lock:
+            for session_id in list(self._resident):
+                entry = self._resident[session_id]
+                if not entry.pins:
+                    self._spill(session_id, entry, "shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the store's occupancy and eviction counters.
+
+        Returns:
+            dict: Resident and spilled session counts, evictions by reason,
+                  rehydrations, discarded spills and the average compressed bytes per spilled session.
+        """
+        with self._lock:
+            spilled = self._db.execute("SELECT COUNT(*) FROM chat_session").fetchone()[0]
+            return {
+                "resident_sessions": len(self._resident),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "spilled_sessions": spilled,
+                "evictions": dict(self._evictions),
+                "rehydrations": self._rehydrations,
+                "discarded_spills": self._discards,
+                "avg_bytes_per_session": (self._spilled_bytes / self._spill_count) if self._spill_count else 0,
+            }
+
+
+def _compress(payload: bytes):
+    if zstandard is not None:
+        return CODEC_ZSTD, _zstd_compressor.compress(payload)
+    return CODEC_ZLIB, zlib.compress(payload, 6)
+
+
+def _decompress(codec: str, blob: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this session")
+        return _zstd_decompressor.decompress(blob)
+    return zlib.decompress(blob)
@@ -0,0 +1,206 @@
+"""
+Per-turn latency and token instrumentation for the chatbot.
+
+Each chat turn gets a TurnTrace that records a timeline of LLM calls, tool
+calls and RAG stages. Every event is also folded into process-wide Prometheus
+histograms and counters, and finished turns slower than a threshold are kept
+in a small ring buffer for inspection on the admin endpoint.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from core.metrics import BYTES_BUCKETS, registry
+
+
+turn_duration = registry.histogram(
+    "chat_turn_duration_seconds", "Wall-clock duration of a chat turn", ["path"]
+)
+llm_call_duration = registry.histogram(
+    "chat_llm_call_duration_seconds", "Duration of a single LLM completion call", ["model"]
+)
+llm_tokens = registry.counter(
+    "chat_llm_tokens_total", "Tokens consumed by LLM completion calls", ["model", "kind"]
+)
+tool_call_duration = registry.histogram(
+    "chat_tool_call_duration_seconds", "Duration of a single tool call", ["tool", "outcome"]
+)
+tool_result_bytes = registry.histogram(
+    "chat_tool_result_bytes", "Size of tool results before encoding", ["tool"], buckets=BYTES_BUCKETS
+)
+rag_stage_duration = registry.histogram(
+    "chat_rag_stage_duration_seconds", "Duration of RAG stages", ["stage"]
+)
+
+_current_trace = contextvars.ContextVar("chat_turn_trace", default=None)
+
+
+class TurnTrace:
+    """Timeline of one chat turn."""
+
+    __slots__ = ("session_id", "path", "user_input", "started_at", "_start", "duration", "outcome", "events")
+
+    def __init__(self, session_id: Optional[str], user_input: str, path: str = "llm"):
+        self.session_id = session_id
+        self.path = path
+        self.user_input = user_input[:200]
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.outcome = None
+        self.events = []
+
+    def add(self, event: Dict[str, Any]):
+        """Appends an event to the timeline, stamped with its offset from the turn start."""
+        event["at"] = round(time.perf_counter() - self._start, 4)
+        self.events.append(event)
+
+    def finish(self, outcome: str = "ok") -> float:
+        self.duration = time.perf_counter() - self._start
+        self.outcome = outcome
+        turn_duration.observe(self.duration, path=self.path)
+        slow_turns.offer(self)
+        return self.duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "path": self.path,
+            "user_input": self.user_input,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "outcome": self.outcome,
+            "events": list(self.events),
+        }
+
+
+class SlowTurnBuffer:
+    """Ring buffer of the most recent turns slower than a threshold."""
+
+    def __init__(self, threshold_seconds: float = 5.0, size: int = 50):
+        self.threshold_seconds = threshold_seconds
+        self._turns = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def configure(self, threshold_seconds: float, size: int):
+        """Sets the threshold and size, keeping the most recent buffered turns."""
+        with self._lock:
+            self.threshold_seconds = threshold_seconds
+            self._turns = deque(self._turns, maxlen=size)
+
+    def offer(self, trace: TurnTrace):
+        if trace.duration is None or trace.duration < self.threshold_seconds:
+            return
+        with self._lock:
+            self._turns.append(trace.to_dict())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Returns the buffered turns, slowest first."""
+        with self._lock:
+            turns = list(self._turns)
+        return sorted(turns, key=lambda turn: turn["duration"], reverse=True)
+
+
+# Configured from the application settings by the chat engine; the RAG system
+# records its stages here too and must not need those settings.
+slow_turns = SlowTurnBuffer()
+
+
+@contextmanager
+def trace_turn(trace: TurnTrace):
+    """
+    Makes ``trace`` the current turn trace for the duration of the block.
+
+    The trace is finished on exit with outcome "ok", or "error" if the block raised.
+    """
+    token = _current_trace.set(trace)
+    outcome = "ok"
+    try:
+        yield trace
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        _current_trace.reset(token)
+        if trace.outcome is None:
+            trace.finish(outcome)
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _current_trace.get()
+
+
+def _record(event: Dict[str, Any]):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(event)
+
+
+def record_llm_call(model: str, duration: float, usage: Any = None):
+    """
+    Records an LLM completion call and its token usage.
+
+    Args:
+        model (str): The model that served the call.
+        duration (float): Call duration in seconds.
+        usage: The response's ``usage`` object, if any.
+    """
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    output_tokens = getattr(usage, "output_tokens", 0) or 0
+    details = getattr(usage, "input_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+    llm_call_duration.observe(duration, model=model)
+    llm_tokens.inc(input_tokens, model=model, kind="input")
+    llm_tokens.inc(output_tokens, model=model, kind="output")
+    llm_tokens.inc(cached_tokens, model=model, kind="cached")
+    _record({
+        "type": "llm",
+        "model": model,
+        "duration": round(duration, 4),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
+    })
+
+
+def record_tool_call(name: str, duration: float, outcome: str, result_bytes: int):
+    """
+    Records a tool call.
+
+    Args:
+        name (str): The tool name.
+        duration (float): Call duration in seconds.
+        outcome (str): "ok", "error", "cached" or "prefetched".
+        result_bytes (int): Size of the raw result.
+    """
+    tool_call_duration.observe(duration, tool=name, outcome=outcome)
+    tool_result_bytes.observe(result_bytes, tool=name)
+    _record({
+        "type": "tool",
+        "tool": name,
+        "duration": round(duration, 4),
+        "outcome": outcome,
+        "result_bytes": result_bytes,
+    })
+
+
+@contextmanager
+def rag_stage(name: str):
+    """
+    Times a RAG stage, recording it on the current turn trace if there is one.
+
+    Args:
+        name (str): Stage name, e.g. "embedding" or "search".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        rag_stage_duration.observe(duration, stage=name)
+        _record({"type": "rag", "stage": name, "duration": round(duration, 4)})
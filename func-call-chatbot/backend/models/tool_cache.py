@@ -0,0 +1,145 @@
+"""
+Memoization of chatbot tool calls.
+
+This module provides a small TTL cache for tool results together with the
+policies that decide which tools are cacheable, for how long, at which scope
+(per session or per process) and which cached reads each mutating tool
+invalidates.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from core.metrics import registry
+
+
+SCOPE_SESSION = "session"
+SCOPE_PROCESS = "process"
+
+
+class CachePolicy:
+    """How long a tool's result may be reused, and by whom."""
+
+    __slots__ = ("ttl_seconds", "scope")
+
+    def __init__(self, ttl_seconds: float, scope: str):
+        self.ttl_seconds = ttl_seconds
+        self.scope = scope
+
+
+CACHE_POLICIES = {
+    # Catalog and knowledge base reads are identical for every user.
+    "get_t_shirt": CachePolicy(30, SCOPE_PROCESS),
+    "get_all_shirts": CachePolicy(30, SCOPE_PROCESS),
+    "search_knowledge_base": CachePolicy(600, SCOPE_PROCESS),
+    # The user's cart and orders are not cached: the REST API changes them too,
+    # and the chat session would not see those changes.
+}
+"""Cacheable tools and their policies; tools not listed are never cached"""
+
+INVALIDATES = {
+    "add_to_cart": ("get_user_cart",),
+    "update_cart_item": ("get_user_cart",),
+    "delete_cart_item": ("get_user_cart",),
+    "place_order": ("get_user_cart", "get_user_orders", "get_t_shirt", "get_all_shirts"),
+    "update_order": ("get_user_orders",),
+    "delete_order": ("get_user_orders",),
+    "update_order_item": ("get_user_orders",),
+    "delete_order_item": ("get_user_orders",),
+}
+"""Cached and prefetched reads made stale by each mutating tool"""
+
+MISSING = object()
+"""Sentinel returned by ToolCache.get on a miss"""
+
+tool_cache_lookups = registry.counter(
+    "chat_tool_cache_lookups_total", "Tool cache lookups by outcome", ["tool", "outcome"]
+)
+
+
+def cache_key(func_name: str, args: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Builds a cache key from a tool name and its canonicalized arguments.
+
+    String arguments are whitespace-trimmed and lower-cased so that trivially
+    different spellings of the same lookup share an entry, and null optional
+    arguments are dropped so that they match an omitted argument.
+
+    Args:
+        func_name (str): The tool name.
+        args (dict): The tool arguments, including any injected access token.
+
+    Returns:
+        tuple: (tool name, canonical JSON of the arguments)
+    """
+    canonical = {
+        key: value.strip().lower() if isinstance(value, str) and key != "access_token" else value
+        for key, value in args.items()
+        if value is not None
+    }
+    return func_name, json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolCache:
+    """
+    Thread-safe, size-bounded TTL cache for tool results.
+
+    Entries are evicted in LRU order once ``max_entries`` is reached, and can be
+    dropped per tool when a mutation makes them stale. Values are copied on the
+    way in and out, so callers may modify what they get without touching the
+    cached entry.
+    """
+
+    def __init__(self, max_entries: int = 256, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Any]:
+        """
+        Returns the cached value for ``key``, or ``MISSING``.
+
+        Args:
+            key (tuple): A key produced by ``cache_key``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: Tuple[str, str], value: Any, ttl_seconds: float):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, func_names: Iterable[str]):
+        """
+        Drops every cached entry for the given tools.
+
+        Args:
+            func_names (iterable): Names of the tools whose results are stale.
+        """
+        names = set(func_names)
+        if not names:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in names]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
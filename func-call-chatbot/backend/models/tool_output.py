@@ -0,0 +1,118 @@
+"""
+Compact encoding of tool results for the model.
+
+Tool outputs are replayed to the model on every later turn of a conversation,
+so this module projects each tool's result down to the fields the model needs
+and serializes them as a header row followed by CSV lines. Every tool has a
+row and character cap; anything beyond it is replaced by an explicit
+"truncated, N more" marker. Tools pick their projection in their declaration
+(see ``models.tool_registry``).
+"""
+
+import csv
+import io
+from typing import Any, Optional, Tuple
+
+
+class OutputSpec:
+    """Projection and size limits for one level of a tool result."""
+
+    __slots__ = ("label", "fields", "max_rows", "child_key", "child")
+
+    def __init__(self, label: str, fields: Tuple[str, ...], max_rows: int = 20, child_key: Optional[str] = None, child: Optional["OutputSpec"] = None):
+        self.label = label
+        self.fields = fields
+        self.max_rows = max_rows
+        self.child_key = child_key
+        self.child = child
+
+
+_CART_ITEMS = OutputSpec("items", ("cart_item_id", "name", "size", "color", "quantity", "price"), max_rows=30)
+_ORDER_ITEMS = OutputSpec("items", ("order_item_id", "name", "size", "color", "quantity", "price"), max_rows=50)
+
+VARIANTS = OutputSpec("variants", ("variant_id", "name", "size", "color", "price", "stock"), max_rows=20)
+CART = OutputSpec("cart", ("status",), max_rows=1, child_key="items", child=_CART_ITEMS)
+ORDERS = OutputSpec("orders", ("order_id", "order_date", "status", "total_amount"), max_rows=10, child_key="items", child=_ORDER_ITEMS)
+ORDER_PAGE = OutputSpec("page", ("has_more", "next_before"), max_rows=1, child_key="orders", child=ORDERS)
+CART_ITEM = OutputSpec("cart_item", ("cart_item_id", "variant_id", "quantity"))
+DELETED_CART_ITEM = OutputSpec("deleted", ("cart_item_id",))
+PLACED_ORDER = OutputSpec("order", ("order_id", "status", "total_amount"), max_rows=1, child_key="items", child=OutputSpec("items", ("variant_id", "quantity", "item_price"), max_rows=50))
+ORDER = OutputSpec("order", ("order_id", "status", "total_amount"))
+DELETED_ORDER = OutputSpec("deleted", ("order_id",))
+ORDER_ITEM = OutputSpec("order_item", ("order_item_id", "quantity", "item_price", "order_total"))
+DELETED_ORDER_ITEM = OutputSpec("deleted", ("order_item_id", "order_total"))
+
+DEFAULT_MAX_CHARS = 4000
+
+
+def _date(value: Any) -> Any:
+    # ISO timestamps are reduced to their date, which is all the model shows.
+    if isinstance(value, str) and len(value) > 10 and value[4:5] == "-" and value[10:11] == "T":
+        return value[:10]
+    return value
+
+
+def _as_rows(value: Any):
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return list(value)
+
+
+def _encode_rows(writer, out, spec: OutputSpec, rows, number_from: Optional[int] = None):
+    shown = rows[:spec.max_rows]
+    header = (("n",) if number_from is not None else ()) + spec.fields
+    out.write(f"{spec.label} ({len(shown)} of {len(rows)}):\n")
+    writer.writerow(header)
+    children = []
+    for index, row in enumerate(shown):
+        values = [_date(row.get(field)) for field in spec.fields]
+        if number_from is not None:
+            values.insert(0, number_from + index)
+        writer.writerow(values)
+        if spec.child is not None:
+            children.append((number_from + index if number_from is not None else None, _as_rows(row.get(spec.child_key))))
+    if len(rows) > len(shown):
+        out.write(f"... truncated, {len(rows) - len(shown)} more {spec.label}\n")
+    for parent, child_rows in children:
+        if parent is not None:
+            out.write(f"{spec.label.rstrip('s')} {parent} ")
+        _encode_rows(writer, out, spec.child, child_rows, number_from=1 if _numbered(spec.child) else None)
+
+
+def _numbered(spec: OutputSpec) -> bool:
+    # Rows are numbered when several of them have children listed below.
+    return spec.child is not None and spec.max_rows > 1
+
+
+def _cap(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"\n... truncated, {len(text) - max_chars} more characters"
+
+
+def encode_tool_output(spec: Optional[OutputSpec], result: Any, max_chars: int = DEFAULT_MAX_CHARS) -> str:
+    """
+    Encodes a tool result as compact text for the model.
+
+    Args:
+        spec (OutputSpec, optional): The tool's projection; without one the
+                                     result is passed through as text.
+        result: The tool result (rows, a single row, None or an error string).
+        max_chars (int): Cap on the encoded text.
+
+    Returns:
+        str: The projected, size-capped encoding.
+    """
+    if spec is None or isinstance(result, str):
+        return _cap(str(result), max_chars)
+
+    rows = _as_rows(result)
+    if not rows:
+        return f"{spec.label} (0 of 0)"
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    _encode_rows(writer, out, spec, rows, number_from=1 if _numbered(spec) else None)
+    return _cap(out.getvalue().rstrip("\n"), max_chars)
@@ -0,0 +1,151 @@
+"""
+Declarative registry of the chat tools.
+
+Methods that the model may call are marked with the ``tool`` decorator, which
+records everything the engine needs to know about them: the description and
+parameters sent to the model, whether the session's access token must be
+injected, whether the tool reads or writes, and how its result is encoded for
+the model. The OpenAI tool list and the dispatch table are derived from these
+declarations once, when the engine builds its ToolRegistry; sessions only look
+tools up by name. Reads the engine makes on its own (e.g. for the action-button
+fast path) are declared the same way with ``offered=False``, which keeps them
+out of the model's tool list.
+"""
+
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from models.tool_output import DEFAULT_MAX_CHARS, OutputSpec
+
+
+READ = "read"
+WRITE = "write"
+
+
+class ToolSpec:
+    """
+    Declaration of one tool.
+
+    Args:
+        name (str): Tool name as seen by the model.
+        description (str): Tool description for the model.
+        properties (dict): JSON schema of each parameter; all are required.
+        requires_token (bool): Whether the session's access token is passed as ``access_token``.
+        mode (str): READ or WRITE; writes always run to completion.
+        output (OutputSpec, optional): Projection used to encode the result;
+                                       results without one are passed as text.
+        max_output_chars (int): Cap on the encoded result.
+        offered (bool): Whether the tool is offered to the model; tools that
+                        are not are only called by the engine itself.
+    """
+
+    __slots__ = ("name", "description", "properties", "requires_token", "mode", "output", "max_output_chars", "offered", "schema")
+
+    def __init__(self, name: str, description: str, properties: Optional[Dict[str, Dict[str, Any]]] = None, requires_token: bool = False, mode: str = READ, output: Optional[OutputSpec] = None, max_output_chars: int = DEFAULT_MAX_CHARS, offered: bool = True):
+        self.name = name
+        self.description = description
+        self.properties = properties or {}
+        self.requires_token = requires_token
+        self.mode = mode
+        self.output = output
+        self.max_output_chars = max_output_chars
+        self.offered = offered
+        self.schema = {
+            "type": "function",
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": self.properties,
+                "required": list(self.properties),
+                "additionalProperties": False,
+            },
+            "strict": True,
+        }
+
+
+def tool(description: str, properties: Optional[Dict[str, Dict[str, Any]]] = None, *, name: Optional[str] = None, requires_token: bool = False, mode: str = READ, output: Optional[OutputSpec] = None, max_output_chars: int = DEFAULT_MAX_CHARS, offered: bool = True):
+    """
+    Marks a method as a chat tool; see ToolSpec for the arguments.
+
+    The tool name defaults to the method name.
+    """
+    def decorate(fn: Callable) -> Callable:
+        fn.__tool_spec__ = ToolSpec(name or fn.__name__, description, properties, requires_token, mode, output, max_output_chars, offered)
+        return fn
+    return decorate
+
+
+def declared_tools(cls: type) -> List[Tuple[str, ToolSpec]]:
+    """Returns the (attribute, spec) pairs of the tools declared on a class, in definition order."""
+    specs = []
+    for klass in reversed(cls.__mro__):
+        for attr, value in vars(klass).items():
+            spec = getattr(value, "__tool_spec__", None)
+            if spec is not None:
+                specs.append((attr, spec))
+    return specs
+
+
+ToolHook = Callable[[str, float, Any, Optional[BaseException]], None]
+
+
+class ToolRegistry:
+    """
+    Tools of one engine and their handlers.
+
+    Args:
+        owners (iterable): Objects whose decorated methods become tools; None
+                           entries (e.g. an unavailable RAG system) are skipped.
+        hooks (iterable, optional): Called after every dispatched call as
+                                    ``hook(name, duration, result, error)``.
+    """
+
+    def __init__(self, owners: Iterable[Any], hooks: Iterable[ToolHook] = ()):
+        self.specs: Dict[str, ToolSpec] = {}
+        self._handlers: Dict[str, Callable] = {}
+        for owner in owners:
+            if owner is None:
+                continue
+            for attr, spec in declared_tools(type(owner)):
+                self.specs[spec.name] = spec
+                self._handlers[spec.name] = getattr(owner, attr)
+        self.hooks = list(hooks)
+        self.schemas = [spec.schema for spec in self.specs.values() if spec.offered]
+        self.requires_token = frozenset(name for name, spec in self.specs.items() if spec.requires_token)
+        self.writes = frozenset(name for name, spec in self.specs.items() if spec.mode == WRITE)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._handlers
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self.specs.get(name)
+
+    def call(self, name: str, args: Dict[str, Any], notify: bool = True) -> Any:
+        """
+        Runs a tool and reports its timing to the hooks.
+
+        Args:
+            name (str): The tool name.
+            args (dict): Keyword arguments, including any injected access token.
+            notify (bool): Whether to report the call to the hooks; False for
+                           speculative calls that may never be used.
+
+        Raises:
+            KeyError: If the tool is not registered.
+        """
+        handler = self._handlers[name]
+        if not notify:
+            return handler(**args)
+        start = time.perf_counter()
+        try:
+            result = handler(**args)
+        except Exception as e:
+            self._notify(name, time.perf_counter() - start, None, e)
+            raise
+        self._notify(name, time.perf_counter() - start, result, None)
+        return result
+
+    def _notify(self, name: str, duration: float, result: Any, error: Optional[BaseException]):
+        for hook in self.hooks:
+            hook(name, duration, result, error)
@@ -0,0 +1,161 @@
+"""
+Per-turn selection of the tool schemas sent to the model.
+
+A lightweight keyword classifier maps each user message to the tool groups it
+is likely to need (catalog, cart, orders, knowledge base). Only those schemas
+are sent with the completion request; a small escape-hatch tool lets the model
+ask for the full list when the guess was wrong. Tool lists for every group
+combination are built once per process and reused.
+"""
+
+import json
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from core.metrics import registry
+
+
+CATALOG = "catalog"
+CART = "cart"
+ORDERS = "orders"
+KNOWLEDGE = "knowledge"
+
+TOOL_GROUPS = {
+    CATALOG: ("get_t_shirt", "add_to_cart"),
+    CART: ("get_user_cart", "add_to_cart", "update_cart_item", "delete_cart_item", "place_order"),
+    ORDERS: ("get_user_orders", "place_order", "update_order", "delete_order", "update_order_item", "delete_order_item"),
+    KNOWLEDGE: ("search_knowledge_base",),
+}
+"""Tools belonging to each group; a tool may belong to several groups"""
+
+GROUP_KEYWORDS = {
+    CATALOG: {
+        "shirt", "shirts", "tshirt", "tshirts", "tee", "tees", "product", "products", "design", "designs",
+        "size", "sizes", "color", "colors", "colour", "colours", "available", "availability", "stock",
+        "price", "prices", "cost", "small", "medium", "large", "black", "white", "pink", "blue",
+    },
+    CART: {
+        "cart", "basket", "add", "remove", "delete", "quantity", "checkout", "buy", "purchase", "order",
+    },
+    ORDERS: {
+        "order", "orders", "ordered", "bought", "history", "status", "cancel", "purchases",
+    },
+    KNOWLEDGE: {
+        "shipping", "ship", "delivery", "deliver", "return", "returns", "exchange", "refund", "refunds",
+        "policy", "policies", "privacy", "payment", "pay", "paypal", "sizing", "fit", "care", "wash",
+        "washing", "material", "materials", "cotton", "faq", "about",
+    },
+}
+"""Single-word signals for each group"""
+
+GROUP_PHRASES = {
+    CART: ("check out", "place order", "place the order"),
+    KNOWLEDGE: ("size chart", "how long", "what kind"),
+}
+"""Multi-word signals for each group"""
+
+REQUEST_ALL_TOOLS = "request_all_tools"
+
+REQUEST_ALL_TOOLS_SCHEMA = {
+    "type": "function",
+    "name": REQUEST_ALL_TOOLS,
+    "description": "Call this only if none of the other available tools can handle the user's request; it unlocks the full tool list.",
+    "parameters": {"type": "object", "properties": {}, "required": [], "additionalProperties": False},
+    "strict": True,
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+tool_selections = registry.counter(
+    "chat_tool_selections_total", "Per-turn tool selections by outcome", ["outcome"]
+)
+tool_schema_bytes = registry.counter(
+    "chat_tool_schema_bytes_total", "Serialized tool schema bytes sent to the model", ["outcome"]
+)
+
+
+def classify(user_input: str, product_names: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    Returns the tool groups a message is likely to need.
+
+    Args:
+        user_input (str): The user's message.
+        product_names (iterable): Lower-cased catalog product names; mentioning
+                                  one selects the catalog group.
+
+    Returns:
+        frozenset: Matched group names; empty when there is no signal.
+    """
+    text = user_input.lower()
+    words = set(_WORD.findall(text.replace("t-shirt", "tshirt")))
+    groups = {group for group, keywords in GROUP_KEYWORDS.items() if words & keywords}
+    groups.update(group for group, phrases in GROUP_PHRASES.items() if any(phrase in text for phrase in phrases))
+    if any(name and name in text for name in product_names):
+        groups.add(CATALOG)
+    return frozenset(groups)
+
+
+class ToolSelector:
+    """
+    Builds and caches the tool list for every combination of groups.
+
+    Created once per engine from the engine's full tool list; lists are
+    constructed on first use and then shared by every session.
+    """
+
+    def __init__(self, tools: List[Dict], product_names: Iterable[str] = ()):
+        self.all_tools = tools
+        self.product_names = tuple(name for name in product_names if name)
+        self._by_name = {tool["name"]: tool for tool in tools}
+        self._all_bytes = len(json.dumps(tools, separators=(",", ":")))
+        self._subsets = {}
+        self._lock = threading.Lock()
+
+    def select(self, user_input: str) -> Optional[List[Dict]]:
+        """
+        Picks the tools to offer for a turn.
+
+        Args:
+            user_input (str): The user's message.
+
+        Returns:
+            list or None: The subset to send, or None to send the full list.
+        """
+        groups = classify(user_input, self.product_names)
+        if not groups:
+            tool_selections.inc(outcome="all")
+            tool_schema_bytes.inc(self._all_bytes, outcome="all")
+            return None
+        tools, size = self._subset(groups)
+        if tools is None:
+            tool_selections.inc(outcome="all")
+            tool_schema_bytes.inc(self._all_bytes, outcome="all")
+            return None
+        tool_selections.inc(outcome="subset")
+        tool_schema_bytes.inc(size, outcome="subset")
+        return tools
+
+    def record_fallback(self):
+        """Counts a turn where the model asked for the full tool list."""
+        tool_selections.inc(outcome="fallback")
+        tool_schema_bytes.inc(self._all_bytes, outcome="fallback")
+
+    def _subset(self, groups: FrozenSet[str]):
+        cached = self._subsets.get(groups)
+        if cached is not None:
+            return cached
+        with self._lock:
+            names = []
+            for group in sorted(groups):
+                for name in TOOL_GROUPS[group]:
+                    if name in self._by_name and name not in names:
+                        names.append(name)
+            # A near-complete subset plus the escape hatch saves nothing.
+            if not names or len(names) >= len(self._by_name) - 1:
+                entry = (None, self._all_bytes)
+            else:
+                tools = [self._by_name[name] for name in names] + [REQUEST_ALL_TOOLS_SCHEMA]
+                entry = (tools, len(json.dumps(tools, separators=(",", ":"))))
+            self._subsets[groups] = entry
+            return entry
@@ -0,0 +1,122 @@
+"""
+Per-turn resource budgets for the chatbot.
+
+A TurnBudget caps how many model calls and tool calls a single chat turn may
+make and how long it may run. The engine checks the budget before every call
+and hands the remaining time to in-flight calls as their timeout; when any
+limit is hit a BudgetExhausted error unwinds the tool loop so the engine can
+return a partial answer instead of holding the worker.
+
+A turn is cancelled when its client goes away. Calls already in flight at that
+point cannot be recalled; what they cost is counted as abandoned work.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from core.metrics import registry
+
+
+MODEL_CALLS = "model_calls"
+TOOL_CALLS = "tool_calls"
+DEADLINE = "deadline"
+CANCELLED = "cancelled"
+
+budget_exhausted = registry.counter(
+    "chat_turn_budget_exhausted_total", "Chat turns cut short by their budget", ["limit"]
+)
+abandoned_work = registry.counter(
+    "chat_abandoned_work_total", "Model and tool calls that finished after their turn was cancelled", ["kind"]
+)
+abandoned_work_seconds = registry.counter(
+    "chat_abandoned_work_seconds_total", "Time spent in calls that finished after their turn was cancelled", ["kind"]
+)
+
+# How often a wait on an in-flight call looks at the cancel event.
+_CANCEL_POLL_SECONDS = 0.25
+
+
+class BudgetExhausted(Exception):
+    """Raised when a turn runs out of model calls, tool calls or time, or is cancelled."""
+
+    def __init__(self, limit: str):
+        super().__init__(f"Turn budget exhausted: {limit}")
+        self.limit = limit
+
+
+class TurnBudget:
+    """
+    Limits for a single chat turn.
+
+    Args:
+        max_model_calls (int): Maximum completion requests per turn.
+        max_tool_calls (int): Maximum tool executions per turn.
+        deadline_seconds (float): Wall-clock limit for the whole turn.
+        cancel_event (threading.Event, optional): Set by the caller to abandon the turn.
+    """
+
+    __slots__ = ("max_model_calls", "max_tool_calls", "deadline", "model_calls", "tool_calls", "cancel_event")
+
+    def __init__(self, max_model_calls: int, max_tool_calls: int, deadline_seconds: float, cancel_event: Optional[threading.Event] = None):
+        self.max_model_calls = max_model_calls
+        self.max_tool_calls = max_tool_calls
+        self.deadline = time.monotonic() + deadline_seconds
+        self.model_calls = 0
+        self.tool_calls = 0
+        self.cancel_event = cancel_event or threading.Event()
+
+    def remaining(self) -> float:
+        """Returns the seconds left before the deadline, never negative."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def record_if_abandoned(self, kind: str, duration: float):
+        """Counts a finished call as abandoned work if the turn was cancelled meanwhile."""
+        if self.cancel_event.is_set():
+            abandoned_work.inc(kind=kind)
+            abandoned_work_seconds.inc(duration, kind=kind)
+
+    def wait(self, future: Future):
+        """
+        Waits for a call running on another thread.
+
+        Raises:
+            BudgetExhausted: If the deadline passes or the turn is cancelled
+                             first; the call itself keeps running.
+        """
+        while True:
+            try:
+                return future.result(timeout=min(self.remaining(), _CANCEL_POLL_SECONDS))
+            except FutureTimeoutError:
+                self.check()
+
+    def check(self):
+        """
+        Raises BudgetExhausted if the turn was cancelled or its deadline has passed.
+
+        Raises:
+            BudgetExhausted: With the limit that was hit.
+        """
+        if self.cancel_event.is_set():
+            raise BudgetExhausted(CANCELLED)
+        if time.monotonic() >= self.deadline:
+            raise BudgetExhausted(DEADLINE)
+
+    def spend_model_call(self):
+        self.check()
+        if self.model_calls >= self.max_model_calls:
+            raise BudgetExhausted(MODEL_CALLS)
+        self.model_calls += 1
+
+    def spend_tool_call(self):
+        self.check()
+        if self.tool_calls >= self.max_tool_calls:
+            raise BudgetExhausted(TOOL_CALLS)
+        self.tool_calls += 1
@@ -1,7 +1,7 @@
 import os
 import json
 import numpy as np
-from openai import OpenAI
+from core.openai_client import create_openai_client, create_upstream_caller, openai_settings
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 
@@ -9,16 +9,19 @@ class EmbeddingGenerator:
     def __init__(self, api_key=None):
         load_dotenv(override=True)
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries happen in the caller, which also enforces deadlines.
+        self.client = create_openai_client(self.api_key, max_retries=0)
+        self.caller = create_upstream_caller("embeddings", hedge=openai_settings().OPENAI_HEDGE_EMBEDDINGS)
         self.model = "text-embedding-3-small"
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text string"""
         try:
-            response = self.client.embeddings.create(
+            response = self.caller.call(lambda timeout: self.client.embeddings.create(
                 model=self.model,
-                input=text
-            )
+                input=text,
+                timeout=timeout
+            ))
             return response.data[0].embedding
         except Exception as e:
             print(f"Error generating embedding: {e}")
@@ -27,10 +30,11 @@ class EmbeddingGenerator:
     def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a batch of texts"""
         try:
-            response = self.client.embeddings.create(
+            response = self.caller.call(lambda timeout: self.client.embeddings.create(
                 model=self.model,
-                input=texts
-            )
+                input=texts,
+                timeout=timeout
+            ))
             return [data.embedding for data in response.data]
         except Exception as e:
             print(f"Error generating batch embeddings: {e}")
@@ -3,6 +3,12 @@ from typing import List, Dict, Any, Optional
 from .embedding_generator import EmbeddingGenerator
 from .vector_store import VectorStore
 from .knowledge_base import KnowledgeBase
+from models.telemetry import rag_stage
+from models.tool_registry import tool
+
+EMBEDDING_FAILED_MESSAGE = "I'm sorry, I couldn't process your search query at the moment."
+SEARCH_FAILED_MESSAGE = "I encountered an error while searching for information."
+TRANSIENT_FAILURE_MESSAGES = frozenset({EMBEDDING_FAILED_MESSAGE, SEARCH_FAILED_MESSAGE})
 
 class RAGSystem:
     def __init__(self):
@@ -48,13 +54,15 @@ class RAGSystem:
                 top_k = 3
                 
             # generate embedding 
-            query_embedding = self.embedding_generator.generate_embedding(query)
+            with rag_stage("embedding"):
+                query_embedding = self.embedding_generator.generate_embedding(query)
             
             if not query_embedding:
-                return "I'm sorry, I couldn't process your search query at the moment."
+                return EMBEDDING_FAILED_MESSAGE
             
             # search for similar vectors
-            results = self.vector_store.search(query_embedding, top_k, content_type)
+            with rag_stage("search"):
+                results = self.vector_store.search(query_embedding, top_k, content_type)
             
             if not results:
                 return "I couldn't find any relevant information for your query."
@@ -66,8 +74,17 @@ class RAGSystem:
             
         except Exception as e:
             print(f"Error in RAG search: {e}")
-            return "I encountered an error while searching for information."
+            return SEARCH_FAILED_MESSAGE
     
+    @tool(
+        "Search the knowledge base for product information, FAQ answers, and policy details. Use this when users ask about product details, shipping, returns, sizing, or general questions about the store.",
+        {"query": {"type": "string", "description": "The search query to find relevant information"}},
+        max_output_chars=2000,
+    )
+    def search_knowledge_base(self, query: str) -> str:
+        """Chat tool entry point: searches every content type for the top 3 results."""
+        return self.search(query, 3, None)
+
     def _format_search_results(self, results: List[tuple], original_query: str) -> str:
         """Format search results into a readable response"""
         if not results:
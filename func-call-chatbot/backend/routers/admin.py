@@ -0,0 +1,33 @@
+import hmac
+
+from fastapi import APIRouter, Request
+from core.config import settings
+from routers.middleware import KnownAppError
+from models.telemetry import slow_turns
+
+router = APIRouter()
+
+
+def _require_admin(request: Request):
+    """
+    Guards admin endpoints with the ``X-Admin-Token`` header.
+
+    Without a configured ADMIN_TOKEN the endpoints are only available in DEBUG mode.
+    """
+    if not settings.ADMIN_TOKEN:
+        if settings.DEBUG:
+            return
+        raise KnownAppError("Admin endpoints are disabled", 404)
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token, settings.ADMIN_TOKEN):
+        raise KnownAppError("Invalid admin token", 403)
+
+
+@router.get("/admin/slow-turns")
+async def get_slow_turns(request: Request):
+    """Returns the most recent slow chat turns with their LLM, tool and RAG timelines, slowest first."""
+    _require_admin(request)
+    return {
+        "threshold_seconds": slow_turns.threshold_seconds,
+        "turns": slow_turns.snapshot(),
+    }
@@ -1,34 +1,167 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request
+from core.config import settings
+from core.metrics import registry
 from routers.middleware import KnownAppError
-from models.chatbot import TShirtChatbot
+from routers.admin import _require_admin
+from models.chatbot import ChatSession, get_engine
+from models.session_actor import SessionActors, SessionBusy
+from models.session_store import SessionStore
 from schemas.chat import ChatResponse, ChatMessage
 from supabase_client import get_access_token
+from core.identity import identity_bound, resolve_identity
 
 router = APIRouter()
-chatbot_sessions = {}
+session_store = SessionStore(
+    factory=ChatSession,
+    dump=ChatSession.export_state,
+    load=ChatSession.from_state,
+    max_sessions=settings.CHAT_MAX_SESSIONS,
+    ttl_seconds=settings.CHAT_SESSION_TTL_SECONDS,
+    db_path=settings.CHAT_SESSION_DB_PATH,
+    spill_retention_seconds=settings.CHAT_SESSION_SPILL_RETENTION_SECONDS,
+)
+session_actors = SessionActors(inbox_size=settings.CHAT_SESSION_INBOX_SIZE)
+# WebSocket turns get their own bounded pool so that long-lived sockets cannot
+# starve the thread pool used by the HTTP endpoints.
+ws_executor = ThreadPoolExecutor(max_workers=settings.CHAT_WS_WORKERS, thread_name_prefix="chat-ws")
+
+# How often a running HTTP chat request checks whether its client is still there.
+DISCONNECT_POLL_SECONDS = 0.5
+
+ws_connections = registry.gauge(
+    "chat_ws_connections", "Open chat WebSocket connections"
+)
+ws_messages = registry.counter(
+    "chat_ws_messages_total", "Chat WebSocket messages by outcome (accepted, busy, heartbeat)", ["outcome"]
+)
+
+
+def _resolve_session_id(session_id, access_token):
+    """
+    Picks the session id for a chat request.
+
+    Requests without an explicit session id no longer share a global "default"
+    session: authenticated users are keyed by a hash of their token and anonymous
+    users get a fresh id, which is returned in the response for reuse. Either
+    way the session belongs to the user of its first turn.
+    """
+    if session_id:
+        return session_id
+    if access_token:
+        return "user-" + hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:32]
+    return uuid.uuid4().hex
+
+
+def _turn_key(access_token, message):
+    # Only the same caller's duplicates share a turn: its result was computed
+    # with that caller's token.
+    caller = hashlib.sha256(access_token.encode("utf-8")).hexdigest() if access_token else ""
+    return f"{caller}:{message.strip().lower()}"
+
+
+def _run_turn(session_id, access_token, message, cancel_event=None):
+    if cancel_event is not None and cancel_event.is_set():
+        # The client went away while the turn was queued.
+        return None
+    identity = None
+    if access_token:
+        # Resolve the user once for all tool calls of the turn; tools
+        # report an invalid token themselves.
+        try:
+            identity = resolve_identity(access_token)
+        except KnownAppError:
+            pass
+    user_id = identity.user_id if identity is not None else None
+    with identity_bound(identity), session_store.session(session_id) as session:
+        if not session.claim(user_id):
+            raise KnownAppError("This chat session belongs to another user", status_code=403)
+        # Tools act with this turn's token only, never one left by an earlier turn.
+        session.access_token = access_token
+        engine = get_engine()
+        budget = engine.new_budget(cancel_event) if cancel_event is not None else None
+        return engine.process_user_input(session, message, budget)
+
+
+async def _submit_turn(session_id, access_token, message, run_turn=None):
+    """
+    Runs a chat turn through the session's actor.
+
+    Turns of one session run one at a time on a worker thread; a duplicate of a
+    queued or running message from the same caller shares its result. Cancelling the awaiting task
+    abandons the turn once nobody else waits for it: a queued turn is skipped
+    and a running one stops before its next model or tool call.
+
+    Args:
+        run_turn (callable, optional): Runs the blocking turn; defaults to the
+                                       actors' thread pool.
+
+    Raises:
+        KnownAppError: If the session belongs to another user (403), or it
+                       already has too many messages waiting (429).
+    """
+    cancel_event = threading.Event()
+    try:
+        return await session_actors.submit(
+            session_id,
+            _turn_key(access_token, message),
+            lambda: _run_turn(session_id, access_token, message, cancel_event),
+            run_turn=run_turn,
+            cancel_event=cancel_event,
+        )
+    except SessionBusy:
+        raise KnownAppError("Still working on your previous messages, please wait for a reply", status_code=429)
+
+
+async def _wait_for_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def _submit_http_turn(request, session_id, access_token, message):
+    """
+    Runs a chat turn for an HTTP request, abandoning it if the client disconnects.
+
+    Raises:
+        KnownAppError: If the client went away before the reply was ready (499),
+                       the session belongs to another user (403) or is busy (429).
+    """
+    turn = asyncio.ensure_future(_submit_turn(session_id, access_token, message))
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({turn, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        turn.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if turn not in done:
+        turn.cancel()
+        raise KnownAppError(f"Client {session_id} disconnected", status_code=499)
+    return turn.result()
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_bot(message: ChatMessage, request: Request):
     try:
-        session_id = message.session_id or "default"
         access_token = None
-        
+
         try:
             access_token = get_access_token(request)
         except:
             pass
 
-        if session_id not in chatbot_sessions:
-            chatbot_sessions[session_id] = TShirtChatbot()
-        
-        chatbot = chatbot_sessions[session_id]
-        
-        # Store access token in chatbot session for function calls
-        if access_token:
-            chatbot.access_token = access_token
-        
-        result = chatbot.process_user_input(message.message)
-        
+        session_id = _resolve_session_id(message.session_id, access_token)
+        result = await _submit_http_turn(request, session_id, access_token, message.message)
+
         # Handle the new response format
         if isinstance(result, dict):
             response = result.get("response", "Sorry, I didn't get that.")
@@ -39,33 +172,123 @@ async def chat_with_bot(message: ChatMessage, request: Request):
             action_buttons = None
 
         return ChatResponse(
-            response=response, 
+            response=response,
             session_id=session_id,
             action_buttons=action_buttons
         )
+    except KnownAppError:
+        raise
     except Exception as e:
         raise KnownAppError(str(e), status_code=500)
-    
+
+
+@router.get("/chat/sessions/stats")
+def get_session_stats(request: Request):
+    """Returns session store and session actor counters. Admin only."""
+    _require_admin(request)
+    return {**session_store.stats(), **session_actors.stats()}
+
+
+async def _run_on_ws_executor(fn):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ws_executor, contextvars.copy_context().run, fn)
+
+
+class _ChatConnection:
+    """
+    Per-socket queue of chat messages.
+
+    Messages are answered one at a time by a worker task that only exists
+    while the queue is non-empty, so an idle socket costs nothing but its
+    receive loop. When the queue is full the message is refused with a busy
+    frame instead of piling up.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, queue_size: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.queue_size = queue_size
+        self.queue = deque()
+        self.worker = None
+        self.closed = False
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, text: str):
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+    async def offer(self, data: str):
+        if len(self.queue) >= self.queue_size:
+            ws_messages.inc(outcome="busy")
+            await self.send(json.dumps({
+                "type": "busy",
+                "message": "Still working on your previous messages, please wait for a reply",
+            }))
+            return
+        ws_messages.inc(outcome="accepted")
+        self.queue.append(data)
+        if self.worker is None:
+            self.worker = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            while self.queue:
+                data = self.queue.popleft()
+                try:
+                    result = await _submit_turn(self.session_id, None, data, _run_on_ws_executor)
+                except KnownAppError as e:
+                    await self.send(e.message)
+                    continue
+                if result is None:
+                    continue
+
+                # Handle the new response format
+                if isinstance(result, dict):
+                    response = result.get("response", "Sorry, I didn't get that.")
+                else:
+                    response = result
+
+                await self.send(response)
+        except Exception as e:
+            if not self.closed:
+                print(f"WebSocket chat failed for session {self.session_id}: {e}")
+        finally:
+            self.worker = None
+
+    def close(self):
+        """Drops queued messages and cancels the running turn."""
+        self.closed = True
+        self.queue.clear()
+        if self.worker is not None:
+            self.worker.cancel()
+
+
 @router.websocket("/ws/chat/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str):
+    """
+    Chat over a WebSocket.
+
+    Each text frame is a user message and each reply is sent as a text frame.
+    A "ping" frame is answered with {"type": "pong"} right away, even during a
+    long turn; a message that does not fit in the connection's queue is
+    answered with {"type": "busy", ...}. Closing the socket cancels the
+    queued and running turns of the connection. Socket turns carry no access
+    token, so they can only continue anonymous sessions.
+    """
     await websocket.accept()
-    
-    if session_id not in chatbot_sessions:
-        chatbot_sessions[session_id] = TShirtChatbot()
-    
-    chatbot = chatbot_sessions[session_id]
-    
+    connection = _ChatConnection(websocket, session_id, settings.CHAT_WS_QUEUE_SIZE)
+    ws_connections.inc()
+
     try:
         while True:
             data = await websocket.receive_text()
-            result = chatbot.process_user_input(data)
-            
-            # Handle the new response format
-            if isinstance(result, dict):
-                response = result.get("response", "Sorry, I didn't get that.")
-            else:
-                response = result
-            
-            await websocket.send_text(response)
+            if data.strip().lower() == "ping":
+                ws_messages.inc(outcome="heartbeat")
+                await connection.send(json.dumps({"type": "pong"}))
+                continue
+            await connection.offer(data)
     except WebSocketDisconnect:
-        KnownAppError(f"Client {session_id} disconnected")
\ No newline at end of file
+        pass
+    finally:
+        connection.close()
+        ws_connections.dec()
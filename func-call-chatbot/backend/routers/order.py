@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Request, Body
+from typing import Optional
+from fastapi import APIRouter, Request, Body, Query
 from fastapi.responses import JSONResponse
 from models.database import Database
 from schemas.cart import CartItem
 from routers.middleware import KnownAppError
-from supabase_client import get_access_token
+from core.identity import authenticate
+from data_layer.order import ORDER_PAGE_SIZE, MAX_ORDER_PAGE_SIZE
 import os, json
 
 router = APIRouter()
@@ -18,17 +20,17 @@ def get_order():
     return JSONResponse(data)
 
 @router.post("/order/place")
-async def place_order(request: Request):
+def place_order(request: Request):
     try:
-        access_token = get_access_token(request=request)
+        access_token = authenticate(request)
         result = database.place_order(access_token=access_token)
         return {"success": True, "message": "Order placed successfully", "data": result}
     except Exception as e:
         raise KnownAppError(str(e), status_code=500)
 
 @router.patch("/order/{order_id}")
-async def update_order(order_id: str, status: str = Body(...), total_amount: float = Body(...), request: Request = None):
-    access_token = get_access_token(request=request)
+def update_order(order_id: str, status: str = Body(...), total_amount: float = Body(...), request: Request = None):
+    access_token = authenticate(request)
     try:
         result = database.update_order(order_id=order_id, status=status, total_amount=total_amount, access_token=access_token)
         return {"success": True, "message": "Order updated", "data": result}
@@ -36,8 +38,8 @@ async def update_order(order_id: str, status: str = Body(...), total_amount: flo
         raise KnownAppError(str(e), status_code=500)
 
 @router.delete("/order/{order_id}")
-async def delete_order(order_id: str, request: Request = None):
-    access_token = get_access_token(request=request)
+def delete_order(order_id: str, request: Request = None):
+    access_token = authenticate(request)
     try:
         result = database.delete_order(order_id=order_id, access_token=access_token)
         return {"success": True, "message": "Order deleted", "data": result}
@@ -45,8 +47,8 @@ async def delete_order(order_id: str, request: Request = None):
         raise KnownAppError(str(e), status_code=500)
 
 @router.patch("/order/item/{order_item_id}")
-async def update_order_item(order_item_id: str, quantity: int = Body(...), item_price: float = Body(...), request: Request = None):
-    access_token = get_access_token(request=request)
+def update_order_item(order_item_id: str, quantity: int = Body(...), item_price: float = Body(...), request: Request = None):
+    access_token = authenticate(request)
     try:
         result = database.update_order_item(order_item_id=order_item_id, quantity=quantity, item_price=item_price, access_token=access_token)
         return {"success": True, "message": "Order item updated", "data": result}
@@ -54,8 +56,8 @@ async def update_order_item(order_item_id: str, quantity: int = Body(...), item_
         raise KnownAppError(str(e), status_code=500)
 
 @router.delete("/order/item/{order_item_id}")
-async def delete_order_item(order_item_id: str, request: Request = None):
-    access_token = get_access_token(request=request)
+def delete_order_item(order_item_id: str, request: Request = None):
+    access_token = authenticate(request)
     try:
         result = database.delete_order_item(order_item_id=order_item_id, access_token=access_token)
         return {"success": True, "message": "Order item deleted", "data": result}
@@ -63,10 +65,12 @@ async def delete_order_item(order_item_id: str, request: Request = None):
         raise KnownAppError(str(e), status_code=500)
 
 @router.get("/order/user")
-def get_user_orders(request: Request):
-    access_token = get_access_token(request=request)
+def get_user_orders(request: Request, before: Optional[str] = None, limit: int = Query(ORDER_PAGE_SIZE, ge=1, le=MAX_ORDER_PAGE_SIZE)):
+    access_token = authenticate(request)
     try:
-        result = database.get_user_orders(access_token=access_token)
+        result = database.get_user_orders(access_token=access_token, before=before, limit=limit)
         return JSONResponse(content=result)
+    except KnownAppError:
+        raise
     except Exception as e:
         raise KnownAppError(str(e), status_code=500)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Request
+from starlette.concurrency import run_in_threadpool
 from routers.middleware import KnownAppError
 from models.database import Database
 from fastapi.responses import JSONResponse
-from supabase_client import get_access_token
+from core.identity import authenticate
 
 router = APIRouter()
 database = Database()
@@ -10,7 +11,7 @@ database = Database()
 @router.get("/wishlist")
 def get_wishlist_items(request: Request):
     try:
-        access_token = get_access_token(request=request)
+        access_token = authenticate(request)
         result = database.get_wishlist_items(access_token=access_token)
         return JSONResponse(content=result)
     except Exception as e:
@@ -19,7 +20,8 @@ def get_wishlist_items(request: Request):
 @router.post("/wishlist/add")
 async def add_to_wishlist(request: Request):
     try:
-        access_token = get_access_token(request=request)
+        # Token checks may call the auth server, so they stay off the event loop.
+        access_token = await run_in_threadpool(authenticate, request)
         
         # Get the request body
         body = await request.json()
@@ -28,7 +30,7 @@ async def add_to_wishlist(request: Request):
         if not variant_id:
             raise KnownAppError("variant_id is required", status_code=400)
         
-        result = database.add_to_wishlist(variant_id=variant_id, access_token=access_token)
+        result = await run_in_threadpool(database.add_to_wishlist, variant_id=variant_id, access_token=access_token)
         return {"success": True, "message": "Item added to wishlist", "data": result}
     except Exception as e:
         raise KnownAppError(str(e), status_code=500)
@@ -36,7 +38,7 @@ async def add_to_wishlist(request: Request):
 @router.delete("/wishlist/remove")
 async def remove_from_wishlist(request: Request):
     try:
-        access_token = get_access_token(request=request)
+        access_token = await run_in_threadpool(authenticate, request)
         # Get the request body
         body = await request.json()
         variant_id = body.get("variant_id")
@@ -44,7 +46,7 @@ async def remove_from_wishlist(request: Request):
         if not variant_id:
             raise KnownAppError("variant_id is required", status_code=400)
         
-        result = database.remove_from_wishlist(variant_id=variant_id, access_token=access_token)
+        result = await run_in_threadpool(database.remove_from_wishlist, variant_id=variant_id, access_token=access_token)
         return {"success": True, "message": "Item removed from wishlist", "data": result}
     except Exception as e:
         raise KnownAppError(str(e), status_code=500) 
\ No newline at end of file
@@ -0,0 +1,340 @@
+-- Database functions called by the data layer through PostgREST RPC, and the
+-- indexes they rely on.
+-- Apply to the Supabase project with the SQL editor or `psql -f`.
+--
+-- Column types are referenced with %type, so the functions follow the table
+-- definitions. Each function runs in one transaction. Errors meant for the
+-- client are raised with a PTxxx SQLSTATE, which PostgREST returns as HTTP
+-- status xxx.
+--
+-- Grant model: execute is revoked from public and granted to authenticated
+-- only, and every function rejects calls without auth.uid(). All functions
+-- run as the calling user (security invoker), so row-level security applies,
+-- except checkout: it decrements product stock, which customers cannot write,
+-- so it runs as its owner (security definer) with a fixed search_path. It
+-- therefore enforces ownership itself: every row it reads or writes is
+-- reached through the caller's own active cart.
+--
+-- Locking: the active cart row serializes the functions that change a cart.
+-- checkout, add_to_cart and update_cart_item lock it first (FOR UPDATE), so
+-- an item cannot be added to or changed in a cart while it is checked out.
+--
+-- fakes/functions.py mirrors these functions for the SQLite stand-in.
+
+
+-- Turns the caller's active cart into an order in one round trip: checks and
+-- decrements stock, inserts the order and all of its items, and closes the
+-- cart. Returns the order with an "items" array of the inserted order_item rows.
+create or replace function public.checkout()
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_user cart.customer_id%type := auth.uid();
+    v_cart_id cart.cart_id%type;
+    -- As text, since %type[] needs PostgreSQL 17.
+    v_item_ids text[];
+    v_order "order"%rowtype;
+    v_items jsonb;
+    v_short text;
+begin
+    if v_user is null then
+        raise exception 'User not authenticated' using errcode = 'PT401';
+    end if;
+
+    select cart_id into v_cart_id
+      from cart
+     where customer_id = v_user and status = 'active'
+     order by created_at desc
+     limit 1
+       for update;
+    if not found then
+        raise exception 'No active cart found' using errcode = 'PT404';
+    end if;
+
+    -- Lock the items being ordered; everything below works on exactly these rows.
+    select coalesce(array_agg(cart_item_id::text), '{}') into v_item_ids
+      from (select ci.cart_item_id
+              from cart_item ci
+              join cart c using (cart_id)
+             where ci.cart_id = v_cart_id and c.customer_id = v_user
+             order by ci.cart_item_id
+               for update of ci) locked;
+    if cardinality(v_item_ids) = 0 then
+        raise exception 'Cart is empty' using errcode = 'PT400';
+    end if;
+
+    -- Lock the variants in a fixed order so concurrent checkouts cannot deadlock.
+    perform 1
+       from product_variant
+      where variant_id in (select variant_id from cart_item where cart_id = v_cart_id and cart_item_id::text = any(v_item_ids))
+      order by variant_id
+        for update;
+
+    select string_agg(format('%s (%s, %s)', pv.name, pv.size, pv.color), ', ')
+      into v_short
+      from (select variant_id, sum(quantity) as quantity
+              from cart_item
+             where cart_id = v_cart_id and cart_item_id::text = any(v_item_ids)
+             group by variant_id) wanted
+      join product_variant pv using (variant_id)
+     where pv.stock < wanted.quantity;
+    if v_short is not null then
+        raise exception 'Insufficient stock for %', v_short using errcode = 'PT400';
+    end if;
+
+    insert into "order" (customer_id, cart_id, order_date, status, total_amount)
+    select v_user, v_cart_id, now(), 'pending', sum(pv.price * ci.quantity)
+      from cart_item ci
+      join product_variant pv using (variant_id)
+     where ci.cart_id = v_cart_id and ci.cart_item_id::text = any(v_item_ids)
+    returning * into v_order;
+
+    with inserted as (
+        insert into order_item (order_id, variant_id, quantity, item_price)
+        select v_order.order_id, ci.variant_id, ci.quantity, pv.price
+          from cart_item ci
+          join product_variant pv using (variant_id)
+         where ci.cart_id = v_cart_id and ci.cart_item_id::text = any(v_item_ids)
+        returning *
+    )
+    select coalesce(jsonb_agg(to_jsonb(inserted)), '[]'::jsonb) into v_items from inserted;
+
+    update product_variant pv
+       set stock = pv.stock - wanted.quantity
+      from (select variant_id, sum(quantity) as quantity
+              from cart_item
+             where cart_id = v_cart_id and cart_item_id::text = any(v_item_ids)
+             group by variant_id) wanted
+     where pv.variant_id = wanted.variant_id;
+
+    update cart set status = 'ordered' where cart_id = v_cart_id and customer_id = v_user;
+    delete from cart_item where cart_id = v_cart_id and cart_item_id::text = any(v_item_ids);
+
+    return to_jsonb(v_order) || jsonb_build_object('items', v_items);
+end;
+$$;
+
+revoke execute on function public.checkout() from public;
+grant execute on function public.checkout() to authenticated;
+
+
+-- One active cart per user and one row per variant in a cart, so concurrent
+-- adds upsert into the same rows instead of inserting duplicates.
+create unique index if not exists cart_one_active_per_customer
+    on cart (customer_id) where status = 'active';
+create unique index if not exists cart_item_cart_variant_key
+    on cart_item (cart_id, variant_id);
+
+
+-- Adds a variant to the caller's active cart, creating the cart if needed.
+-- Adding a variant that is already in the cart increments its quantity in the
+-- same statement; the increment only applies while the cart quantity stays
+-- within stock. Returns the inserted or updated cart_item row.
+create or replace function public.add_to_cart(p_variant_id product_variant.variant_id%type, p_quantity integer)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_user cart.customer_id%type := auth.uid();
+    v_stock integer;
+    v_cart_id cart.cart_id%type;
+    v_item cart_item%rowtype;
+begin
+    if v_user is null then
+        raise exception 'User not authenticated' using errcode = 'PT401';
+    end if;
+    if p_quantity is null or p_quantity < 1 then
+        raise exception 'Quantity must be at least 1' using errcode = 'PT400';
+    end if;
+
+    select stock into v_stock from product_variant where variant_id = p_variant_id;
+    if not found then
+        raise exception 'Product variant not found' using errcode = 'PT404';
+    end if;
+    if p_quantity > v_stock then
+        raise exception 'Insufficient stock. Available: %, Requested: %', v_stock, p_quantity using errcode = 'PT400';
+    end if;
+
+    -- Lock the active cart, creating it if needed. A cart that a concurrent
+    -- checkout closes while we wait no longer matches, so the loop opens a new one.
+    loop
+        select cart_id into v_cart_id from cart where customer_id = v_user and status = 'active' for update;
+        exit when found;
+        insert into cart (customer_id, status) values (v_user, 'active')
+        on conflict (customer_id) where status = 'active' do nothing;
+    end loop;
+
+    insert into cart_item (cart_id, variant_id, quantity)
+    values (v_cart_id, p_variant_id, p_quantity)
+    on conflict (cart_id, variant_id) do update
+        set quantity = cart_item.quantity + excluded.quantity
+        where cart_item.quantity + excluded.quantity <= v_stock
+    returning * into v_item;
+    if not found then
+        raise exception 'Insufficient stock for updated quantity. Available: %, Requested: %',
+            v_stock,
+            (select quantity + p_quantity from cart_item where cart_id = v_cart_id and variant_id = p_variant_id)
+            using errcode = 'PT400';
+    end if;
+
+    return to_jsonb(v_item);
+end;
+$$;
+
+revoke execute on function public.add_to_cart(product_variant.variant_id%type, integer) from public;
+grant execute on function public.add_to_cart(product_variant.variant_id%type, integer) to authenticated;
+
+
+-- Sets the quantity of one of the caller's cart items, guarded by the
+-- variant's stock, in a single statement. Returns the updated cart_item row.
+create or replace function public.update_cart_item(p_cart_item_id cart_item.cart_item_id%type, p_quantity integer)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_user cart.customer_id%type := auth.uid();
+    v_item cart_item%rowtype;
+    v_stock integer;
+begin
+    if v_user is null then
+        raise exception 'User not authenticated' using errcode = 'PT401';
+    end if;
+    if p_quantity is null or p_quantity < 1 then
+        raise exception 'Quantity must be at least 1' using errcode = 'PT400';
+    end if;
+
+    -- Wait for a checkout of the item's cart to finish.
+    perform 1
+       from cart c
+       join cart_item ci using (cart_id)
+      where ci.cart_item_id = p_cart_item_id and c.customer_id = v_user
+        for update of c;
+
+    update cart_item ci
+       set quantity = p_quantity
+      from product_variant pv, cart c
+     where ci.cart_item_id = p_cart_item_id
+       and pv.variant_id = ci.variant_id
+       and c.cart_id = ci.cart_id
+       and c.customer_id = v_user
+       and p_quantity <= pv.stock
+    returning ci.* into v_item;
+    if found then
+        return to_jsonb(v_item);
+    end if;
+
+    select pv.stock into v_stock
+      from cart_item ci
+      join cart c using (cart_id)
+      join product_variant pv using (variant_id)
+     where ci.cart_item_id = p_cart_item_id and c.customer_id = v_user;
+    if not found then
+        raise exception 'Cart item not found' using errcode = 'PT404';
+    end if;
+    raise exception 'Not enough stock available. Requested: %, Available: %', p_quantity, v_stock using errcode = 'PT400';
+end;
+$$;
+
+revoke execute on function public.update_cart_item(cart_item.cart_item_id%type, integer) from public;
+grant execute on function public.update_cart_item(cart_item.cart_item_id%type, integer) to authenticated;
+
+
+-- Changes the quantity and price of one of the caller's order items and
+-- applies the change of its line amount to the order's total_amount, instead
+-- of summing every line again. Returns the updated order_item row with the new
+-- "order_total".
+create or replace function public.update_order_item(p_order_item_id order_item.order_item_id%type, p_quantity integer, p_item_price numeric)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_user "order".customer_id%type := auth.uid();
+    v_old order_item%rowtype;
+    v_item order_item%rowtype;
+    v_total numeric;
+begin
+    if v_user is null then
+        raise exception 'User not authenticated' using errcode = 'PT401';
+    end if;
+    if p_quantity is null or p_quantity < 1 then
+        raise exception 'Quantity must be at least 1' using errcode = 'PT400';
+    end if;
+    if p_item_price is null or p_item_price < 0 then
+        raise exception 'Item price must not be negative' using errcode = 'PT400';
+    end if;
+
+    select oi.* into v_old
+      from order_item oi
+      join "order" o using (order_id)
+     where oi.order_item_id = p_order_item_id and o.customer_id = v_user
+       for update of oi;
+    if not found then
+        raise exception 'Order item not found' using errcode = 'PT404';
+    end if;
+
+    update order_item
+       set quantity = p_quantity, item_price = p_item_price
+     where order_item_id = p_order_item_id
+    returning * into v_item;
+
+    update "order"
+       set total_amount = total_amount + (v_item.quantity * v_item.item_price - v_old.quantity * v_old.item_price)
+     where order_id = v_item.order_id and customer_id = v_user
+    returning total_amount into v_total;
+
+    return to_jsonb(v_item) || jsonb_build_object('order_total', v_total);
+end;
+$$;
+
+revoke execute on function public.update_order_item(order_item.order_item_id%type, integer, numeric) from public;
+grant execute on function public.update_order_item(order_item.order_item_id%type, integer, numeric) to authenticated;
+
+
+-- Deletes one of the caller's order items and subtracts its line amount from
+-- the order's total_amount. Returns the deleted order_item row with the new
+-- "order_total".
+create or replace function public.delete_order_item(p_order_item_id order_item.order_item_id%type)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_user "order".customer_id%type := auth.uid();
+    v_item order_item%rowtype;
+    v_total numeric;
+begin
+    if v_user is null then
+        raise exception 'User not authenticated' using errcode = 'PT401';
+    end if;
+
+    delete from order_item oi
+     using "order" o
+     where oi.order_item_id = p_order_item_id
+       and o.order_id = oi.order_id
+       and o.customer_id = v_user
+    returning oi.* into v_item;
+    if not found then
+        raise exception 'Order item not found' using errcode = 'PT404';
+    end if;
+
+    update "order"
+       set total_amount = total_amount - v_item.quantity * v_item.item_price
+     where order_id = v_item.order_id and customer_id = v_user
+    returning total_amount into v_total;
+
+    return to_jsonb(v_item) || jsonb_build_object('order_total', v_total);
+end;
+$$;
+
+revoke execute on function public.delete_order_item(order_item.order_item_id%type) from public;
+grant execute on function public.delete_order_item(order_item.order_item_id%type) to authenticated;
@@ -1,59 +1,174 @@
-import os
+"""
+Supabase clients for the data layer.
 
+Every client shares one keep-alive HTTP connection pool (HTTP/2 where the
+server supports it), so no request pays for connection setup. Clients bound
+to a user's access token are cached per token until the token expires; the
+token is attached as the Authorization header when the client is built, which
+never touches the network.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+import jwt
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+from postgrest.exceptions import APIError
 from dotenv import load_dotenv
 from fastapi import Depends, Request
 from routers.middleware import KnownAppError
 from core.config import settings
+from core.metrics import registry
 
 load_dotenv(override=True)
 
 SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_KEY = settings.SUPABASE_KEY
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def get_supabase_client(access_token=None):
-    client = create_client(SUPABASE_URL, SUPABASE_KEY)    
-    if access_token:
-        try:
-            client.auth.set_session(access_token, access_token)
-            print("Session set successfully with set_session")
-        except Exception as e:
-            print(f"Error setting session: {e}")
-            print("Warning: Could not set authentication, proceeding without auth")
-            try:
-                client.auth.session = {
-                    "access_token": access_token,
-                    "refresh_token": access_token,
-                    "expires_at": None
-                }
-                print("Session set successfully with manual assignment")
-            except Exception as e2:
-                print(f"Alternative auth method also failed: {e2}")
-                try:
-                    client.auth.session = {"access_token": access_token}
-                    print("Session set successfully with minimal assignment")
-                except Exception as e3:
-                    print(f"Final auth fallback also failed: {e3}")
-                    try:
-                        client.auth.access_token = access_token
-                        print("Access token set directly")
-                    except Exception as e4:
-                        print(f"Direct token setting also failed: {e4}")
-    
+# Tokens whose expiry cannot be read are cached this long.
+UNKNOWN_EXPIRY_TTL_SECONDS = 300
+
+client_cache_lookups = registry.counter(
+    "supabase_client_cache_lookups_total", "Per-token Supabase client lookups by outcome (hit, miss, expired)", ["outcome"]
+)
+client_cache_size = registry.gauge(
+    "supabase_client_cache_entries", "Cached per-token Supabase clients"
+)
+
+# Owns the connection pool. Each client gets its own lightweight httpx.Client
+# on top of it, because postgrest writes its headers into the client it is given.
+_transport = httpx.HTTPTransport(
+    http2=settings.SUPABASE_HTTP2,
+    limits=httpx.Limits(
+        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_SECONDS,
+    ),
+)
+
+
+def _new_client(access_token=None) -> Client:
+    headers = {"Authorization": f"Bearer {access_token}"} if access_token else {}
+    http_client = httpx.Client(
+        transport=_transport,
+        timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+        follow_redirects=True,
+    )
+    options = SyncClientOptions(
+        headers=headers,
+        httpx_client=http_client,
+        auto_refresh_token=False,
+        persist_session=False,
+    )
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+
+def _token_expiry(access_token):
+    # Only used to bound the cache lifetime; the signature is checked by Supabase.
+    try:
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+        return float(claims["exp"])
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+        return time.time() + UNKNOWN_EXPIRY_TTL_SECONDS
+
+
+class _ClientCache:
+    """Size-bounded LRU of per-token clients, evicting entries when their token expires."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, access_token) -> Client:
+        key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, client = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    client_cache_lookups.inc(outcome="hit")
+                    return client
+                del self._entries[key]
+                client_cache_lookups.inc(outcome="expired")
+            else:
+                client_cache_lookups.inc(outcome="miss")
+
+        client = _new_client(access_token)
+        expires_at = _token_expiry(access_token)
+        if expires_at <= now:
+            # Let Supabase reject it, but don't keep it around.
+            return client
+        with self._lock:
+            self._entries[key] = (expires_at, client)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            client_cache_size.set(len(self._entries))
+        return client
+
+
+_client_cache = _ClientCache(settings.SUPABASE_CLIENT_CACHE_SIZE)
+
+supabase: Client = _new_client()
+
+
+def get_supabase_client(access_token=None) -> Client:
+    """
+    Returns a Supabase client, bound to the user's access token if one is given.
+
+    Clients are shared: do not sign in or out through them, use
+    ``new_supabase_client`` for operations that change the auth session.
+
+    Args:
+        access_token (str, optional): The user's access token.
+
+    Returns:
+        Client: The shared anonymous client, or the cached client for the token.
+    """
+    if not access_token:
+        return supabase
+    return _client_cache.get(access_token)
+
+
+def new_supabase_client() -> Client:
+    """Returns an unshared anonymous client on the shared connection pool, e.g. for signing in."""
+    return _new_client()
+
+
+def call_rpc(client: Client, name: str, params=None):
+    """
+    Calls a database function and returns its result.
+
+    Functions report client errors with a PTxxx SQLSTATE, which PostgREST
+    answers with HTTP status xxx; those become KnownAppErrors with that status.
+
+    Args:
+        client (Client): The client to call the function with, usually bound to the user's token.
+        name (str): The function name.
+        params (dict, optional): Named arguments of the function.
+
+    Raises:
+        KnownAppError: If the function raised a PTxxx error.
+        APIError: For any other database error.
+    """
     try:
-        test_query = client.table("product_variant").select("*").limit(1)
-        print(f"Test query created successfully: {type(test_query)}")
-    except Exception as e:
-        print(f"Test query failed: {e}")
-    
-    return client
+        return client.rpc(name, params or {}).execute().data
+    except APIError as e:
+        code = e.code or ""
+        if code.startswith("PT") and code[2:].isdigit():
+            raise KnownAppError(e.message, status_code=int(code[2:]))
+        raise
+
 
 def get_access_token(request: Request):
     auth_header = request.headers.get("authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise KnownAppError("Missing or invalid authorization header", status_code=401)
     return auth_header.split(" ")[1]
-
-
@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the data layer tests.
+
+The data layer talks to the SQLite Supabase stand-in from ``fakes``, started
+once for the session. The settings are read when the application modules are
+first imported, so the environment is pointed at the stand-in here, before any
+test module imports them.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fakes.supabase_server import SupabaseStandIn  # noqa: E402
+
+_supabase = SupabaseStandIn().start()
+
+os.environ.update({
+    "SUPABASE_URL": _supabase.url,
+    "SUPABASE_KEY": _supabase.anon_key(),
+    "SUPABASE_JWT_SECRET": _supabase.jwt_secret,
+    "OPENAI_API_KEY": "sk-test",
+    "API_PREFIX": "/api",
+    "DEBUG": "false",
+    "ALLOWED_ORIGINS": "http://localhost",
+    "CHAT_SESSION_DB_PATH": os.path.join(tempfile.mkdtemp(), "chat_sessions.sqlite3"),
+})
+
+
+def pytest_unconfigure(config):
+    _supabase.stop()
+
+
+@pytest.fixture
+def supabase():
+    """The Supabase stand-in, with an empty request log."""
+    _supabase.request_log.clear()
+    return _supabase
+
+
+@pytest.fixture
+def make_user(supabase):
+    """Creates a user and returns ``(user_id, access_token)``."""
+    def make():
+        email = f"{uuid.uuid4().hex}@example.com"
+        user_id = supabase.create_user(email, "password")
+        return user_id, supabase.issue_token({"id": user_id, "email": email})
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def make_variant(supabase):
+    """Inserts a product variant and returns its id."""
+    def make(price=10.0, stock=10):
+        variant_id = uuid.uuid4().hex
+        supabase.seed("product_variant", [{
+            "variant_id": variant_id,
+            "name": "Test Shirt",
+            "size": "M",
+            "color": variant_id[:6],
+            "price": price,
+            "stock": stock,
+        }])
+        return variant_id
+    return make
+
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_layer.cart import add_to_cart, update_cart_item
+from routers.middleware import KnownAppError
+
+
+def _cart_items(supabase, user_id):
+    return supabase.db.query(
+        "SELECT ci.* FROM cart_item ci JOIN cart c USING (cart_id) WHERE c.customer_id = ? AND c.status = 'active'",
+        (user_id,),
+    )
+
+
+def test_add_creates_the_cart_in_one_call(supabase, user, make_variant):
+    user_id, token = user
+    variant_id = make_variant()
+    supabase.request_log.clear()
+
+    item = add_to_cart(variant_id=variant_id, quantity=2, access_token=token)
+
+    assert list(supabase.request_log) == [("RPC add_to_cart", {"p_variant_id": variant_id, "p_quantity": 2})]
+    assert (item["variant_id"], item["quantity"]) == (variant_id, 2)
+    assert len(supabase.db.query("SELECT * FROM cart WHERE customer_id = ?", (user_id,))) == 1
+
+
+def test_adding_the_same_variant_increments_the_existing_item(supabase, user, make_variant):
+    user_id, token = user
+    variant_id = make_variant(stock=10)
+
+    first = add_to_cart(variant_id=variant_id, quantity=2, access_token=token)
+    second = add_to_cart(variant_id=variant_id, quantity=3, access_token=token)
+
+    assert second["cart_item_id"] == first["cart_item_id"]
+    assert second["quantity"] == 5
+    assert len(_cart_items(supabase, user_id)) == 1
+
+
+def test_increment_beyond_stock_is_rejected_and_keeps_the_quantity(supabase, user, make_variant):
+    user_id, token = user
+    variant_id = make_variant(stock=5)
+    add_to_cart(variant_id=variant_id, quantity=4, access_token=token)
+
+    with pytest.raises(KnownAppError) as excinfo:
+        add_to_cart(variant_id=variant_id, quantity=2, access_token=token)
+
+    assert (excinfo.value.status_code, excinfo.value.message) == (
+        400, "Insufficient stock for updated quantity. Available: 5, Requested: 6"
+    )
+    assert [item["quantity"] for item in _cart_items(supabase, user_id)] == [4]
+
+
+@pytest.mark.parametrize("quantity, status_code, message", [
+    (6, 400, "Insufficient stock. Available: 5, Requested: 6"),
+    (0, 400, "Quantity must be at least 1"),
+])
+def test_invalid_first_add_is_rejected(supabase, user, make_variant, quantity, status_code, message):
+    user_id, token = user
+    variant_id = make_variant(stock=5)
+
+    with pytest.raises(KnownAppError) as excinfo:
+        add_to_cart(variant_id=variant_id, quantity=quantity, access_token=token)
+
+    assert (excinfo.value.status_code, excinfo.value.message) == (status_code, message)
+    assert supabase.db.query("SELECT * FROM cart WHERE customer_id = ?", (user_id,)) == []
+
+
+def test_unknown_variant_is_not_found(user):
+    _, token = user
+    with pytest.raises(KnownAppError) as excinfo:
+        add_to_cart(variant_id="no-such-variant", quantity=1, access_token=token)
+    assert excinfo.value.status_code == 404
+
+
+def test_concurrent_adds_neither_duplicate_nor_exceed_stock(supabase, user, make_variant):
+    user_id, token = user
+    variant_id = make_variant(stock=25)
+
+    def add():
+        try:
+            add_to_cart(variant_id=variant_id, quantity=1, access_token=token)
+            return True
+        except KnownAppError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: add(), range(30)))
+
+    assert results.count(True) == 25
+    assert [item["quantity"] for item in _cart_items(supabase, user_id)] == [25]
+    assert len(supabase.db.query("SELECT * FROM cart WHERE customer_id = ? AND status = 'active'", (user_id,))) == 1
+
+
+def test_update_sets_the_quantity_within_stock(user, make_variant):
+    _, token = user
+    item = add_to_cart(variant_id=make_variant(stock=5), quantity=1, access_token=token)
+
+    updated = update_cart_item(cart_item_id=item["cart_item_id"], quantity=5, access_token=token)
+
+    assert [row["quantity"] for row in updated] == [5]
+
+    with pytest.raises(KnownAppError) as excinfo:
+        update_cart_item(cart_item_id=item["cart_item_id"], quantity=6, access_token=token)
+    assert (excinfo.value.status_code, excinfo.value.message) == (400, "Not enough stock available. Requested: 6, Available: 5")
+
+
+def test_update_of_another_users_item_is_not_found(supabase, make_user, make_variant):
+    _, token = make_user()
+    other_id, other_token = make_user()
+    item = add_to_cart(variant_id=make_variant(), quantity=1, access_token=other_token)
+
+    with pytest.raises(KnownAppError) as excinfo:
+        update_cart_item(cart_item_id=item["cart_item_id"], quantity=2, access_token=token)
+
+    assert excinfo.value.status_code == 404
+    assert [row["quantity"] for row in _cart_items(supabase, other_id)] == [1]
@@ -0,0 +1,62 @@
+from data_layer.cart import add_to_cart, get_cart_items
+
+
+def _fill_cart(access_token, make_variant, count):
+    for _ in range(count):
+        add_to_cart(variant_id=make_variant(), quantity=1, access_token=access_token)
+
+
+def test_get_cart_items_filters_projects_and_pages_in_the_query(supabase, user, make_variant):
+    user_id, token = user
+    _fill_cart(token, make_variant, 3)
+    cart_id = supabase.db.query("SELECT cart_id FROM cart WHERE customer_id = ?", (user_id,))[0]["cart_id"]
+    supabase.request_log.clear()
+
+    get_cart_items(token, limit=2, offset=1)
+
+    assert list(supabase.request_log) == [
+        ("GET cart", [
+            ("select", "cart_id"),
+            ("customer_id", f"eq.{user_id}"),
+            ("status", "eq.active"),
+        ]),
+        ("GET cart_item", [
+            ("select", "cart_item_id,cart_id,quantity,product_variant(name,size,color,price,stock,image_url)"),
+            ("cart_id", f"in.({cart_id})"),
+            ("order", "cart_item_id.asc"),
+            ("offset", "1"),
+            ("limit", "3"),
+        ]),
+    ]
+
+
+def test_get_cart_items_reports_further_pages(user, make_variant):
+    _, token = user
+    _fill_cart(token, make_variant, 3)
+
+    first = get_cart_items(token, limit=2)
+    last = get_cart_items(token, limit=2, offset=first["next_offset"])
+
+    assert (len(first["items"]), first["has_more"], first["next_offset"]) == (2, True, 2)
+    assert (len(last["items"]), last["has_more"], last["next_offset"]) == (1, False, None)
+    ids = [item["cart_item_id"] for item in first["items"] + last["items"]]
+    assert len(set(ids)) == 3
+
+
+def test_get_cart_items_only_returns_the_callers_items(make_user, make_variant):
+    _, token = make_user()
+    _, other_token = make_user()
+    _fill_cart(other_token, make_variant, 2)
+
+    assert get_cart_items(token) == {"items": [], "has_more": False, "next_offset": None}
+
+
+def test_get_cart_items_clamps_the_page_size(supabase, user, make_variant):
+    _, token = user
+    _fill_cart(token, make_variant, 1)
+    supabase.request_log.clear()
+
+    get_cart_items(token, limit=1000)
+
+    params = dict(supabase.request_log[-1][1])
+    assert params["limit"] == "101"
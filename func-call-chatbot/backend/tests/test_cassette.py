@@ -0,0 +1,47 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fakes.cassette import Cassette, CassetteMiss, cassette_transport, open_cassette
+
+
+def _record(cassette, n):
+    body = json.dumps({"input": f"message {n}"}).encode("utf-8")
+    cassette.record("POST", "/v1/responses", body, 200, json.dumps({"n": n}).encode("utf-8"), 0.01)
+    return body
+
+
+def test_clients_share_one_cassette_per_file(tmp_path):
+    path = str(tmp_path / "shared.jsonl")
+
+    first = cassette_transport("record", path)
+    second = cassette_transport("replay", path)
+
+    assert first.cassette is second.cassette is open_cassette(path)
+
+
+def test_concurrent_recording_keeps_every_exchange(tmp_path):
+    path = str(tmp_path / "concurrent.jsonl")
+    writers = [Cassette(path), Cassette(path)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda n: _record(writers[n % 2], n), range(200)))
+
+    with open(path, encoding="utf-8") as f:
+        recorded = sorted(json.loads(line)["response"]["n"] for line in f)
+    assert recorded == list(range(200))
+    assert len(Cassette(path)) == 200
+
+
+def test_lookup_miss_reads_exchanges_recorded_by_another_writer(tmp_path):
+    path = str(tmp_path / "late.jsonl")
+    reader, writer = Cassette(path), Cassette(path)
+
+    body = _record(writer, 1)
+
+    assert reader.find("POST", "/v1/responses", body)["response"] == {"n": 1}
+    _record(reader, 2)
+    assert len(reader) == 2
+    with pytest.raises(CassetteMiss):
+        reader.find("POST", "/v1/responses", b'{"input": "never recorded"}')
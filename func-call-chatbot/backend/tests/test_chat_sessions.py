@@ -0,0 +1,71 @@
+import pytest
+
+from core import identity
+from routers import chat
+from routers.middleware import KnownAppError
+
+
+class _RecordingEngine:
+    """Answers every turn with the access token the session holds."""
+
+    def new_budget(self, cancel_event=None):
+        return None
+
+    def process_user_input(self, session, user_input, budget=None):
+        session.turns += 1
+        return {"response": session.access_token}
+
+
+@pytest.fixture(autouse=True)
+def engine(monkeypatch):
+    monkeypatch.setattr(chat, "get_engine", _RecordingEngine)
+
+
+def _session_id():
+    return chat._resolve_session_id(None, None)
+
+
+def test_each_turn_uses_only_its_own_token(user):
+    _, token = user
+    session_id = chat._resolve_session_id(None, token)
+
+    assert chat._run_turn(session_id, token, "hi") == {"response": token}
+    assert chat.session_store.get(session_id).owner_id == user[0]
+    assert identity._request_identity.get() is None
+
+
+def test_another_users_session_is_refused(make_user):
+    _, token = make_user()
+    _, other_token = make_user()
+    session_id = _session_id()
+    chat._run_turn(session_id, token, "hi")
+
+    for caller in (other_token, None):
+        with pytest.raises(KnownAppError) as excinfo:
+            chat._run_turn(session_id, caller, "show my cart")
+        assert excinfo.value.status_code == 403
+
+    assert chat.session_store.get(session_id).access_token == token
+
+
+def test_anonymous_session_stays_anonymous(user):
+    _, token = user
+    session_id = _session_id()
+
+    assert chat._run_turn(session_id, None, "hi") == {"response": None}
+    with pytest.raises(KnownAppError) as excinfo:
+        chat._run_turn(session_id, token, "show my cart")
+    assert excinfo.value.status_code == 403
+
+
+def test_owner_survives_a_spill(make_user):
+    _, token = make_user()
+    _, other_token = make_user()
+    session_id = _session_id()
+    chat._run_turn(session_id, token, "hi")
+
+    chat.session_store.flush()
+
+    with pytest.raises(KnownAppError):
+        chat._run_turn(session_id, other_token, "show my cart")
+    assert chat._run_turn(session_id, token, "show my cart") == {"response": token}
@@ -0,0 +1,121 @@
+import pytest
+
+from data_layer.cart import add_to_cart, delete_cart_item, get_cart_items
+from data_layer.order import place_order
+from routers.middleware import KnownAppError
+
+
+def _stock(supabase, variant_id):
+    return supabase.db.query("SELECT stock FROM product_variant WHERE variant_id = ?", (variant_id,))[0]["stock"]
+
+
+def _orders_of(supabase, user_id):
+    return supabase.db.query('SELECT * FROM "order" WHERE customer_id = ?', (user_id,))
+
+
+def _carts_of(supabase, user_id):
+    return supabase.db.query("SELECT cart_id, status FROM cart WHERE customer_id = ?", (user_id,))
+
+
+def test_checkout_places_the_order_in_one_call(supabase, user, make_variant):
+    user_id, token = user
+    shirt, hoodie = make_variant(price=12.5, stock=5), make_variant(price=30, stock=2)
+    add_to_cart(variant_id=shirt, quantity=2, access_token=token)
+    add_to_cart(variant_id=hoodie, quantity=1, access_token=token)
+    supabase.request_log.clear()
+
+    order = place_order(access_token=token)
+
+    assert [key for key, _ in supabase.request_log] == ["RPC checkout"]
+    assert float(order["total_amount"]) == 55.0
+    assert sorted((item["variant_id"], item["quantity"]) for item in order["items"]) == sorted([(shirt, 2), (hoodie, 1)])
+    assert (_stock(supabase, shirt), _stock(supabase, hoodie)) == (3, 1)
+    assert [cart["status"] for cart in _carts_of(supabase, user_id)] == ["ordered"]
+    assert supabase.db.query("SELECT * FROM cart_item WHERE cart_id = ?", (order["cart_id"],)) == []
+
+
+def test_checkout_without_a_cart_is_not_found(user):
+    _, token = user
+    with pytest.raises(KnownAppError) as excinfo:
+        place_order(access_token=token)
+    assert (excinfo.value.status_code, excinfo.value.message) == (404, "No active cart found")
+
+
+def test_checkout_of_an_empty_cart_is_rejected(supabase, user, make_variant):
+    user_id, token = user
+    item = add_to_cart(variant_id=make_variant(), quantity=1, access_token=token)
+    delete_cart_item(cart_item_id=item["cart_item_id"], access_token=token)
+
+    with pytest.raises(KnownAppError) as excinfo:
+        place_order(access_token=token)
+
+    assert (excinfo.value.status_code, excinfo.value.message) == (400, "Cart is empty")
+    assert _orders_of(supabase, user_id) == []
+
+
+def test_insufficient_stock_changes_nothing(supabase, user, make_variant):
+    user_id, token = user
+    plenty, scarce = make_variant(stock=10), make_variant(stock=3)
+    add_to_cart(variant_id=plenty, quantity=2, access_token=token)
+    add_to_cart(variant_id=scarce, quantity=3, access_token=token)
+    supabase.db.conn.execute("UPDATE product_variant SET stock = 1 WHERE variant_id = ?", (scarce,))
+
+    with pytest.raises(KnownAppError) as excinfo:
+        place_order(access_token=token)
+
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.message.startswith("Insufficient stock for Test Shirt")
+    assert (_stock(supabase, plenty), _stock(supabase, scarce)) == (10, 1)
+    assert _orders_of(supabase, user_id) == []
+    assert len(get_cart_items(token)["items"]) == 2
+
+
+def test_failure_after_writing_rolls_back_the_whole_checkout(supabase, user, make_variant):
+    user_id, token = user
+    shirt, broken = make_variant(stock=5), make_variant(stock=5)
+    add_to_cart(variant_id=shirt, quantity=1, access_token=token)
+    add_to_cart(variant_id=broken, quantity=1, access_token=token)
+    # Fails the stock update, after the order and its items have been inserted.
+    supabase.db.conn.execute(
+        "CREATE TEMP TRIGGER fail_stock_update BEFORE UPDATE OF stock ON product_variant"
+        f" WHEN NEW.variant_id = '{broken}' BEGIN SELECT RAISE(ABORT, 'stock update failed'); END"
+    )
+    try:
+        with pytest.raises(KnownAppError):
+            place_order(access_token=token)
+    finally:
+        supabase.db.conn.execute("DROP TRIGGER fail_stock_update")
+
+    assert _orders_of(supabase, user_id) == []
+    assert supabase.db.query(
+        'SELECT * FROM order_item WHERE order_id NOT IN (SELECT order_id FROM "order")'
+    ) == []
+    assert (_stock(supabase, shirt), _stock(supabase, broken)) == (5, 5)
+    assert [cart["status"] for cart in _carts_of(supabase, user_id)] == ["active"]
+    assert len(get_cart_items(token)["items"]) == 2
+
+
+def test_checkout_only_touches_the_callers_cart(supabase, make_user, make_variant):
+    _, token = make_user()
+    other_id, other_token = make_user()
+    variant_id = make_variant(stock=10)
+    add_to_cart(variant_id=variant_id, quantity=1, access_token=token)
+    add_to_cart(variant_id=variant_id, quantity=4, access_token=other_token)
+
+    place_order(access_token=token)
+
+    assert _stock(supabase, variant_id) == 9
+    assert [cart["status"] for cart in _carts_of(supabase, other_id)] == ["active"]
+    assert [item["quantity"] for item in get_cart_items(other_token)["items"]] == [4]
+
+
+def test_adding_after_checkout_opens_a_new_cart(supabase, user, make_variant):
+    user_id, token = user
+    variant_id = make_variant()
+    add_to_cart(variant_id=variant_id, quantity=1, access_token=token)
+    order = place_order(access_token=token)
+
+    item = add_to_cart(variant_id=variant_id, quantity=1, access_token=token)
+
+    assert item["cart_id"] != order["cart_id"]
+    assert sorted(cart["status"] for cart in _carts_of(supabase, user_id)) == ["active", "ordered"]
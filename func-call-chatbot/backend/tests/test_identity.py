@@ -0,0 +1,145 @@
+import contextvars
+import time
+
+import jwt
+import pytest
+
+from core import identity
+from core.config import settings
+from routers.middleware import KnownAppError
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _token(user_id="user-1", secret=None, expires_in=3600, audience="authenticated"):
+    claims = {"sub": user_id, "email": f"{user_id}@example.com", "role": "authenticated", "exp": int(time.time()) + expires_in}
+    if audience is not None:
+        claims["aud"] = audience
+    return jwt.encode(claims, secret or settings.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    """Fails any lookup that would reach the auth server."""
+    def remote(access_token, token_hash):
+        raise AssertionError("verified remotely")
+    monkeypatch.setattr(identity, "_verify_remote", remote)
+
+
+def _rejected(access_token):
+    with pytest.raises(KnownAppError) as excinfo:
+        identity.resolve_identity(access_token)
+    return excinfo.value.status_code == 401
+
+
+def test_hs256_token_is_verified_locally():
+    resolved = identity.resolve_identity(_token("user-local"))
+
+    assert (resolved.user_id, resolved.email, resolved.role) == ("user-local", "user-local@example.com", "authenticated")
+
+
+def test_invalid_tokens_are_rejected():
+    assert _rejected(None)
+    assert _rejected("not-a-jwt")
+    assert _rejected(_token(secret="another-secret-of-at-least-32-bytes"))
+    assert _rejected(_token(expires_in=-60))
+    assert _rejected(_token(audience="someone-else"))
+    assert _rejected(_token(audience=None))
+
+
+def test_expiry_allows_for_clock_skew():
+    resolved = identity.resolve_identity(_token("user-skew", expires_in=-(identity.CLOCK_SKEW_SECONDS // 2)))
+    assert resolved.user_id == "user-skew"
+
+
+def test_verified_identities_are_cached_by_token_hash(monkeypatch):
+    access_token = _token("user-cached")
+    identity.resolve_identity(access_token)
+    monkeypatch.setattr(identity, "_verify", lambda *args: pytest.fail("verified again"))
+
+    assert identity.resolve_identity(access_token).user_id == "user-cached"
+
+    identity.forget_identity(access_token)
+    with pytest.raises(pytest.fail.Exception):
+        identity.resolve_identity(access_token)
+
+
+def test_cache_entries_expire_with_the_ttl_or_the_token():
+    clock = _Clock()
+    cache = identity._IdentityCache(max_entries=10, ttl=60, clock=clock)
+    long_lived = identity.Identity("a", None, None, clock.now + 3600, "hash-a")
+    short_lived = identity.Identity("b", None, None, clock.now + 30, "hash-b")
+    cache.put(long_lived)
+    cache.put(short_lived)
+
+    clock.now += 29
+    assert (cache.get("hash-a"), cache.get("hash-b")) == (long_lived, short_lived)
+    clock.now += 1
+    assert (cache.get("hash-a"), cache.get("hash-b")) == (long_lived, None)
+    clock.now += 30
+    assert cache.get("hash-a") is None
+
+
+def test_cache_is_bounded_in_lru_order():
+    clock = _Clock()
+    cache = identity._IdentityCache(max_entries=2, ttl=60, clock=clock)
+    first, second, third = (identity.Identity(name, None, None, clock.now + 3600, name) for name in ("a", "b", "c"))
+    cache.put(first)
+    cache.put(second)
+    cache.get("a")
+    cache.put(third)
+
+    assert [cache.get(name) for name in ("a", "b", "c")] == [first, None, third]
+
+
+def _lookups_fail(monkeypatch):
+    monkeypatch.setattr(identity._cache, "get", lambda token_hash: None)
+    monkeypatch.setattr(identity, "_verify", lambda *args: pytest.fail("looked up"))
+
+
+def test_bound_identity_serves_its_own_token_within_its_context(monkeypatch):
+    access_token, other_token = _token("user-bound"), _token("user-other")
+
+    def bind_and_resolve():
+        identity.bind_identity(access_token)
+        _lookups_fail(monkeypatch)
+        user_id = identity.current_user_id(access_token)
+        with pytest.raises(pytest.fail.Exception):
+            identity.current_user_id(other_token)
+        return user_id
+
+    assert contextvars.copy_context().run(bind_and_resolve) == "user-bound"
+    # The binding stayed in the context it was made in.
+    assert identity._request_identity.get() is None
+
+
+def test_expired_binding_is_not_used(monkeypatch):
+    access_token = _token("user-expiring")
+
+    def bind_and_resolve():
+        identity.bind_identity(access_token).expires_at = time.time() - 1
+        _lookups_fail(monkeypatch)
+        identity.current_user_id(access_token)
+
+    with pytest.raises(pytest.fail.Exception):
+        contextvars.copy_context().run(bind_and_resolve)
+
+
+def test_scoped_binding_is_reset_after_the_block(monkeypatch):
+    access_token = _token("user-scoped")
+    outer = identity.resolve_identity(_token("user-outer"))
+
+    def run():
+        identity._request_identity.set(outer)
+        with identity.identity_bound(identity.resolve_identity(access_token)):
+            _lookups_fail(monkeypatch)
+            assert identity.current_user_id(access_token) == "user-scoped"
+        return identity._request_identity.get()
+
+    assert contextvars.copy_context().run(run) is outer
@@ -0,0 +1,71 @@
+import uuid
+
+import pytest
+
+from data_layer.order import get_user_orders
+from routers.middleware import KnownAppError
+
+
+@pytest.fixture
+def order_history(supabase, user, make_variant):
+    """25 orders of one user, with pairs placed at the same time; returns their ids newest first."""
+    user_id, token = user
+    variant_id = make_variant()
+    prefix = uuid.uuid4().hex[:8]
+    orders = [
+        {
+            "order_id": f"{prefix}-{i:03d}",
+            "customer_id": user_id,
+            "order_date": f"2026-01-{1 + i // 2:02d}T10:00:00.000+00:00",
+            "status": "pending",
+            "total_amount": 20,
+        }
+        for i in range(25)
+    ]
+    supabase.seed("order", orders)
+    supabase.seed("order_item", [
+        {"order_id": order["order_id"], "variant_id": variant_id, "quantity": 1, "item_price": 10}
+        for order in orders
+        for _ in range(2)
+    ])
+    supabase.request_log.clear()
+    return token, [order["order_id"] for order in reversed(orders)]
+
+
+def test_pages_follow_the_cursor_in_one_query_each(supabase, order_history):
+    token, expected = order_history
+    seen, before, pages = [], None, 0
+    while True:
+        page = get_user_orders(token, before=before, limit=7)
+        pages += 1
+        seen += [order["order_id"] for order in page["orders"]]
+        assert all(len(order["items"]) == 2 for order in page["orders"])
+        if not page["has_more"]:
+            assert page["next_before"] is None
+            break
+        before = page["next_before"]
+
+    assert seen == expected
+    assert pages == 4
+    assert [key for key, _ in supabase.request_log] == ["GET order"] * pages
+
+
+def test_cursor_is_opaque(order_history):
+    token, expected = order_history
+    cursor = get_user_orders(token, limit=1)["next_before"]
+
+    assert expected[0] not in cursor
+    assert get_user_orders(token, before=cursor, limit=1)["orders"][0]["order_id"] == expected[1]
+
+
+@pytest.mark.parametrize("cursor", ["nope", "WyJhIl0", "WyJhIiwxXQ", "WyJhXCIiLCJiIl0"])
+def test_invalid_cursor_is_rejected(order_history, cursor):
+    token, _ = order_history
+    with pytest.raises(KnownAppError) as excinfo:
+        get_user_orders(token, before=cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_other_users_orders_are_not_returned(make_user, order_history):
+    _, token = make_user()
+    assert get_user_orders(token) == {"orders": [], "has_more": False, "next_before": None}
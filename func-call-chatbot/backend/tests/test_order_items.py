@@ -0,0 +1,104 @@
+import pytest
+
+from data_layer.cart import add_to_cart
+from data_layer.order import delete_order_item, place_order, update_order_item
+from fakes.supabase_server import PostgrestError
+from routers.middleware import KnownAppError
+
+
+@pytest.fixture
+def placed_order(user, make_variant):
+    """An order of 2 x 12.50 and 1 x 30.00 (total 55.00); returns the token and the order."""
+    _, token = user
+    add_to_cart(variant_id=make_variant(price=12.5), quantity=2, access_token=token)
+    add_to_cart(variant_id=make_variant(price=30), quantity=1, access_token=token)
+    return token, place_order(access_token=token)
+
+
+def _stored_total(supabase, order_id):
+    return float(supabase.db.query('SELECT total_amount FROM "order" WHERE order_id = ?', (order_id,))[0]["total_amount"])
+
+
+def _item(order, price):
+    return next(item for item in order["items"] if float(item["item_price"]) == price)
+
+
+def test_update_applies_the_line_delta_to_the_total(supabase, placed_order):
+    token, order = placed_order
+    supabase.request_log.clear()
+
+    [item] = update_order_item(order_item_id=_item(order, 12.5)["order_item_id"], quantity=3, item_price=10, access_token=token)
+
+    assert (item["quantity"], float(item["item_price"])) == (3, 10)
+    assert float(item["order_total"]) == 60.0
+    assert _stored_total(supabase, order["order_id"]) == 60.0
+    assert [key for key, _ in supabase.request_log] == ["RPC update_order_item"]
+
+
+def test_delete_subtracts_the_line_from_the_total(supabase, placed_order):
+    token, order = placed_order
+
+    [item] = delete_order_item(order_item_id=_item(order, 30)["order_item_id"], access_token=token)
+
+    assert float(item["order_total"]) == 25.0
+    assert _stored_total(supabase, order["order_id"]) == 25.0
+    assert supabase.db.query("SELECT * FROM order_item WHERE order_item_id = ?", (item["order_item_id"],)) == []
+
+
+def test_successive_edits_keep_the_total_exact(supabase, placed_order):
+    token, order = placed_order
+    cheap, dear = _item(order, 12.5)["order_item_id"], _item(order, 30)["order_item_id"]
+
+    update_order_item(order_item_id=cheap, quantity=1, item_price=19.99, access_token=token)
+    update_order_item(order_item_id=dear, quantity=3, item_price=0.1, access_token=token)
+    [item] = delete_order_item(order_item_id=cheap, access_token=token)
+
+    assert float(item["order_total"]) == pytest.approx(0.3)
+    assert _stored_total(supabase, order["order_id"]) == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize("quantity, item_price, message", [
+    (0, 10, "Quantity must be at least 1"),
+    (-1, 10, "Quantity must be at least 1"),
+    (1, -0.01, "Item price must not be negative"),
+])
+def test_invalid_update_is_rejected(supabase, placed_order, quantity, item_price, message):
+    token, order = placed_order
+
+    with pytest.raises(KnownAppError) as excinfo:
+        update_order_item(order_item_id=_item(order, 12.5)["order_item_id"], quantity=quantity, item_price=item_price, access_token=token)
+
+    assert (excinfo.value.status_code, excinfo.value.message) == (400, message)
+    assert _stored_total(supabase, order["order_id"]) == 55.0
+
+
+def test_another_users_order_items_are_not_found(supabase, make_user, placed_order):
+    _, order = placed_order
+    _, other_token = make_user()
+    order_item_id = _item(order, 12.5)["order_item_id"]
+
+    for call in (
+        lambda: update_order_item(order_item_id=order_item_id, quantity=9, item_price=1, access_token=other_token),
+        lambda: delete_order_item(order_item_id=order_item_id, access_token=other_token),
+    ):
+        with pytest.raises(KnownAppError) as excinfo:
+            call()
+        assert excinfo.value.status_code == 404
+
+    assert _stored_total(supabase, order["order_id"]) == 55.0
+    assert len(supabase.db.query("SELECT * FROM order_item WHERE order_id = ?", (order["order_id"],))) == 2
+
+
+def test_order_item_rpcs_require_a_user(supabase, placed_order):
+    _, order = placed_order
+    order_item_id = _item(order, 12.5)["order_item_id"]
+    rpcs = supabase.rpcs
+
+    with supabase.db.transaction() as conn:
+        for name, params in (
+            ("update_order_item", {"p_order_item_id": order_item_id, "p_quantity": 1, "p_item_price": 1}),
+            ("delete_order_item", {"p_order_item_id": order_item_id}),
+        ):
+            with pytest.raises(PostgrestError) as excinfo:
+                rpcs[name](conn, None, params)
+            assert excinfo.value.status_code == 401
@@ -0,0 +1,218 @@
+import random
+import threading
+
+import httpx
+import openai
+import pytest
+
+from core.resilience import DeadlineExceeded, LatencyWindow, RetryBudget, UpstreamCaller, is_retryable
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _HighestJitter:
+    """Always picks the upper bound of the jitter range."""
+
+    def uniform(self, low, high):
+        return high
+
+
+class _Upstream:
+    """Answers attempts from a script of results and errors, each taking ``latency`` seconds."""
+
+    def __init__(self, clock, *outcomes, latency=1.0):
+        self.clock = clock
+        self.outcomes = list(outcomes)
+        self.latency = latency
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        self.clock.now += self.latency
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def _caller(clock, **options):
+    options.setdefault("rng", _HighestJitter())
+    return UpstreamCaller("test", clock=clock, sleep=clock.sleep, **options)
+
+
+def _connection_error():
+    return httpx.ConnectError("connection refused")
+
+
+def _rate_limited(retry_after):
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "http://upstream"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_retryable_errors():
+    assert is_retryable(_connection_error())
+    assert is_retryable(_rate_limited("1"))
+    assert not is_retryable(ValueError("bad request"))
+
+
+def test_retries_with_exponential_backoff_until_success():
+    clock = _Clock()
+    upstream = _Upstream(clock, _connection_error(), _connection_error(), "answer")
+
+    result = _caller(clock, max_attempts=3, base_delay=0.25, max_delay=4.0).call(upstream)
+
+    assert result == "answer"
+    assert clock.sleeps == [0.25, 0.5]
+
+
+def test_backoff_is_capped_and_jittered_below_the_cap():
+    clock = _Clock()
+    caller = _caller(clock, base_delay=1.0, max_delay=3.0)
+    assert [caller._backoff(attempt, _connection_error()) for attempt in (1, 2, 3, 4)] == [1.0, 2.0, 3.0, 3.0]
+
+    jittered = UpstreamCaller("test", base_delay=1.0, max_delay=3.0, rng=random.Random(7))
+    delays = [jittered._backoff(3, _connection_error()) for _ in range(50)]
+    assert all(0 <= delay <= 3.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_is_honored_up_to_the_cap():
+    clock = _Clock()
+    upstream = _Upstream(clock, _rate_limited("2"), _rate_limited("60"), "answer")
+
+    assert _caller(clock, max_attempts=3, max_delay=4.0).call(upstream) == "answer"
+    assert clock.sleeps == [2.0, 4.0]
+
+
+def test_permanent_errors_are_not_retried():
+    clock = _Clock()
+    upstream = _Upstream(clock, ValueError("bad request"), "unused")
+
+    with pytest.raises(ValueError):
+        _caller(clock).call(upstream)
+    assert (len(upstream.timeouts), clock.sleeps) == (1, [])
+
+
+def test_gives_up_after_the_last_attempt():
+    clock = _Clock()
+    upstream = _Upstream(clock, *[_connection_error() for _ in range(3)])
+
+    with pytest.raises(httpx.ConnectError):
+        _caller(clock, max_attempts=3).call(upstream)
+    assert len(upstream.timeouts) == 3
+
+
+def test_attempt_timeouts_are_capped_by_the_deadline():
+    clock = _Clock()
+    upstream = _Upstream(clock, _connection_error(), "answer", latency=2.0)
+
+    assert _caller(clock, timeout=5.0, base_delay=1.0).call(upstream, deadline=6.0) == "answer"
+    assert upstream.timeouts == [5.0, 3.0]
+
+
+def test_no_retry_when_the_backoff_would_pass_the_deadline():
+    clock = _Clock()
+    upstream = _Upstream(clock, _connection_error(), "unused", latency=2.0)
+
+    with pytest.raises(httpx.ConnectError):
+        _caller(clock, base_delay=1.0).call(upstream, deadline=2.5)
+    assert clock.sleeps == []
+
+
+def test_no_attempt_without_time_left():
+    clock = _Clock()
+    upstream = _Upstream(clock, "unused")
+
+    with pytest.raises(DeadlineExceeded):
+        _caller(clock).call(upstream, deadline=0)
+    assert upstream.timeouts == []
+
+
+def test_cancelled_calls_are_not_retried():
+    clock = _Clock()
+    cancel_event = threading.Event()
+    cancel_event.set()
+    upstream = _Upstream(clock, _connection_error(), "unused")
+
+    with pytest.raises(httpx.ConnectError):
+        _caller(clock).call(upstream, cancel_event=cancel_event)
+    assert len(upstream.timeouts) == 1
+
+
+def test_retry_budget_is_refilled_by_calls():
+    budget = RetryBudget(ratio=0.5, max_tokens=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_exhausted_retry_budget_stops_retries():
+    clock = _Clock()
+    caller = _caller(clock)
+    caller.retry_budget = RetryBudget(ratio=0, max_tokens=1)
+    upstream = _Upstream(clock, _connection_error(), "answer", _connection_error(), "unused")
+
+    assert caller.call(upstream) == "answer"
+    with pytest.raises(httpx.ConnectError):
+        caller.call(upstream)
+    assert len(upstream.timeouts) == 3
+
+
+def test_latency_quantile_needs_enough_samples():
+    window = LatencyWindow(size=10, min_samples=5)
+    for duration in (0.1, 0.2, 0.3, 0.4):
+        window.add(duration)
+    assert window.quantile(0.5) is None
+
+    window.add(0.5)
+    assert window.quantile(0.5) == 0.3
+    assert window.quantile(1.0) == 0.5
+
+
+def test_slow_attempt_is_hedged_and_the_first_answer_wins():
+    caller = UpstreamCaller("test", hedge=True, hedge_quantile=0.5, hedge_min_delay=0.01)
+    for _ in range(caller.latencies.min_samples):
+        caller.latencies.add(0.01)
+    release_primary = threading.Event()
+    calls = []
+    lock = threading.Lock()
+
+    def upstream(timeout):
+        with lock:
+            calls.append(timeout)
+            primary = len(calls) == 1
+        if primary:
+            release_primary.wait(5)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert caller.call(upstream) == "hedge"
+    finally:
+        release_primary.set()
+    assert len(calls) == 2
+
+
+def test_fast_attempt_is_not_hedged():
+    caller = UpstreamCaller("test", hedge=True, hedge_quantile=0.5, hedge_min_delay=1.0)
+    for _ in range(caller.latencies.min_samples):
+        caller.latencies.add(0.01)
+    calls = []
+
+    assert caller.call(lambda timeout: calls.append(timeout) or "answer") == "answer"
+    assert len(calls) == 1
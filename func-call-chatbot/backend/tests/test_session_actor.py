@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from models.session_actor import SessionActors
+from routers import chat
+from routers.middleware import KnownAppError
+
+
+async def _on_thread(fn):
+    return await asyncio.to_thread(fn)
+
+
+async def _settle():
+    # Lets submitted messages reach their actor's inbox.
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_turns_of_a_session_run_one_at_a_time():
+    actors = SessionActors(inbox_size=5, run_turn=_on_thread)
+    running, overlaps, finished = [], [], []
+    lock = threading.Lock()
+
+    def turn(name):
+        def run():
+            with lock:
+                overlaps.append(len(running))
+                running.append(name)
+            time.sleep(0.02)
+            with lock:
+                running.remove(name)
+                finished.append(name)
+            return name
+        return run
+
+    async def main():
+        return await asyncio.gather(*(actors.submit("s", name, turn(name)) for name in ("a", "b", "c")))
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+    assert finished == ["a", "b", "c"]
+    assert overlaps == [0, 0, 0]
+    assert actors.stats() == {"active_sessions": 0, "queued_messages": 0, "running_turns": 0}
+
+
+def test_sessions_run_in_parallel():
+    actors = SessionActors(run_turn=_on_thread)
+    both_started = threading.Barrier(2, timeout=5)
+
+    async def main():
+        return await asyncio.gather(
+            actors.submit("s1", "hi", lambda: both_started.wait() is not None),
+            actors.submit("s2", "hi", lambda: both_started.wait() is not None),
+        )
+
+    assert asyncio.run(main()) == [True, True]
+
+
+def test_full_inbox_is_rejected_with_429():
+    session_id = uuid.uuid4().hex
+    inbox_size = chat.session_actors.inbox_size
+
+    async def main():
+        release = asyncio.Event()
+
+        async def held(fn):
+            await release.wait()
+            return "done"
+
+        turns = [
+            asyncio.ensure_future(chat._submit_turn(session_id, None, f"message {n}", held))
+            for n in range(inbox_size + 1)
+        ]
+        await _settle()
+        with pytest.raises(KnownAppError) as excinfo:
+            await chat._submit_turn(session_id, None, "one too many", held)
+        release.set()
+        return excinfo.value.status_code, await asyncio.gather(*turns)
+
+    status_code, results = asyncio.run(main())
+    assert status_code == 429
+    assert results == ["done"] * (inbox_size + 1)
+
+
+def test_duplicates_merge_only_for_the_same_caller():
+    session_id = uuid.uuid4().hex
+    runs = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def held(fn):
+            runs.append(fn)
+            await release.wait()
+            return len(runs)
+
+        turns = [
+            asyncio.ensure_future(chat._submit_turn(session_id, token, message, held))
+            for token, message in (("token-a", "Show my cart"), ("token-a", " show my cart "), ("token-b", "show my cart"))
+        ]
+        await _settle()
+        release.set()
+        return await asyncio.gather(*turns)
+
+    first, duplicate, other_caller = asyncio.run(main())
+    assert len(runs) == 2
+    assert first == duplicate
+    assert other_caller != first
+
+
+def test_queued_turn_is_abandoned_when_its_caller_goes_away():
+    actors = SessionActors(run_turn=_on_thread)
+    gate = threading.Event()
+    cancel_event = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(actors.submit("s", "a", lambda: gate.wait(5)))
+        queued = asyncio.ensure_future(actors.submit(
+            "s", "b", lambda: "skipped" if cancel_event.is_set() else "ran", cancel_event=cancel_event,
+        ))
+        await _settle()
+        queued.cancel()
+        await _settle()
+        gate.set()
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(main())
+    assert cancel_event.is_set()
+
+
+def test_running_turn_continues_while_someone_still_waits():
+    actors = SessionActors(run_turn=_on_thread)
+    gate = threading.Event()
+    cancel_event = threading.Event()
+
+    async def main():
+        first = asyncio.ensure_future(actors.submit("s", "a", lambda: gate.wait(5) and "answer", cancel_event=cancel_event))
+        second = asyncio.ensure_future(actors.submit("s", "a", lambda: "unused"))
+        await _settle()
+        first.cancel()
+        await _settle()
+        assert not cancel_event.is_set()
+        second.cancel()
+        await _settle()
+        assert cancel_event.is_set()
+        gate.set()
+
+    asyncio.run(main())
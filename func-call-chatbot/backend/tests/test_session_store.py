@@ -0,0 +1,114 @@
+import pytest
+
+from models.session_store import SessionStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+
+def _store(db_path, clock, max_sessions=2, ttl_seconds=60, **kwargs):
+    return SessionStore(
+        factory=lambda session_id: {"id": session_id, "notes": []},
+        dump=lambda session: session,
+        load=lambda session_id, state: state,
+        max_sessions=max_sessions,
+        ttl_seconds=ttl_seconds,
+        db_path=db_path,
+        clock=clock,
+        **kwargs,
+    )
+
+
+def _note(store, session_id, note):
+    with store.session(session_id) as session:
+        session["notes"].append(note)
+
+
+def test_least_recently_used_session_is_spilled_and_restored(db_path, clock):
+    store = _store(db_path, clock)
+    _note(store, "a", "first")
+    _note(store, "b", "second")
+    store.get("a")
+    _note(store, "c", "third")
+
+    stats = store.stats()
+    assert (stats["resident_sessions"], stats["spilled_sessions"], stats["evictions"]["lru"]) == (2, 1, 1)
+    assert store.get("b")["notes"] == ["second"]
+    assert store.stats()["rehydrations"] == 1
+
+
+def test_idle_sessions_are_spilled_after_the_ttl(db_path, clock):
+    store = _store(db_path, clock, max_sessions=10, ttl_seconds=60)
+    _note(store, "a", "first")
+    clock.now += 30
+    _note(store, "b", "second")
+
+    clock.now += 45
+    store.get("b")
+
+    stats = store.stats()
+    assert (stats["resident_sessions"], stats["spilled_sessions"], stats["evictions"]["ttl"]) == (1, 1, 1)
+    assert store.get("a")["notes"] == ["first"]
+
+
+def test_pinned_sessions_are_not_evicted(db_path, clock):
+    store = _store(db_path, clock, max_sessions=1, ttl_seconds=60)
+
+    with store.session("a") as session:
+        session["notes"].append("running")
+        clock.now += 120
+        _note(store, "b", "other")
+        assert store.stats()["resident_sessions"] == 2
+        session["notes"].append("still running")
+
+    store.get("c")
+    assert store.stats()["resident_sessions"] == 1
+    assert store.get("a")["notes"] == ["running", "still running"]
+
+
+def test_spilled_sessions_survive_a_restart(db_path, clock):
+    store = _store(db_path, clock)
+    _note(store, "a", "before restart")
+    store.flush()
+    assert store.stats()["evictions"]["shutdown"] == 1
+
+    restarted = _store(db_path, clock)
+
+    assert restarted.get("a")["notes"] == ["before restart"]
+    assert restarted.stats()["spilled_sessions"] == 0
+
+
+def test_unreadable_spill_is_discarded(db_path, clock):
+    store = _store(db_path, clock)
+    store._db.execute(
+        "INSERT INTO chat_session (session_id, codec, payload, spilled_at) VALUES ('a', 'zlib', x'00', 0)"
+    )
+
+    assert store.get("a") == {"id": "a", "notes": []}
+    assert (store.stats()["discarded_spills"], store.stats()["spilled_sessions"]) == (1, 0)
+
+
+def test_old_spills_are_purged_on_start(db_path, clock):
+    store = _store(db_path, clock)
+    _note(store, "a", "stale")
+    store.flush()
+
+    restarted = _store(db_path, clock, spill_retention_seconds=-1)
+
+    assert restarted.stats()["spilled_sessions"] == 0
+    assert restarted.get("a")["notes"] == []
@@ -0,0 +1,74 @@
+from models.tool_cache import CACHE_POLICIES, INVALIDATES, MISSING, ToolCache, cache_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_canonicalizes_arguments():
+    assert cache_key("get_t_shirt", {"name": "  Classic Tee ", "size": "M", "color": None}) == \
+        cache_key("get_t_shirt", {"size": "m", "name": "classic tee"})
+    assert cache_key("get_t_shirt", {"name": "Tee"}) != cache_key("get_all_shirts", {"name": "Tee"})
+
+
+def test_cache_key_keeps_the_access_token_verbatim():
+    assert cache_key("get_t_shirt", {"access_token": "AbC"}) != cache_key("get_t_shirt", {"access_token": "abc"})
+
+
+def test_entries_expire_after_their_ttl():
+    clock = _Clock()
+    cache = ToolCache(clock=clock)
+    key = cache_key("get_all_shirts", {})
+    cache.set(key, ["tee"], ttl_seconds=30)
+
+    clock.now = 29.9
+    assert cache.get(key) == ["tee"]
+    clock.now = 30
+    assert cache.get(key) is MISSING
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolCache(max_entries=2, clock=_Clock())
+    first, second, third = (cache_key("get_t_shirt", {"name": name}) for name in ("a", "b", "c"))
+    cache.set(first, 1, 30)
+    cache.set(second, 2, 30)
+    cache.get(first)
+    cache.set(third, 3, 30)
+
+    assert [cache.get(key) for key in (first, second, third)] == [1, MISSING, 3]
+
+
+def test_values_are_copied_in_and_out():
+    cache = ToolCache(clock=_Clock())
+    key = cache_key("get_t_shirt", {"name": "tee"})
+    stored = [{"name": "Tee", "stock": 5}]
+    cache.set(key, stored, 30)
+
+    stored[0]["stock"] = 0
+    read = cache.get(key)
+    read[0]["stock"] = 1
+    read.append({"name": "Other"})
+
+    assert cache.get(key) == [{"name": "Tee", "stock": 5}]
+
+
+def test_placing_an_order_invalidates_the_catalog_reads():
+    cache = ToolCache(clock=_Clock())
+    shirt = cache_key("get_t_shirt", {"name": "tee"})
+    shirts = cache_key("get_all_shirts", {})
+    answer = cache_key("search_knowledge_base", {"query": "returns"})
+    for key in (shirt, shirts, answer):
+        cache.set(key, "cached", 30)
+
+    cache.invalidate(INVALIDATES["place_order"])
+
+    assert [cache.get(key) for key in (shirt, shirts, answer)] == [MISSING, MISSING, "cached"]
+
+
+def test_cart_and_order_reads_are_not_cacheable():
+    assert "get_user_cart" not in CACHE_POLICIES
+    assert "get_user_orders" not in CACHE_POLICIES
@@ -0,0 +1,23 @@
+from models.database import Database
+from models.tool_registry import ToolRegistry
+
+
+def test_database_tools_come_from_the_declarations():
+    registry = ToolRegistry([Database()])
+
+    offered = {schema["name"] for schema in registry.schemas}
+    assert "get_t_shirt" in offered and "place_order" in offered
+    assert "get_all_shirts" in registry and "get_all_shirts" not in offered
+    assert "get_cart_items" not in registry
+    assert {"add_to_cart", "place_order", "get_user_cart"} <= registry.requires_token
+
+
+def test_engine_only_tools_are_dispatched_through_the_registry(make_variant):
+    variant_id = make_variant()
+    calls = []
+    registry = ToolRegistry([Database()], hooks=[lambda name, duration, result, error: calls.append((name, error))])
+
+    shirts = registry.call("get_all_shirts", {})
+
+    assert variant_id in {shirt["variant_id"] for shirt in shirts}
+    assert calls == [("get_all_shirts", None)]
@@ -6,6 +6,7 @@ import Login from "./components/login"
 import Sidebar from "./components/sidebar"
 import FloatingChat from "./components/floatingChat"
 import { useState, useEffect } from "react"
+import { getCartItems, getOrdersPage } from "./utils/api"
 
 // Type definitions
 type ProductType = {
@@ -59,6 +60,7 @@ function App() {
   const [cart, setCart] = useState<CartItem[]>([])
   const [wishlist, setWishlist] = useState<WishlistItem[]>([])
   const [orders, setOrders] = useState<OrderType[]>([])
+  const [ordersNextBefore, setOrdersNextBefore] = useState<string | null>(null)
   const [loading, setLoading] = useState({
     products: true,
     cart: true,
@@ -73,15 +75,10 @@ function App() {
       
       const fetchInitialData = async () => {
         try {
-          const cartResponse = await fetch("http://127.0.0.1:8000/api/cart", {
-            method: "GET",
-            headers: {
-              "Authorization": `Bearer ${localStorage.getItem("access_token")}`
-            }
-          })
-          if (cartResponse.ok) {
-            const cartData = await cartResponse.json()
-            setCart(cartData)
+          try {
+            setCart(await getCartItems())
+          } catch (err) {
+            console.error("Failed to load cart:", err)
           }
           setLoading(prev => ({ ...prev, cart: false }))
           
@@ -109,15 +106,12 @@ function App() {
           }
           setLoading(prev => ({ ...prev, wishlist: false }))
           
-          const ordersResponse = await fetch("http://127.0.0.1:8000/api/order/user", {
-            method: "GET",
-            headers: {
-              "Authorization": `Bearer ${localStorage.getItem("access_token")}`
-            }
-          })
-          if (ordersResponse.ok) {
-            const ordersData = await ordersResponse.json()
-            setOrders(ordersData)
+          try {
+            const ordersPage = await getOrdersPage()
+            setOrders(ordersPage.orders)
+            setOrdersNextBefore(ordersPage.next_before)
+          } catch (err) {
+            console.error("Failed to load orders:", err)
           }
           setLoading(prev => ({ ...prev, orders: false }))
           
@@ -154,6 +148,7 @@ function App() {
     setCart([])
     setWishlist([])
     setOrders([])
+    setOrdersNextBefore(null)
   }
 
   const [cartRefreshTimeout, setCartRefreshTimeout] = useState<NodeJS.Timeout | null>(null);
@@ -170,13 +165,7 @@ function App() {
         // Set loading state for cart
         setLoading(prev => ({ ...prev, cart: true }))
         // Fetch updated cart data
-        fetch("http://127.0.0.1:8000/api/cart", {
-          method: "GET",
-          headers: {
-            "Authorization": `Bearer ${localStorage.getItem("access_token")}`
-          }
-        })
-          .then(res => res.json())
+        getCartItems()
           .then(data => {
             console.log("Cart data received:", data)
             setCart(data)
@@ -235,6 +224,8 @@ function App() {
           <Order 
             orders={orders} 
             setOrders={setOrders}
+            nextBefore={ordersNextBefore}
+            setNextBefore={setOrdersNextBefore}
             loading={loading.orders}
             setLoading={(loading) => setLoading(prev => ({ ...prev, orders: loading }))}
             onDataUpdate={refreshData}
@@ -39,6 +39,7 @@ function Chat({ hideHeader }: ChatProps) {
   const [input, setInput] = useState("")
   const [loading, setLoading] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement | null>(null)
+  const sessionIdRef = useRef<string | null>(null)
 
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" })
@@ -52,8 +53,9 @@ function Chat({ hideHeader }: ChatProps) {
     try {
       const data = await apiCall("http://127.0.0.1:8000/api/chat", {
         method: "POST",
-        body: JSON.stringify({ message: userMessage.text }),
+        body: JSON.stringify({ message: userMessage.text, session_id: sessionIdRef.current }),
       })
+      sessionIdRef.current = data.session_id || sessionIdRef.current
       const botResponse = data.response || "Sorry, I didn't get that."
       
       // Check for cart refresh signal
@@ -99,8 +101,9 @@ function Chat({ hideHeader }: ChatProps) {
     try {
       const data = await apiCall("http://127.0.0.1:8000/api/chat", {
         method: "POST",
-        body: JSON.stringify({ message: userMessage.text }),
+        body: JSON.stringify({ message: userMessage.text, session_id: sessionIdRef.current }),
       })
+      sessionIdRef.current = data.session_id || sessionIdRef.current
       const botResponse = data.response || "Sorry, I didn't get that."
       
       // Check for cart refresh signal
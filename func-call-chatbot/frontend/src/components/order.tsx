@@ -3,7 +3,7 @@ import "../styles/index.css"
 
 import { useEffect, useState } from "react"
 import { Package, ShoppingBag, Calendar, DollarSign, Trash2 } from "lucide-react"
-import { apiCall } from "../utils/api"
+import { apiCall, getOrdersPage } from "../utils/api"
 
 type OrderItem = {
   id: string
@@ -72,20 +72,22 @@ function calculateOrderTotal(items: OrderItem[]): number {
 interface OrderProps {
   orders: Order[]
   setOrders: (orders: Order[]) => void
+  nextBefore: string | null
+  setNextBefore: (nextBefore: string | null) => void
   loading: boolean
   setLoading: (loading: boolean) => void
   onDataUpdate: (type: string) => void
 }
 
-function Order({ orders, setOrders, loading, setLoading, onDataUpdate }: OrderProps) {
+function Order({ orders, setOrders, nextBefore, setNextBefore, loading, setLoading, onDataUpdate }: OrderProps) {
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     const fetchOrders = () => {
-      apiCall("http://127.0.0.1:8000/api/order/user", {
-        method: "GET",
-      })
-        .then((data) => {
-          setOrders(data)
+      getOrdersPage()
+        .then((page) => {
+          setOrders(page.orders)
+          setNextBefore(page.next_before)
           setLoading(false)
         })
         .catch((err) => {
@@ -101,7 +103,21 @@ function Order({ orders, setOrders, loading, setLoading, onDataUpdate }: OrderPr
     
     window.addEventListener("order-updated", fetchOrders)
     return () => window.removeEventListener("order-updated", fetchOrders)
-  }, [orders.length, loading, setOrders, setLoading])
+  }, [orders.length, loading, setOrders, setNextBefore, setLoading])
+
+  const loadOlderOrders = () => {
+    if (!nextBefore) return
+    setLoadingMore(true)
+    getOrdersPage(nextBefore)
+      .then((page) => {
+        setOrders([...orders, ...page.orders])
+        setNextBefore(page.next_before)
+      })
+      .catch((err) => {
+        console.log("Failed to fetch older orders: ", err)
+      })
+      .finally(() => setLoadingMore(false))
+  }
 
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleDateString('en-US', {
@@ -210,6 +226,11 @@ function Order({ orders, setOrders, loading, setLoading, onDataUpdate }: OrderPr
                 </div>
               )
             })}
+            {nextBefore && (
+              <button className="action-button" onClick={loadOlderOrders} disabled={loadingMore}>
+                {loadingMore ? "Loading..." : "Load older orders"}
+              </button>
+            )}
           </div>
         )}
       </div>
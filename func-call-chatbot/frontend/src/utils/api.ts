@@ -30,8 +30,24 @@ export const addToCart = async (variantId: string, quantity: number) => {
   });
 };
 
+// /api/cart returns one page at a time; follow next_offset until the last page.
 export const getCartItems = async () => {
-  return apiCall('http://127.0.0.1:8000/api/cart');
+  const items = [];
+  let offset = 0;
+  for (;;) {
+    const page = await apiCall(`http://127.0.0.1:8000/api/cart?offset=${offset}`);
+    items.push(...page.items);
+    if (!page.has_more) {
+      return items;
+    }
+    offset = page.next_offset;
+  }
+};
+
+// One page of orders, newest first; pass the previous page's next_before for older ones.
+export const getOrdersPage = async (before?: string | null) => {
+  const query = before ? `?before=${encodeURIComponent(before)}` : '';
+  return apiCall(`http://127.0.0.1:8000/api/order/user${query}`);
 };
 
 export const getProducts = async () => {